@@ -8,16 +8,37 @@ import fitz
 import docx
 import pandas as pd
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 import shutil 
+import bisect
+import random
+import zlib
+import copy
+import uuid
+import time
+import hashlib
+import gzip
+import base64
+import tempfile
+import threading
+import multiprocessing
+import unicodedata
+from urllib.parse import quote as url_quote
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future, as_completed, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from functools import cached_property, wraps
 from flask import (
     Flask, request, jsonify, render_template, send_file, 
-    make_response, redirect, url_for, flash
+    make_response, redirect, url_for, flash, Response, stream_with_context, g
 )
 from dotenv import load_dotenv
+from pdf_worker import extract_page_range
 from docx.enum.text import WD_COLOR_INDEX
 from docx.shared import Pt, Inches
 from docx import Document 
 
+import sqlalchemy
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import (
     LoginManager, UserMixin, login_user, logout_user, login_required, current_user
@@ -35,6 +56,88 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 app.config['UPLOAD_FOLDER'] = os.path.join(APP_ROOT, 'data') 
 
+# Batas jumlah halaman yang di-proofread bersamaan dan timeout per panggilan AI (detik)
+app.config['PROOFREAD_MAX_WORKERS'] = int(os.getenv('PROOFREAD_MAX_WORKERS', 8))
+app.config['PROOFREAD_CALL_TIMEOUT'] = int(os.getenv('PROOFREAD_CALL_TIMEOUT', 120))
+# Batas halaman yang sedang diproses per dokumen (teksnya ada di memori) saat ekstraksi secara streaming
+app.config['PROOFREAD_MAX_IN_FLIGHT'] = int(os.getenv('PROOFREAD_MAX_IN_FLIGHT', 16))
+
+# Cache hasil proofread di disk (instance/), dipakai bersama oleh analyze dan download
+app.config['PROOFREAD_CACHE_DIR'] = os.path.join(app.instance_path, 'proofread_cache')
+app.config['PROOFREAD_CACHE_MAX_ENTRIES'] = int(os.getenv('PROOFREAD_CACHE_MAX_ENTRIES', 200))
+# Memo per halaman (teks halaman yang dinormalisasi) untuk unggahan ulang draf revisi
+app.config['PROOFREAD_PAGE_CACHE_DIR'] = os.path.join(app.instance_path, 'proofread_page_cache')
+app.config['PROOFREAD_PAGE_CACHE_MAX_ENTRIES'] = int(os.getenv('PROOFREAD_PAGE_CACHE_MAX_ENTRIES', 5000))
+
+# Jumlah job analisis (proofread, compare, coherence, restructure) yang berjalan bersamaan di background
+app.config['JOB_MAX_WORKERS'] = int(os.getenv('JOB_MAX_WORKERS', 4))
+# Stream SSE job: komentar keep-alive tiap N detik, dan koneksi ditutup setelah N detik
+# (klien menyambung lagi dengan ?after=...) agar worker tidak tertahan selama job berjalan.
+# Harus jauh di bawah timeout worker gunicorn (sync worker, default 30 detik): worker yang
+# melewati timeout dibunuh master beserta thread job_executor di dalamnya.
+app.config['JOB_STREAM_HEARTBEAT'] = float(os.getenv('JOB_STREAM_HEARTBEAT', 5))
+app.config['JOB_STREAM_MAX_SECONDS'] = float(os.getenv('JOB_STREAM_MAX_SECONDS', 20))
+# Event job yang sudah selesai disimpan sebentar di memori untuk stream yang terlambat tersambung
+app.config['JOB_EVENT_RETENTION_SECONDS'] = float(os.getenv('JOB_EVENT_RETENTION_SECONDS', 120))
+# Tandai job queued/running sebagai error saat proses start (1 = aktif). Default mati: tanpa
+# --preload setiap worker gunicorn mengimpor modul ini, dan worker yang baru start/di-recycle
+# akan menggagalkan job yang masih berjalan di worker lain. Untuk deploy biasa, jalankan
+# `flask fail-orphaned-jobs` sekali sebelum gunicorn dimulai.
+app.config['JOB_STARTUP_SWEEP'] = os.getenv('JOB_STARTUP_SWEEP', '0') == '1'
+
+# Dokumen yang lebih besar dari budget ini dipecah per bab/sub-bab sebelum dikirim ke AI
+app.config['CHUNK_TOKEN_BUDGET'] = int(os.getenv('CHUNK_TOKEN_BUDGET', 30000))
+app.config['CHUNK_OVERLAP_TOKENS'] = int(os.getenv('CHUNK_OVERLAP_TOKENS', 500))
+app.config['CHUNK_MAX_WORKERS'] = int(os.getenv('CHUNK_MAX_WORKERS', 4))
+
+# Thread untuk membuat beberapa varian DOCX (revisi, highlight) secara bersamaan
+app.config['DOCX_MAX_WORKERS'] = int(os.getenv('DOCX_MAX_WORKERS', 4))
+
+# PDF dengan jumlah halaman >= batas ini diekstrak paralel di beberapa proses.
+# Pool dibuat per worker gunicorn, jadi defaultnya hanya separuh CPU agar N worker tidak
+# membuat N x jumlah core proses ekstraksi; atur PDF_EXTRACT_PROCESSES sesuai jumlah worker.
+app.config['PDF_PARALLEL_MIN_PAGES'] = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 64))
+app.config['PDF_EXTRACT_PROCESSES'] = int(os.getenv('PDF_EXTRACT_PROCESSES', max(1, (os.cpu_count() or 1) // 2)))
+
+# Batas jumlah file (termasuk isi ZIP) dalam satu permintaan /api/proofread/batch
+app.config['BATCH_MAX_FILES'] = int(os.getenv('BATCH_MAX_FILES', 100))
+# Batas total ukuran (setelah ekstraksi ZIP) satu batch, dicek dari header ZIP sebelum isi apa pun dibaca
+app.config['BATCH_MAX_TOTAL_MB'] = int(os.getenv('BATCH_MAX_TOTAL_MB', 200))
+
+# Kalimat yang berubah dipasangkan jika kemiripan (Jaccard kata) >= batas ini
+app.config['COMPARE_FUZZY_THRESHOLD'] = float(os.getenv('COMPARE_FUZZY_THRESHOLD', 0.5))
+
+# Batas panggilan ke model AI untuk seluruh aplikasi (0 = tanpa batas) dan retry untuk error sementara
+app.config['MODEL_RATE_PER_MINUTE'] = float(os.getenv('MODEL_RATE_PER_MINUTE', 120))
+app.config['MODEL_BURST'] = int(os.getenv('MODEL_BURST', 10))
+app.config['MODEL_MAX_RETRIES'] = int(os.getenv('MODEL_MAX_RETRIES', 3))
+app.config['MODEL_BACKOFF_BASE'] = float(os.getenv('MODEL_BACKOFF_BASE', 1.0))
+app.config['MODEL_BACKOFF_MAX'] = float(os.getenv('MODEL_BACKOFF_MAX', 30.0))
+# Batas total waktu (detik) satu panggilan beserta semua retry-nya; retry tidak dilakukan jika jedanya melewati batas ini
+app.config['MODEL_RETRY_MAX_SECONDS'] = float(os.getenv('MODEL_RETRY_MAX_SECONDS', 60.0))
+
+# Backend model: 'gemini' (butuh GOOGLE_API_KEY) atau 'fake' (respons lokal untuk load test/benchmark)
+app.config['MODEL_BACKEND'] = os.getenv('MODEL_BACKEND', 'gemini')
+app.config['FAKE_MODEL_LATENCY'] = float(os.getenv('FAKE_MODEL_LATENCY', 0.2))
+app.config['FAKE_MODEL_LATENCY_PER_1K_TOKENS'] = float(os.getenv('FAKE_MODEL_LATENCY_PER_1K_TOKENS', 0))
+app.config['FAKE_MODEL_ERROR_RATE'] = float(os.getenv('FAKE_MODEL_ERROR_RATE', 0))
+app.config['FAKE_MODEL_ERROR_KIND'] = os.getenv('FAKE_MODEL_ERROR_KIND', 'transient')
+
+# Format file hasil yang disimpan: 'gzip' (baris JSON terkompresi per blok, bisa dibaca sebagian) atau 'json' (format lama)
+app.config['RESULTS_STORAGE_FORMAT'] = os.getenv('RESULTS_STORAGE_FORMAT', 'gzip')
+app.config['RESULTS_BLOCK_ROWS'] = int(os.getenv('RESULTS_BLOCK_ROWS', 256))
+
+# Batas 'limit' baris per permintaan /api/get_result_file
+app.config['RESULT_MAX_PAGE_SIZE'] = int(os.getenv('RESULT_MAX_PAGE_SIZE', 1000))
+
+# Jumlah baris riwayat folder per halaman (/api/folder_history) dan batas maksimal 'limit'
+app.config['HISTORY_PAGE_SIZE'] = int(os.getenv('HISTORY_PAGE_SIZE', 50))
+app.config['HISTORY_MAX_PAGE_SIZE'] = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 200))
+
+# Naikkan versi ini setiap kali prompt proofread diubah agar cache lama tidak terpakai
+PROOFREAD_PROMPT_VERSION = 1
+MODEL_NAME = 'gemini-2.5-pro'
+
 db = SQLAlchemy(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -42,17 +145,446 @@ login_manager.login_view = 'login'
 login_manager.login_message = 'Silakan login untuk mengakses halaman ini.'
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(app.config['PROOFREAD_CACHE_DIR'], exist_ok=True)
+os.makedirs(app.config['PROOFREAD_PAGE_CACHE_DIR'], exist_ok=True)
+
+# ==============================================================================
+# ===         METRIK & INSTRUMENTASI (FORMAT PROMETHEUS)          ===
+# ==============================================================================
+
+# Batas bucket histogram durasi (detik)
+METRIC_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+METRIC_HELP = {
+    "app_request_duration_seconds": ("histogram", "Durasi request /api/* per route."),
+    "app_stage_duration_seconds": ("histogram", "Durasi tahap pemrosesan (ekstraksi, model, parsing, docx, dll)."),
+    "app_model_calls_total": ("counter", "Panggilan model AI per fitur dan hasil."),
+    "app_model_retries_total": ("counter", "Retry panggilan model AI karena error sementara."),
+    "app_model_coalesced_total": ("counter", "Panggilan model yang digabung dengan prompt identik yang sedang berjalan."),
+    "app_model_call_duration_seconds": ("histogram", "Durasi panggilan model AI per fitur, termasuk retry."),
+    "app_model_throttle_wait_seconds_total": ("counter", "Waktu menunggu token bucket sebelum memanggil model AI."),
+    "app_model_tokens_total": ("counter", "Token model AI per fitur (prompt/completion)."),
+    "app_proofread_cache_total": ("counter", "Lookup cache proofread per jenis cache dan hasil."),
+    "app_proofread_cache_hit_ratio": ("gauge", "Rasio hit cache proofread sejak proses dimulai."),
+}
+
+class MetricsRegistry:
+    """Histogram dan counter in-process; satu lock, tanpa dependensi tambahan."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        bucket_index = bisect.bisect_left(METRIC_BUCKETS, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(METRIC_BUCKETS) + 1), 0.0, 0]
+            histogram[0][bucket_index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def counter_values(self, name):
+        with self._lock:
+            return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def histogram_values(self, name):
+        """{labels: (jumlah total nilai, jumlah observasi)} untuk satu histogram."""
+        with self._lock:
+            return {labels: (total, count) for (metric, labels), (_, total, count) in self._histograms.items() if metric == name}
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in pairs)
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self, gauges=None):
+        """Teks exposition format Prometheus (text/plain; version=0.0.4)."""
+        with self._lock:
+            histograms = {key: (list(buckets), total, count) for key, (buckets, total, count) in self._histograms.items()}
+            counters = dict(self._counters)
+
+        samples = {}
+        for (name, labels), (buckets, total, count) in histograms.items():
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(METRIC_BUCKETS, buckets):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append(f"{name}{self._format_labels(labels)} {value}")
+        for (name, labels), value in (gauges or {}).items():
+            samples.setdefault(name, []).append(f"{name}{self._format_labels(labels)} {value:.6f}")
+
+        output = []
+        for name in sorted(samples):
+            metric_type, help_text = METRIC_HELP.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(samples[name])
+        return "\n".join(output) + "\n"
+
+metrics = MetricsRegistry()
+
+@contextmanager
+def stage_span(stage):
+    """Mengukur durasi satu tahap ke histogram app_stage_duration_seconds{stage=...}."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe("app_stage_duration_seconds", time.perf_counter() - started, stage=stage)
+
+def timed_stage(stage):
+    """Dekorator versi stage_span untuk fungsi yang seluruhnya termasuk satu tahap."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_cache_lookup(cache_name, hit, count=1):
+    metrics.inc("app_proofread_cache_total", count, cache=cache_name, result="hit" if hit else "miss")
+
+@app.before_request
+def _start_request_timer():
+    if request.path.startswith('/api/'):
+        g.request_started = time.perf_counter()
+
+@app.after_request
+def _observe_request_duration(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Untuk respons streaming (SSE) ini hanya mencakup waktu sampai header dikirim
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe(
+            "app_request_duration_seconds", time.perf_counter() - started,
+            route=route, method=request.method, status=response.status_code
+        )
+    return response
+
+
+class FakeModelResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModelBackend:
+    """
+    Pengganti genai.GenerativeModel untuk load test dan benchmark tanpa API key (MODEL_BACKEND=fake).
+    Respons deterministik (bergantung pada isi prompt) dengan format yang sama persis seperti yang
+    diharapkan parser setiap fitur. Latensi = latency + latency_per_1k_tokens per 1000 token prompt.
+    Sebagian panggilan bisa dibuat gagal (error_rate): 'transient' melempar 503 yang dicoba ulang
+    oleh ModelClient, 'fatal' melempar RuntimeError.
+    """
+
+    # Jumlah prompt gagal yang diingat nomor percobaannya; yang terlama dilupakan lebih dulu
+    MAX_TRACKED_ATTEMPTS = 10000
+
+    def __init__(self, latency=0.2, latency_per_1k_tokens=0.0, error_rate=0.0, error_kind='transient'):
+        self.latency = latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.error_rate = error_rate
+        self.error_kind = error_kind
+        self.calls = 0
+        self.max_prompt_tokens = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        prompt_tokens = estimate_tokens(prompt)
+        prompt_key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._lock:
+            self.calls += 1
+            self.max_prompt_tokens = max(self.max_prompt_tokens, prompt_tokens)
+            attempt = self._attempts.pop(prompt_key, 0) + 1
+        time.sleep(self.latency + self.latency_per_1k_tokens * prompt_tokens / 1000)
+
+        # Keputusan gagal/berhasil juga deterministik: bergantung pada prompt dan percobaan ke-berapa
+        roll = int(hashlib.sha256(f"{attempt}|{prompt_key}".encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+        if roll < self.error_rate:
+            # Hanya prompt yang gagal yang diingat (untuk retry berikutnya), dan jumlahnya dibatasi
+            with self._lock:
+                self._attempts[prompt_key] = attempt
+                while len(self._attempts) > self.MAX_TRACKED_ATTEMPTS:
+                    del self._attempts[next(iter(self._attempts))]
+            if self.error_kind == 'fatal':
+                raise RuntimeError("Kegagalan simulasi dari FakeModelBackend")
+            raise google_exceptions.ServiceUnavailable("Kegagalan sementara simulasi dari FakeModelBackend")
+        return FakeModelResponse(self._respond(prompt, prompt_key))
+
+    @staticmethod
+    def _pick(items, prompt_key, fallback):
+        return items[int(prompt_key[:8], 16) % len(items)] if items else fallback
+
+    def _respond(self, prompt, prompt_key):
+        body = prompt.rsplit('---', 1)[-1]
+
+        if "Kalimat Revisi:" in prompt:
+            match = re.search(r'Kalimat Revisi: "(.*?)"', prompt, re.DOTALL)
+            return json.dumps({
+                "alasan": "Menambahkan detail spesifik.",
+                "kalimat_menyimpang": match.group(1) if match else ""
+            }, ensure_ascii=False)
+
+        if "sub_bab_asal" in prompt:
+            match = re.search(r'DOKUMEN REVISI:\s*---(.*?)\n\s*---', prompt, re.DOTALL)
+            sentences = split_text_into_sentences(match.group(1) if match else "")
+            return json.dumps([{
+                "sub_bab_asal": "1.2 Tujuan Audit",
+                "kalimat_menyimpang": self._pick(sentences, prompt_key, "Kalimat revisi."),
+                "alasan": "1. Makna asli.\n2. Rekomendasi."
+            }], ensure_ascii=False)
+
+        if "misplaced_paragraph" in prompt:
+            paragraphs = [line.strip() for line in body.splitlines() if len(line.strip()) > 40]
+            return json.dumps([{
+                "misplaced_paragraph": self._pick(paragraphs, prompt_key, "Paragraf contoh."),
+                "original_section": "Bab 2.1",
+                "recommended_section": "Bab 4.2"
+            }], ensure_ascii=False)
+
+        sentences = split_text_into_sentences(body.strip())
+        if "[TOPIK UTAMA]" in prompt:
+            if not sentences:
+                return "TIDAK ADA MASALAH KOHERENSI"
+            sentence = self._pick(sentences, prompt_key, "")
+            return f"[TOPIK UTAMA] Rencana Kerja -> [TEKS ASLI] {sentence} -> [SARAN REVISI] {sentence.rstrip('.')} secara konsisten."
+
+        # Proofread: satu kata dari teks yang diperiksa, agar revisi/highlight benar-benar menemukan kata itu
+        sentence = self._pick(sentences, prompt_key, "")
+        words = [word for word in re.findall(r'\w+', sentence) if len(word) >= 4]
+        if not words:
+            return "TIDAK ADA KESALAHAN"
+        word = self._pick(words, prompt_key[8:], words[0])
+        correction = word.lower() if word[0].isupper() else word.capitalize()
+        return f"[SALAH] {word} -> [BENAR] {correction} -> [KALIMAT] {sentence}"
+
+def create_model_backend(backend_name):
+    """Membuat backend model sesuai MODEL_BACKEND: 'gemini' (default) atau 'fake'."""
+    if backend_name == 'fake':
+        return FakeModelBackend(
+            latency=app.config['FAKE_MODEL_LATENCY'],
+            latency_per_1k_tokens=app.config['FAKE_MODEL_LATENCY_PER_1K_TOKENS'],
+            error_rate=app.config['FAKE_MODEL_ERROR_RATE'],
+            error_kind=app.config['FAKE_MODEL_ERROR_KIND']
+        )
+    if backend_name == 'gemini':
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY tidak ditemukan di file .env")
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(MODEL_NAME)
+    raise ValueError(f"MODEL_BACKEND tidak dikenal: {backend_name}")
 
 try:
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY tidak ditemukan di file .env")
-    
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.5-pro') 
+    model = create_model_backend(app.config['MODEL_BACKEND'])
 except Exception as e:
     print(f"Error saat mengkonfigurasi Google AI: {e}")
 
+# ==============================================================================
+# ===         KLIEN MODEL AI BERSAMA (RATE LIMIT, RETRY, COALESCING)          ===
+# ==============================================================================
+
+# Error sementara dari API yang layak dicoba ulang (kuota, server sibuk, koneksi putus).
+# Timeout (DeadlineExceeded/TimeoutError) sengaja tidak dicoba ulang: batas waktu per panggilan
+# sudah habis, dan mengulanginya hanya melipatgandakan waktu tunggu user.
+TRANSIENT_MODEL_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    ConnectionError,
+)
+
+class ModelClient:
+    """
+    Satu-satunya jalur ke model AI untuk semua fitur:
+    - token bucket (MODEL_RATE_PER_MINUTE, MODEL_BURST) agar lonjakan permintaan antre, bukan gagal;
+    - retry dengan exponential backoff + jitter untuk error sementara;
+    - single-flight: prompt identik yang sedang berjalan cukup dikirim sekali, hasilnya dibagi;
+    - metrik latensi/error per fitur, dicatat ke MetricsRegistry (`metrics`).
+    """
+
+    def __init__(self):
+        self._bucket_lock = threading.Lock()
+        self._tokens = None
+        self._last_refill = time.monotonic()
+        self._in_flight_lock = threading.Lock()
+        self._in_flight = {}
+
+    def generate(self, prompt, feature, timeout=None):
+        """Memanggil model dan mengembalikan objek respons (punya atribut .text). Error terakhir dilempar ulang."""
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        with self._in_flight_lock:
+            shared = self._in_flight.get(key)
+            is_leader = shared is None
+            if is_leader:
+                shared = Future()
+                self._in_flight[key] = shared
+
+        if not is_leader:
+            self._record(feature, coalesced=1)
+            return shared.result()
+
+        try:
+            response = self._generate_with_retry(prompt, feature, timeout)
+            shared.set_result(response)
+            return response
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+    def _generate_with_retry(self, prompt, feature, timeout):
+        max_retries = app.config['MODEL_MAX_RETRIES']
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            self._record(feature, throttle_wait=self._acquire())
+            try:
+                with stage_span('model_call'):
+                    if timeout:
+                        response = model.generate_content(prompt, request_options={"timeout": timeout})
+                    else:
+                        response = model.generate_content(prompt)
+                self._record(feature, calls=1, latency=time.perf_counter() - started)
+                self._record_tokens(feature, prompt, response)
+                return response
+            except TRANSIENT_MODEL_ERRORS as e:
+                # Full jitter: jeda acak antara 0 dan batas backoff, agar retry dari banyak user tidak serentak
+                backoff = min(app.config['MODEL_BACKOFF_MAX'], app.config['MODEL_BACKOFF_BASE'] * (2 ** attempt))
+                delay = random.uniform(0, backoff)
+                elapsed = time.perf_counter() - started
+                if attempt >= max_retries or elapsed + delay > app.config['MODEL_RETRY_MAX_SECONDS']:
+                    self._record(feature, calls=1, errors=1, latency=elapsed)
+                    raise
+                print(f"Panggilan AI ({feature}) gagal sementara: {e}. Coba lagi dalam {delay:.1f} detik")
+                self._record(feature, retries=1)
+                attempt += 1
+                time.sleep(delay)
+            except Exception:
+                self._record(feature, calls=1, errors=1, latency=time.perf_counter() - started)
+                raise
+
+    @staticmethod
+    def _record_tokens(feature, prompt, response):
+        """Jumlah token dari usage_metadata Gemini; jika tidak tersedia, pakai estimasi panjang teks."""
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None) or estimate_tokens(prompt)
+        completion_tokens = getattr(usage, 'candidates_token_count', None)
+        if not completion_tokens:
+            try:
+                completion_tokens = estimate_tokens(response.text)
+            except Exception:
+                completion_tokens = 0
+        metrics.inc("app_model_tokens_total", prompt_tokens, feature=feature, kind="prompt")
+        metrics.inc("app_model_tokens_total", completion_tokens, feature=feature, kind="completion")
+
+    def _acquire(self):
+        """Mengambil satu token dari bucket, menunggu jika habis. Mengembalikan lama menunggu (detik)."""
+        waited = 0.0
+        while True:
+            rate = app.config['MODEL_RATE_PER_MINUTE']
+            if rate <= 0:
+                return waited
+            capacity = max(1, app.config['MODEL_BURST'])
+            with self._bucket_lock:
+                now = time.monotonic()
+                if self._tokens is None:
+                    self._tokens = capacity
+                else:
+                    self._tokens = min(capacity, self._tokens + (now - self._last_refill) * rate / 60)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                sleep_time = (1 - self._tokens) * 60 / rate
+            time.sleep(sleep_time)
+            waited += sleep_time
+
+    def _record(self, feature, calls=0, errors=0, retries=0, coalesced=0, latency=None, throttle_wait=0.0):
+        if calls:
+            metrics.inc("app_model_calls_total", calls, feature=feature, outcome="error" if errors else "ok")
+        if retries:
+            metrics.inc("app_model_retries_total", retries, feature=feature)
+        if coalesced:
+            metrics.inc("app_model_coalesced_total", coalesced, feature=feature)
+        if throttle_wait:
+            metrics.inc("app_model_throttle_wait_seconds_total", throttle_wait, feature=feature)
+        if latency is not None:
+            metrics.observe("app_model_call_duration_seconds", latency, feature=feature)
+
+    @staticmethod
+    def metrics():
+        """Ringkasan metrik per fitur yang dibaca dari MetricsRegistry (untuk /api/model/metrics)."""
+        summary = {}
+        def stats_for(labels):
+            feature = dict(labels)['feature']
+            return summary.setdefault(feature, {
+                "calls": 0, "errors": 0, "retries": 0, "coalesced": 0,
+                "latency_total": 0.0, "latency_avg": 0.0, "throttle_wait_total": 0.0
+            })
+        for labels, value in metrics.counter_values("app_model_calls_total").items():
+            stats = stats_for(labels)
+            stats["calls"] += value
+            if dict(labels)['outcome'] == 'error':
+                stats["errors"] += value
+        for labels, value in metrics.counter_values("app_model_retries_total").items():
+            stats_for(labels)["retries"] += value
+        for labels, value in metrics.counter_values("app_model_coalesced_total").items():
+            stats_for(labels)["coalesced"] += value
+        for labels, value in metrics.counter_values("app_model_throttle_wait_seconds_total").items():
+            stats_for(labels)["throttle_wait_total"] += value
+        for labels, (total, count) in metrics.histogram_values("app_model_call_duration_seconds").items():
+            stats = stats_for(labels)
+            stats["latency_total"] = total
+            stats["latency_avg"] = total / count if count else 0.0
+        return summary
+
+model_client = ModelClient()
+
+# Pool bersama untuk proofreading per halaman, dibatasi agar satu dokumen besar
+# tidak menghabiskan kuota model untuk user lain.
+proofread_executor = ThreadPoolExecutor(
+    max_workers=app.config['PROOFREAD_MAX_WORKERS'],
+    thread_name_prefix='proofread'
+)
+
+# Pool terpisah untuk job analisis agar job tidak mengantri di belakang panggilan per halaman
+job_executor = ThreadPoolExecutor(
+    max_workers=app.config['JOB_MAX_WORKERS'],
+    thread_name_prefix='analysis-job'
+)
+
+# Pool untuk potongan dokumen (coherence, restructure, compare per sub-bab)
+chunk_executor = ThreadPoolExecutor(
+    max_workers=app.config['CHUNK_MAX_WORKERS'],
+    thread_name_prefix='chunk'
+)
+
+# Pool untuk membuat varian DOCX secara bersamaan (download ZIP)
+docx_executor = ThreadPoolExecutor(
+    max_workers=app.config['DOCX_MAX_WORKERS'],
+    thread_name_prefix='docx'
+)
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True, nullable=False)
@@ -121,7 +653,11 @@ class Comment(db.Model):
     # Relasi untuk memudahkan query (opsional tapi sangat membantu)
     replies = db.relationship('Comment', backref=db.backref('parent', remote_side=[id]), lazy='dynamic')
     
-    __table_args__ = (db.UniqueConstraint('owner_id', 'folder_name', 'filename', 'row_id', name='_unique_comment_target'),)
+    # Satu baris bisa punya banyak komentar dan balasan, jadi keunikan per baris diganti dengan
+    # keunikan per komentar; index ini sekaligus dipakai query komentar per file (owner_id, folder, file)
+    __table_args__ = (
+        db.Index('ix_comment_owner_folder_file_row', 'owner_id', 'folder_name', 'filename', 'row_id', 'id', unique=True),
+    )
 
 class RowAction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -141,6 +677,24 @@ class RowAction(db.Model):
     
     __table_args__ = (db.UniqueConstraint('owner_id', 'folder_name', 'filename', 'row_id', name='_unique_row_action'),)
 
+class ResultCatalog(db.Model):
+    """Katalog file hasil analisis yang disimpan di folder (menggantikan parsing nama file saat membaca riwayat)."""
+    id = db.Column(db.Integer, primary_key=True)
+
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    folder_name = db.Column(db.String(200), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+
+    feature_type = db.Column(db.String(50), nullable=False)
+    original_name = db.Column(db.String(255), nullable=False)
+    # Waktu yang sama dengan timestamp di nama file
+    created_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('owner_id', 'folder_name', 'filename', name='_unique_result_file'),
+        db.Index('ix_result_catalog_owner_folder_created', 'owner_id', 'folder_name', 'created_at'),
+    )
+
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -156,6 +710,29 @@ class Message(db.Model):
     sender = db.relationship('User', foreign_keys=[sender_id], backref='sent_messages')
     recipient = db.relationship('User', foreign_keys=[recipient_id], backref='received_messages')
 
+class AnalysisJob(db.Model):
+    # ID acak (uuid hex) agar tidak bisa ditebak oleh user lain
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # Log analisis yang dibuat otomatis saat job dikirim
+    log_id = db.Column(db.Integer, db.ForeignKey('analysis_log.id'), nullable=True)
+
+    feature_type = db.Column(db.String(50), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, running, done, error
+    progress = db.Column(db.Integer, nullable=False, default=0) # 0 - 100
+    result = db.Column(db.Text, nullable=True) # JSON hasil analisis
+    error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Relasi
+    user = db.relationship('User', backref='analysis_jobs')
+    log = db.relationship('AnalysisLog')
+
 # >>>>>> REVISION END <<<<<<
 
 @login_manager.user_loader
@@ -186,6 +763,132 @@ def create_db_command():
         
         db.session.commit()
         print("Database dan user awal telah selesai dibuat.")
+
+@app.cli.command("migrate-comments")
+def migrate_comments_command():
+    """
+    Migrasi tabel komentar lama:
+    1. Database lama punya UNIQUE (owner_id, folder_name, filename, row_id), sehingga balasan pada baris yang sama
+       gagal disimpan. Tabel dibangun ulang dengan UNIQUE index (owner_id, folder_name, filename, row_id, id)
+       (SQLite tidak bisa DROP CONSTRAINT). Index lama yang belum unique juga dibuat ulang.
+    2. Komentar lama disimpan dengan owner_id = pemberi komentar. Untuk komentar di folder yang di-share,
+       owner_id dipindahkan ke pemilik folder hanya jika tepat satu pemilik yang men-share folder itu
+       benar-benar punya file tersebut. Jika lebih dari satu, migrasi dibatalkan tanpa mengubah owner_id
+       dan komentar yang ambigu ditampilkan agar diperbaiki manual.
+    """
+    inspector = sqlalchemy.inspect(db.engine)
+    unique_columns = [constraint['column_names'] for constraint in inspector.get_unique_constraints('comment')]
+    if ['owner_id', 'folder_name', 'filename', 'row_id'] in unique_columns:
+        columns = ", ".join(column.name for column in Comment.__table__.columns)
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE comment RENAME TO comment_old")
+            Comment.__table__.create(conn)
+            conn.exec_driver_sql(f"INSERT INTO comment ({columns}) SELECT {columns} FROM comment_old")
+            conn.exec_driver_sql("DROP TABLE comment_old")
+        print("Tabel comment dibangun ulang dengan UNIQUE per komentar.")
+    else:
+        comment_index = next(
+            (index for index in inspector.get_indexes('comment') if index['name'] == 'ix_comment_owner_folder_file_row'),
+            None
+        )
+        if comment_index is not None and not comment_index['unique']:
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("DROP INDEX ix_comment_owner_folder_file_row")
+                for index in Comment.__table__.indexes:
+                    index.create(conn)
+            print("Index comment dibuat ulang sebagai UNIQUE.")
+
+    upload_root = app.config['UPLOAD_FOLDER']
+    moves = []
+    ambiguous = []
+    unresolved = 0
+    for comment in Comment.query.all():
+        if os.path.isfile(os.path.join(upload_root, str(comment.owner_id), comment.folder_name, comment.filename)):
+            continue
+        shares = SharedFolder.query.filter_by(shared_with_id=comment.owner_id, folder_name=comment.folder_name).all()
+        owners = sorted({
+            share.owner_id for share in shares
+            if os.path.isfile(os.path.join(upload_root, str(share.owner_id), comment.folder_name, comment.filename))
+        })
+        if len(owners) == 1:
+            moves.append((comment, owners[0]))
+        elif owners:
+            ambiguous.append((comment, owners))
+        else:
+            unresolved += 1
+
+    if ambiguous:
+        print(f"Migrasi dibatalkan: {len(ambiguous)} komentar punya lebih dari satu kemungkinan pemilik.")
+        for comment, owners in ambiguous:
+            print(f"  komentar id={comment.id} folder='{comment.folder_name}' file='{comment.filename}' kandidat owner_id={owners}")
+        print("Perbaiki owner_id komentar tersebut secara manual, lalu jalankan ulang perintah ini.")
+        raise SystemExit(1)
+
+    for comment, owner_id in moves:
+        comment.owner_id = owner_id
+    db.session.commit()
+    print(f"{len(moves)} komentar dipindahkan ke pemilik hasil.")
+    if unresolved:
+        print(f"{unresolved} komentar tidak dipindahkan: file hasilnya tidak ditemukan di folder pemilik mana pun.")
+
+@app.cli.command("compress-results")
+def compress_results_command():
+    """Mengubah file hasil lama (JSON biasa) di data/<user>/<folder>/ ke format 'gzip'."""
+    upload_root = app.config['UPLOAD_FOLDER']
+    converted, skipped, bytes_before, bytes_after = 0, 0, 0, 0
+    for owner_dir in sorted(os.listdir(upload_root)):
+        owner_path = os.path.join(upload_root, owner_dir)
+        if not owner_dir.isdigit() or not os.path.isdir(owner_path):
+            continue
+        for folder_name in sorted(os.listdir(owner_path)):
+            folder_path = os.path.join(owner_path, folder_name)
+            if not os.path.isdir(folder_path):
+                continue
+            for filename in sorted(os.listdir(folder_path)):
+                file_path = os.path.join(folder_path, filename)
+                if not filename.endswith('.json') or not os.path.isfile(file_path):
+                    continue
+                with open(file_path, 'rb') as f:
+                    raw = f.read()
+                try:
+                    data = None if raw[:2] == GZIP_MAGIC else json.loads(raw.decode('utf-8'))
+                except ValueError as e:
+                    print(f"Lewati {file_path}: bukan JSON yang valid ({e})")
+                    data = None
+                if not isinstance(data, list):
+                    skipped += 1
+                    continue
+                write_result_rows(file_path, data, storage_format='gzip')
+                converted += 1
+                bytes_before += len(raw)
+                bytes_after += os.path.getsize(file_path)
+    print(f"{converted} file dikonversi ({bytes_before} -> {bytes_after} bytes), {skipped} file dilewati.")
+
+@app.cli.command("fail-orphaned-jobs")
+def fail_orphaned_jobs_command():
+    """Menandai job analisis yang masih queued/running sebagai error. Jalankan saat tidak ada worker yang hidup."""
+    if not fail_orphaned_jobs():
+        print("Tidak ada job analisis yang terputus.")
+
+@app.cli.command("backfill-result-catalog")
+def backfill_result_catalog_command():
+    """Mendaftarkan file hasil lama (disimpan sebelum ada katalog) ke tabel ResultCatalog."""
+    with app.app_context():
+        db.create_all()
+        upload_root = app.config['UPLOAD_FOLDER']
+        added = 0
+        for owner_dir in sorted(os.listdir(upload_root)):
+            owner_path = os.path.join(upload_root, owner_dir)
+            if not owner_dir.isdigit() or not os.path.isdir(owner_path):
+                continue
+            owner_id = int(owner_dir)
+            for folder_name in sorted(os.listdir(owner_path)):
+                folder_path = os.path.join(owner_path, folder_name)
+                if not os.path.isdir(folder_path):
+                    continue
+                added += _backfill_folder_catalog(owner_id, folder_name, folder_path)
+        db.session.commit()
+        print(f"{added} file hasil ditambahkan ke katalog.")
 # ==============================================================================
 
 
@@ -274,32 +977,239 @@ def get_user_folders():
 
     return my_folders
 
-def _extract_text_with_pages(file_bytes, file_extension):
-    pages_content = []
+def _etag_for(*parts):
+    """ETag dari validator (mtime/ukuran file, versi baris DB, parameter permintaan)."""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _table_version(query, model):
+    """Versi baris untuk tabel yang hanya ditambah/dihapus (tidak di-update): (jumlah, id terbesar)."""
+    return list(query.with_entities(db.func.count(model.id), db.func.max(model.id)).one())
+
+def _conditional_json(etag, build_payload):
+    """
+    Mengembalikan 304 jika If-None-Match cocok dengan etag; jika tidak, membangun payload
+    (bagian yang mahal) dan mengirimnya bersama ETag. Dipakai juga untuk endpoint POST,
+    sehingga tidak bisa mengandalkan make_conditional (yang hanya untuk GET/HEAD).
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build_payload())
+    response.set_etag(etag)
+    # Boleh disimpan di browser, tapi selalu divalidasi ulang ke server
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _folders_etag():
+    """Validator daftar folder: mtime root user (folder dibuat/dihapus) + baris share + mtime root pemiliknya."""
+    root_folder = get_user_root_folder()
+    shares = SharedFolder.query.with_entities(SharedFolder.id, SharedFolder.owner_id) \
+        .filter_by(shared_with_id=current_user.id).order_by(SharedFolder.id).all()
+    owner_roots = {}
+    for _, share_owner_id in shares:
+        owner_root = os.path.join(app.config['UPLOAD_FOLDER'], str(share_owner_id))
+        owner_roots[share_owner_id] = os.stat(owner_root).st_mtime_ns if os.path.isdir(owner_root) else None
+    return _etag_for(
+        "folders", current_user.id, os.stat(root_folder).st_mtime_ns,
+        [share_id for share_id, _ in shares], owner_roots
+    )
+
+def iter_text_pages(file_bytes, file_extension):
+    """
+    Versi generator dari _extract_text_with_pages: teks setiap halaman PDF diambil
+    saat dibutuhkan, sehingga memori tidak bertambah sesuai jumlah halaman dokumen.
+    """
     if file_extension == 'pdf':
         try:
             pdf_document = fitz.open(stream=file_bytes, filetype="pdf")
-            for page_num, page in enumerate(pdf_document):
-                pages_content.append({"halaman": page_num + 1, "teks": page.get_text()})
-            pdf_document.close()
         except Exception as e:
             raise ValueError(f"Gagal membaca file PDF: {e}")
+        try:
+            for page_num in range(pdf_document.page_count):
+                try:
+                    with stage_span('extraction'):
+                        text = pdf_document.load_page(page_num).get_text()
+                except Exception as e:
+                    raise ValueError(f"Gagal membaca file PDF: {e}")
+                yield {"halaman": page_num + 1, "teks": text}
+        finally:
+            pdf_document.close()
     elif file_extension == 'docx':
         try:
-            doc = docx.Document(io.BytesIO(file_bytes))
-            full_text = "\n".join([para.text for para in doc.paragraphs])
-            pages_content.append({"halaman": 1, "teks": full_text})
+            with stage_span('extraction'):
+                doc = docx.Document(io.BytesIO(file_bytes))
+                full_text = "\n".join([para.text for para in doc.paragraphs])
         except Exception as e:
             raise ValueError(f"Gagal membaca file DOCX: {e}")
+        yield {"halaman": 1, "teks": full_text}
     else:
         raise ValueError("Format file tidak didukung. Harap unggah .pdf atau .docx")
-    return pages_content
 
-def _get_text_from_flask_file(file):
-    file_bytes = file.read()
-    file.seek(0) 
-    file_extension = file.filename.split('.')[-1].lower()
-    return _extract_text_with_pages(file_bytes, file_extension)
+pdf_process_pool = None
+pdf_process_pool_size = 0
+pdf_process_pool_lock = threading.Lock()
+
+def _get_pdf_process_pool():
+    """
+    Process pool dibuat saat pertama kali dibutuhkan (per proses worker gunicorn).
+    Memakai 'spawn', bukan fork: proses ini sudah menjalankan banyak thread (pool, lock,
+    koneksi database) dan fork hanya menyalin thread pemanggil beserta lock yang mungkin
+    sedang terkunci.
+    """
+    global pdf_process_pool, pdf_process_pool_size
+    processes = max(1, app.config['PDF_EXTRACT_PROCESSES'])
+    with pdf_process_pool_lock:
+        if pdf_process_pool is None or pdf_process_pool_size != processes:
+            if pdf_process_pool is not None:
+                pdf_process_pool.shutdown(wait=False)
+            pdf_process_pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            pdf_process_pool_size = processes
+        return pdf_process_pool, processes
+
+def iter_pdf_pages_parallel(file_bytes, page_count):
+    """
+    Membagi halaman PDF ke beberapa rentang, mengekstraknya di process pool, lalu menghasilkan
+    halaman satu per satu sesuai urutan begitu rentangnya selesai. Hanya sekitar dua rentang per
+    proses yang dikerjakan sekaligus, sehingga teks yang tertahan di memori tetap terbatas.
+    Setiap proses membuka file sementara yang sama, jadi bytes PDF tidak perlu dikirim ke setiap proses.
+    """
+    pool, processes = _get_pdf_process_pool()
+    # Beberapa rentang per proses agar beban tetap rata jika ada halaman yang berat
+    range_count = min(page_count, processes * 4)
+    boundaries = [page_count * i // range_count for i in range(range_count + 1)]
+    ranges = [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
+        tmp_file.write(file_bytes)
+        pdf_path = tmp_file.name
+    pending = []
+    try:
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < processes * 2:
+                start, end = ranges[next_range]
+                pending.append(pool.submit(extract_page_range, pdf_path, start, end))
+                next_range += 1
+            try:
+                with stage_span('extraction'):
+                    pages = pending.pop(0).result()
+            except Exception as e:
+                raise ValueError(f"Gagal membaca file PDF: {e}")
+            yield from pages
+    finally:
+        # Pemanggil bisa berhenti di tengah jalan (generator ditutup): batalkan sisa rentang
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        os.remove(pdf_path)
+
+def _parallel_pdf_page_count(file_bytes, page_count=None):
+    """Jumlah halaman jika PDF ini cukup besar untuk diekstrak di process pool; None jika tidak."""
+    if app.config['PDF_EXTRACT_PROCESSES'] <= 1:
+        return None
+    if page_count is None:
+        try:
+            with fitz.open(stream=file_bytes, filetype="pdf") as pdf_document:
+                page_count = pdf_document.page_count
+        except Exception as e:
+            raise ValueError(f"Gagal membaca file PDF: {e}")
+    return page_count if page_count >= app.config['PDF_PARALLEL_MIN_PAGES'] else None
+
+def _extract_text_with_pages(file_bytes, file_extension):
+    if file_extension == 'pdf':
+        page_count = _parallel_pdf_page_count(file_bytes)
+        if page_count:
+            return list(iter_pdf_pages_parallel(file_bytes, page_count))
+    return list(iter_text_pages(file_bytes, file_extension))
+
+class ParsedDocument:
+    """
+    Representasi satu file unggahan yang dibaca sekali saja. Setiap turunan (hash, halaman,
+    paragraf, kalimat, pohon docx) baru dihitung saat pertama kali dipakai lalu disimpan,
+    sehingga endpoint dan generator tidak perlu membaca/parsing ulang file yang sama.
+    """
+
+    def __init__(self, raw_bytes, filename):
+        self.raw_bytes = raw_bytes
+        self.filename = filename
+        self.extension = filename.split('.')[-1].lower()
+
+    @classmethod
+    def from_upload(cls, file):
+        """Membaca objek file Flask (FileStorage) satu kali."""
+        return cls(file.read(), file.filename)
+
+    @cached_property
+    def content_hash(self):
+        return hashlib.sha256(self.raw_bytes).hexdigest()
+
+    @cached_property
+    def docx_tree(self):
+        """Objek python-docx (hanya untuk .docx). Jangan diubah; gunakan editable_docx() untuk revisi."""
+        if self.extension != 'docx':
+            return None
+        try:
+            with stage_span('extraction'):
+                return docx.Document(io.BytesIO(self.raw_bytes))
+        except Exception as e:
+            raise ValueError(f"Gagal membaca file DOCX: {e}")
+
+    def editable_docx(self):
+        """Salinan pohon docx yang boleh diubah (deepcopy package lebih murah daripada parsing ulang ZIP)."""
+        if self.docx_tree is None:
+            raise ValueError("File hasil revisi hanya bisa dibuat dari file .docx")
+        # Salin seluruh package, bukan hanya objek Document, agar perubahan ikut tersimpan saat save()
+        package_copy = copy.deepcopy(self.docx_tree.part.package)
+        return package_copy.main_document_part.document
+
+    @cached_property
+    def pages(self):
+        if self.extension == 'docx':
+            full_text = "\n".join([para.text for para in self.docx_tree.paragraphs])
+            return [{"halaman": 1, "teks": full_text}]
+        return _extract_text_with_pages(self.raw_bytes, self.extension)
+
+    def iter_pages(self):
+        """
+        Halaman satu per satu. Jika `pages` sudah pernah dihitung, daftar itu yang dipakai;
+        jika belum, halaman PDF diekstrak secara lazy tanpa disimpan semuanya di memori
+        (PDF besar lewat process pool, tetap berurutan).
+        """
+        if 'pages' in self.__dict__ or self.extension == 'docx':
+            return iter(self.pages)
+        if self.extension == 'pdf':
+            page_count = _parallel_pdf_page_count(self.raw_bytes, self.page_count)
+            if page_count:
+                return iter_pdf_pages_parallel(self.raw_bytes, page_count)
+        return iter_text_pages(self.raw_bytes, self.extension)
+
+    @cached_property
+    def page_count(self):
+        if 'pages' in self.__dict__ or self.extension != 'pdf':
+            return len(self.pages)
+        try:
+            with fitz.open(stream=self.raw_bytes, filetype="pdf") as pdf_document:
+                return pdf_document.page_count
+        except Exception as e:
+            raise ValueError(f"Gagal membaca file PDF: {e}")
+
+    @cached_property
+    def full_text(self):
+        return "\n".join([page['teks'] for page in self.pages])
+
+    @cached_property
+    def paragraphs(self):
+        if self.docx_tree is None:
+            raise ValueError("Gagal membaca file docx: format file bukan .docx")
+        return [p.text for p in self.docx_tree.paragraphs if p.text.strip() != ""]
+
+    @cached_property
+    def sentences(self):
+        return extract_sentences_with_pages(self.iter_pages())
 
 def extract_sentences_with_pages(pages_content):
     sentences_with_pages = []
@@ -311,15 +1221,7 @@ def extract_sentences_with_pages(pages_content):
             sentences_with_pages.append({'sentence': sentence, 'page': page_num})
     return sentences_with_pages
 
-def _get_full_text_from_file(file):
-    file_bytes = file.read()
-    file.seek(0)
-    file_extension = file.filename.split('.')[-1].lower()
-    
-    pages = _extract_text_with_pages(file_bytes, file_extension)
-    return "\n".join([page['teks'] for page in pages])
-
-def proofread_with_gemini(text_to_check):
+def proofread_with_gemini(text_to_check, timeout=None):
     if not text_to_check or text_to_check.isspace():
         return []
     prompt = f"""
@@ -359,14 +1261,288 @@ def proofread_with_gemini(text_to_check):
     {text_to_check}
     """
     try:
-        response = model.generate_content(prompt)
-        pattern = re.compile(r"\[SALAH\]\s*(.*?)\s*->\s*\[BENAR\]\s*(.*?)\s*->\s*\[KALIMAT\]\s*(.*?)\s*(\n|$)", re.IGNORECASE | re.DOTALL)
-        found_errors = pattern.findall(response.text)
-        return [{"salah": salah.strip(), "benar": benar.strip(), "kalimat": kalimat.strip()} for salah, benar, kalimat, _ in found_errors]
+        response = model_client.generate(prompt, 'proofread', timeout)
+        with stage_span('response_parse'):
+            pattern = re.compile(r"\[SALAH\]\s*(.*?)\s*->\s*\[BENAR\]\s*(.*?)\s*->\s*\[KALIMAT\]\s*(.*?)\s*(\n|$)", re.IGNORECASE | re.DOTALL)
+            found_errors = pattern.findall(response.text)
+            return [{"salah": salah.strip(), "benar": benar.strip(), "kalimat": kalimat.strip()} for salah, benar, kalimat, _ in found_errors]
     except Exception as e:
         print(f"Terjadi kesalahan saat menghubungi AI: {e}")
         return [{"salah": "ERROR", "benar": str(e), "kalimat": "Gagal menghubungi API"}]
 
+# ==============================================================================
+# ===         CACHE HASIL PROOFREAD (CONTENT-ADDRESSED)        ===
+# ==============================================================================
+
+proofread_cache_lock = threading.Lock()
+
+def _model_cache_tag():
+    """Nama model untuk kunci cache; backend selain gemini diberi prefix agar tidak bercampur dengan hasil asli."""
+    backend_name = app.config['MODEL_BACKEND']
+    return MODEL_NAME if backend_name == 'gemini' else f"{backend_name}-{MODEL_NAME}"
+
+def _proofread_cache_key(content_hash):
+    """Kunci cache: hash isi file + versi prompt + nama model."""
+    payload = f"{content_hash}|prompt-v{PROOFREAD_PROMPT_VERSION}|{_model_cache_tag()}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _normalize_page_text(text):
+    """Normalisasi whitespace agar perbedaan spasi/baris baru tidak membatalkan memo."""
+    return re.sub(r'\s+', ' ', text or '').strip()
+
+def _page_memo_key(normalized_text):
+    """Kunci memo per halaman: hash teks halaman yang sudah dinormalisasi + versi prompt + nama model."""
+    payload = f"{normalized_text}|prompt-v{PROOFREAD_PROMPT_VERSION}|{_model_cache_tag()}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _has_api_error(found_errors):
+    return any(error.get('salah') == 'ERROR' for error in found_errors)
+
+def _json_cache_get(cache_dir, cache_key):
+    cache_path = os.path.join(cache_dir, f"{cache_key}.json")
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        # Perbarui mtime sebagai penanda LRU
+        os.utime(cache_path, None)
+        return cached
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Gagal membaca cache {cache_key}: {e}")
+        return None
+
+def _json_cache_put(cache_dir, cache_key, value):
+    cache_path = os.path.join(cache_dir, f"{cache_key}.json")
+    tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Gagal menyimpan cache {cache_key}: {e}")
+
+def _json_cache_evict(cache_dir, max_entries):
+    """Menghapus entri yang paling lama tidak dipakai (LRU berdasarkan mtime)."""
+    try:
+        with proofread_cache_lock:
+            entries = [
+                os.path.join(cache_dir, name) for name in os.listdir(cache_dir)
+                if name.endswith('.json')
+            ]
+            overflow = len(entries) - max_entries
+            if overflow > 0:
+                entries.sort(key=os.path.getmtime)
+                for old_path in entries[:overflow]:
+                    os.remove(old_path)
+    except Exception as e:
+        print(f"Gagal membersihkan cache di {cache_dir}: {e}")
+
+def proofread_cache_get(cache_key):
+    return _json_cache_get(app.config['PROOFREAD_CACHE_DIR'], cache_key)
+
+def proofread_cache_put(cache_key, page_results):
+    _json_cache_put(app.config['PROOFREAD_CACHE_DIR'], cache_key, page_results)
+    _json_cache_evict(app.config['PROOFREAD_CACHE_DIR'], app.config['PROOFREAD_CACHE_MAX_ENTRIES'])
+
+def _proofread_page_task(text_to_check, timeout, memo_key):
+    """Dijalankan di proofread_executor: proofread satu halaman lalu simpan ke memo."""
+    found_errors = proofread_with_gemini(text_to_check, timeout)
+    if not _has_api_error(found_errors):
+        _json_cache_put(app.config['PROOFREAD_PAGE_CACHE_DIR'], memo_key, found_errors)
+    return found_errors
+
+def iter_proofread_pages(document_pages, stats=None):
+    """
+    Menjalankan proofread_with_gemini untuk setiap halaman secara paralel di pool bersama
+    dan menghasilkan (index, page, found_errors) segera setelah setiap halaman selesai.
+    `document_pages` boleh berupa generator: halaman baru diambil hanya jika jumlah halaman
+    yang sedang diproses di bawah PROOFREAD_MAX_IN_FLIGHT, sehingga memori tetap terbatas.
+    Halaman yang teksnya sudah pernah diperiksa diambil dari memo per halaman,
+    hanya halaman yang berubah yang dikirim ke AI.
+    Jika `stats` (dict) diberikan, jumlah 'hits' dan 'misses' memo ditambahkan ke sana.
+    """
+    timeout = app.config['PROOFREAD_CALL_TIMEOUT']
+    memo_dir = app.config['PROOFREAD_PAGE_CACHE_DIR']
+    max_in_flight = app.config['PROOFREAD_MAX_IN_FLIGHT']
+    if stats is not None:
+        stats.setdefault('hits', 0)
+        stats.setdefault('misses', 0)
+
+    def collect(future):
+        index, page = in_flight.pop(future)
+        try:
+            found_errors = future.result()
+        except Exception as e:
+            print(f"Gagal proofread halaman {page['halaman']}: {e}")
+            found_errors = [{"salah": "ERROR", "benar": str(e), "kalimat": "Gagal menghubungi API"}]
+        return index, page, found_errors
+
+    in_flight = {}
+    any_miss = False
+    for index, page in enumerate(document_pages):
+        normalized_text = _normalize_page_text(page['teks'])
+        if not normalized_text:
+            yield index, page, []
+            continue
+
+        memo_key = _page_memo_key(normalized_text)
+        cached = _json_cache_get(memo_dir, memo_key)
+        record_cache_lookup('page', cached is not None)
+        if cached is not None:
+            if stats is not None:
+                stats['hits'] += 1
+            yield index, page, cached
+            continue
+
+        any_miss = True
+        if stats is not None:
+            stats['misses'] += 1
+        future = proofread_executor.submit(_proofread_page_task, page['teks'], timeout, memo_key)
+        in_flight[future] = (index, page)
+
+        # Tunggu sampai ada slot kosong sebelum membaca halaman berikutnya
+        while len(in_flight) >= max_in_flight:
+            done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+            for finished in done:
+                yield collect(finished)
+
+    for finished in as_completed(list(in_flight)):
+        yield collect(finished)
+
+    if any_miss:
+        _json_cache_evict(memo_dir, app.config['PROOFREAD_PAGE_CACHE_MAX_ENTRIES'])
+
+def proofread_pages_concurrently(document_pages, stats=None):
+    """Seperti iter_proofread_pages, tetapi menunggu semua halaman: list of (page, found_errors) sesuai urutan halaman."""
+    results = [None] * len(document_pages)
+    for index, page, found_errors in iter_proofread_pages(document_pages, stats):
+        results[index] = (page, found_errors)
+    return results
+
+def iter_proofread_results(document, stats=None, progress_callback=None):
+    """
+    Menghasilkan hasil proofread per halaman {"halaman": n, "errors": [...]} segera setelah
+    halaman tersebut selesai (tidak selalu berurutan).
+    Hasil diambil dari cache jika file yang sama sudah pernah dianalisis;
+    jika tidak, memo per halaman tetap dipakai untuk halaman yang tidak berubah.
+    `progress_callback(selesai, total)` dipanggil setiap kali satu halaman selesai.
+    """
+    cache_key = _proofread_cache_key(document.content_hash)
+    cached = proofread_cache_get(cache_key)
+    record_cache_lookup('file', cached is not None)
+    if cached is not None:
+        if stats is not None:
+            stats['hits'] = stats.get('hits', 0) + len(cached)
+            stats.setdefault('misses', 0)
+        for done, page_result in enumerate(cached, start=1):
+            if progress_callback:
+                progress_callback(done, len(cached))
+            yield page_result
+        return
+
+    # Halaman dibaca secara lazy; yang disimpan hanya hasil (daftar kesalahan), bukan teks halaman
+    total_pages = document.page_count
+    results_by_index = {}
+    for index, page, found_errors in iter_proofread_pages(document.iter_pages(), stats):
+        results_by_index[index] = {"halaman": page['halaman'], "errors": found_errors}
+        if progress_callback:
+            progress_callback(len(results_by_index), total_pages)
+        yield results_by_index[index]
+
+    page_results = [results_by_index[index] for index in sorted(results_by_index)]
+    _store_proofread_results(document, page_results)
+
+def _store_proofread_results(document, page_results):
+    """Menyimpan hasil satu file ke cache, kecuali jika ada halaman yang gagal dipanggil ke AI."""
+    if not any(_has_api_error(result['errors']) for result in page_results):
+        proofread_cache_put(_proofread_cache_key(document.content_hash), page_results)
+
+def proofread_documents_batch(documents, stats=None, progress_callback=None, document_callback=None):
+    """
+    Proofread banyak dokumen dalam satu kali jalan. Halaman dari semua dokumen dijadwalkan ke
+    proofread_executor yang sama (tetap dibatasi PROOFREAD_MAX_IN_FLIGHT), sehingga file
+    berikutnya tidak perlu menunggu file sebelumnya selesai.
+    Mengembalikan list {"page_results": [...], "error": None atau pesan} sesuai urutan `documents`.
+    `progress_callback(selesai, None)` dipanggil setiap kali satu halaman selesai.
+    `document_callback(indeks, outcome)` dipanggil sekali per dokumen, segera setelah semua
+    halamannya selesai (urutannya mengikuti waktu selesai, bukan urutan `documents`).
+    """
+    outcomes = [{"page_results": [], "error": None} for _ in documents]
+    finished = set()
+
+    def finish(doc_index):
+        if doc_index in finished:
+            return
+        finished.add(doc_index)
+        outcome = outcomes[doc_index]
+        if doc_index in pages_listed:
+            outcome['page_results'].sort(key=lambda result: result['halaman'])
+            if outcome['error'] is None:
+                _store_proofread_results(documents[doc_index], outcome['page_results'])
+        if document_callback:
+            document_callback(doc_index, outcome)
+
+    pending = []
+    for doc_index, document in enumerate(documents):
+        cached = proofread_cache_get(_proofread_cache_key(document.content_hash))
+        record_cache_lookup('file', cached is not None)
+        if cached is not None:
+            if stats is not None:
+                stats['hits'] = stats.get('hits', 0) + len(cached)
+            outcomes[doc_index]['page_results'] = cached
+        else:
+            pending.append(doc_index)
+
+    # Pemilik setiap halaman, sesuai indeks yang diberikan iter_proofread_pages
+    page_owners = []
+    # Jumlah halaman per dokumen (diisi setelah dokumen selesai dibaca) dan yang sudah diproofread
+    pages_listed = {}
+    pages_done = [0] * len(documents)
+
+    def finish_if_complete(doc_index):
+        if pages_listed.get(doc_index) == pages_done[doc_index]:
+            finish(doc_index)
+
+    def all_pages():
+        for doc_index in pending:
+            listed = 0
+            try:
+                for page in documents[doc_index].iter_pages():
+                    page_owners.append(doc_index)
+                    listed += 1
+                    yield page
+            except Exception as e:
+                # File yang rusak tidak menggagalkan file lain dalam batch
+                outcomes[doc_index]['error'] = str(e)
+            pages_listed[doc_index] = listed
+            finish_if_complete(doc_index)
+
+    for doc_index in range(len(documents)):
+        if doc_index not in pending:
+            finish(doc_index)
+
+    done = 0
+    for index, page, found_errors in iter_proofread_pages(all_pages(), stats):
+        owner = page_owners[index]
+        outcomes[owner]['page_results'].append({"halaman": page['halaman'], "errors": found_errors})
+        pages_done[owner] += 1
+        finish_if_complete(owner)
+        done += 1
+        if progress_callback:
+            progress_callback(done, None)
+
+    for doc_index in pending:
+        finish(doc_index)
+    return outcomes
+
+def get_proofread_results(document, stats=None, progress_callback=None):
+    """Mengembalikan semua hasil proofread per halaman, diurutkan berdasarkan nomor halaman."""
+    page_results = list(iter_proofread_results(document, stats, progress_callback))
+    page_results.sort(key=lambda result: result['halaman'])
+    return page_results
+
+@timed_stage('splitting')
 def split_text_into_sentences(full_text):
     """
     Memecah teks penuh menjadi daftar kalimat.
@@ -379,6 +1555,174 @@ def split_text_into_sentences(full_text):
     sentences = re.split(r'(?<=[.!?])\s+', full_text)
     return [s.strip() for s in sentences if len(s.strip()) > 10]
 
+# ==============================================================================
+# ===         CHUNKING DOKUMEN BERDASARKAN ESTIMASI TOKEN        ===
+# ==============================================================================
+
+# Baris yang dianggap judul bab/sub-bab: "BAB I", "Bab 2", "1.", "2.3 Prosedur Audit", "A. Latar Belakang"
+HEADING_PATTERN = re.compile(
+    r'^(?:(?:BAB|Bab)\s+[IVXLC\d]+\b.*|\d+(?:\.\d+)*\.?\s+\S.*|[A-Z]\.\s+\S.*|[A-Z][A-Z\s,&/()-]{3,})$'
+)
+
+def estimate_tokens(text):
+    """Estimasi kasar jumlah token (~4 karakter per token), cukup untuk membatasi ukuran prompt."""
+    return len(text or '') // 4 + 1
+
+def _is_heading(line):
+    stripped = line.strip()
+    # Judul biasanya pendek dan tidak diakhiri tanda baca kalimat
+    if not stripped or len(stripped) > 120 or stripped[-1] in '.,;:':
+        return False
+    return bool(HEADING_PATTERN.match(stripped))
+
+def split_into_sections(full_text):
+    """
+    Memecah teks menjadi daftar section [{"judul": ..., "teks": ...}] berdasarkan baris judul.
+    Teks sebelum judul pertama menjadi section dengan judul kosong.
+    """
+    sections = []
+    current_title = ""
+    current_lines = []
+    for line in (full_text or '').split('\n'):
+        if _is_heading(line) and current_lines:
+            sections.append({"judul": current_title, "teks": "\n".join(current_lines)})
+            current_title, current_lines = line.strip(), [line]
+        else:
+            if _is_heading(line) and not current_lines:
+                current_title = line.strip()
+            current_lines.append(line)
+    if current_lines:
+        sections.append({"judul": current_title, "teks": "\n".join(current_lines)})
+    return [section for section in sections if section['teks'].strip()]
+
+def _split_oversized(text, token_budget):
+    """Memecah satu section yang terlalu besar: per paragraf, lalu per kalimat, lalu per karakter."""
+    for separator_pattern in (r'\n\s*\n', r'(?<=[.!?])\s+'):
+        pieces = [piece for piece in re.split(separator_pattern, text) if piece.strip()]
+        if len(pieces) > 1 and all(estimate_tokens(piece) <= token_budget for piece in pieces):
+            return pieces
+        if len(pieces) > 1:
+            result = []
+            for piece in pieces:
+                if estimate_tokens(piece) <= token_budget:
+                    result.append(piece)
+                else:
+                    result.extend(_split_oversized(piece, token_budget))
+            return result
+    max_chars = max(1, (token_budget - 1) * 4)
+    return [text[i:i + max_chars] for i in range(0, len(text), max_chars)]
+
+def _overlap_tail(text, overlap_tokens):
+    """Ambil ekor teks sepanjang overlap_tokens, dimulai dari awal kalimat jika memungkinkan."""
+    if overlap_tokens <= 0:
+        return ""
+    max_chars = overlap_tokens * 4
+    tail = text[-max_chars:]
+    if len(text) > max_chars:
+        sentence_start = re.search(r'(?<=[.!?\n])\s+', tail)
+        if sentence_start:
+            tail = tail[sentence_start.end():]
+    return tail.strip()
+
+def chunk_text_by_tokens(full_text, token_budget=None, overlap_tokens=None):
+    """
+    Membagi teks menjadi potongan yang masing-masing (termasuk overlap) muat di token_budget.
+    Batas potongan mengikuti batas bab/sub-bab; section yang terlalu besar dipecah per paragraf/kalimat.
+    Setiap potongan setelah yang pertama diawali ekor potongan sebelumnya (overlap) agar konteks tidak putus.
+    """
+    token_budget = token_budget or app.config['CHUNK_TOKEN_BUDGET']
+    overlap_tokens = app.config['CHUNK_OVERLAP_TOKENS'] if overlap_tokens is None else overlap_tokens
+    overlap_tokens = min(overlap_tokens, token_budget // 4)
+    content_budget = token_budget - overlap_tokens - 2
+
+    pieces = []
+    for section in split_into_sections(full_text):
+        if estimate_tokens(section['teks']) <= content_budget:
+            pieces.append(section['teks'])
+        else:
+            pieces.extend(_split_oversized(section['teks'], content_budget))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > content_budget:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+
+    overlapped = chunks[:1]
+    for previous, chunk in zip(chunks, chunks[1:]):
+        tail = _overlap_tail(previous, overlap_tokens)
+        overlapped.append(f"{tail}\n{chunk}" if tail else chunk)
+    return overlapped
+
+def run_chunked_analysis(analyze_chunk, chunk_args, dedupe_key):
+    """
+    Menjalankan analyze_chunk(*args) untuk setiap potongan secara paralel, lalu menggabungkan
+    hasil (list) sesuai urutan potongan dan membuang duplikat berdasarkan dedupe_key(item).
+    """
+    futures = [chunk_executor.submit(analyze_chunk, *args) for args in chunk_args]
+
+    merged = []
+    seen = set()
+    for future in futures:
+        try:
+            chunk_results = future.result()
+        except Exception as e:
+            print(f"Gagal menganalisis potongan dokumen: {e}")
+            continue
+        for item in chunk_results or []:
+            key = dedupe_key(item) if isinstance(item, dict) else None
+            if key:
+                key = re.sub(r'\s+', ' ', str(key)).strip().lower()
+                if key in seen:
+                    continue
+                seen.add(key)
+            merged.append(item)
+    return merged
+
+def _needs_chunking(*texts):
+    return sum(estimate_tokens(text) for text in texts) > app.config['CHUNK_TOKEN_BUDGET']
+
+def _pair_sections_for_comparison(original_text, revised_text, token_budget):
+    """
+    Membagi dokumen revisi menjadi potongan, lalu memasangkan setiap potongan dengan section
+    dokumen asli yang judulnya sama (atau posisi relatif yang sama jika judul tidak ditemukan).
+    Setiap pasangan muat dalam token_budget.
+    """
+    half_budget = token_budget // 2
+    original_sections = split_into_sections(original_text)
+    revised_chunks = chunk_text_by_tokens(revised_text, half_budget)
+
+    sections_by_title = {}
+    for index, section in enumerate(original_sections):
+        title = re.sub(r'\s+', ' ', section['judul']).strip().lower()
+        if title:
+            sections_by_title.setdefault(title, []).append(index)
+
+    pairs = []
+    for chunk_index, revised_chunk in enumerate(revised_chunks):
+        matched = set()
+        for line in revised_chunk.split('\n'):
+            if _is_heading(line):
+                matched.update(sections_by_title.get(re.sub(r'\s+', ' ', line).strip().lower(), []))
+
+        if not matched and original_sections:
+            # Tidak ada judul yang cocok: ambil section asli pada posisi relatif yang sama
+            start = chunk_index * len(original_sections) // len(revised_chunks)
+            end = max(start + 1, (chunk_index + 1) * len(original_sections) // len(revised_chunks))
+            matched = set(range(start, end))
+
+        original_part = "\n".join(original_sections[index]['teks'] for index in sorted(matched))
+        for original_chunk in chunk_text_by_tokens(original_part, half_budget) or [""]:
+            pairs.append((original_chunk, revised_chunk))
+    return pairs
+
 def analyze_document_by_section(original_text, revised_text):
     """
     Menganalisis kesesuaian makna antara dokumen asli dan revisi berdasarkan sub-bab.
@@ -387,6 +1731,15 @@ def analyze_document_by_section(original_text, revised_text):
     if not original_text or not revised_text:
         return []
 
+    # Dokumen besar: bandingkan per pasangan sub-bab secara paralel
+    if _needs_chunking(original_text, revised_text):
+        pairs = _pair_sections_for_comparison(original_text, revised_text, app.config['CHUNK_TOKEN_BUDGET'])
+        if len(pairs) > 1:
+            return run_chunked_analysis(
+                analyze_document_by_section, pairs,
+                dedupe_key=lambda item: item.get("kalimat_menyimpang")
+            )
+
     # PROMPT YANG TELAH DIREVISI
     prompt = f"""
     Anda adalah seorang auditor ahli. Tugas Anda adalah membandingkan dua dokumen: Dokumen Asli dan Dokumen Revisi.
@@ -436,12 +1789,13 @@ def analyze_document_by_section(original_text, revised_text):
     PENTING: HANYA KELUARKAN JSON ARRAY MURNI. TANPA TEKS PENDAHULU ATAU PENUTUP.
     """
     try:
-        response = model.generate_content(prompt)
+        response = model_client.generate(prompt, 'compare')
         # Membersihkan respons dan mencoba parsing JSON
         response_text = response.text.strip()
         response_text = re.sub(r'```json\s*|\s*```', '', response_text)
         
-        analysis_result = json.loads(response_text)
+        with stage_span('response_parse'):
+            analysis_result = json.loads(response_text)
         
         # Validasi struktur JSON
         if not isinstance(analysis_result, list):
@@ -497,12 +1851,13 @@ def analyze_context_difference(original_sentence, revised_sentence):
     """
 
     try:
-        response = model.generate_content(prompt)
+        response = model_client.generate(prompt, 'compare_context')
         response_text = response.text.strip()
         
         # Logika parsing yang sama seperti sebelumnya (lebih tangguh)
         try:
-            analysis_result = json.loads(response_text)
+            with stage_span('response_parse'):
+                analysis_result = json.loads(response_text)
         except json.JSONDecodeError:
             print(f"[DEBUG] Gagal parsing JSON langsung. Mencoba ekstraksi. Response: {response_text}")
             match = re.search(r'\{.*\}', response_text, re.DOTALL)
@@ -535,6 +1890,14 @@ def analyze_document_coherence(full_text):
     if not full_text or full_text.isspace():
         return []
 
+    if _needs_chunking(full_text):
+        chunks = chunk_text_by_tokens(full_text)
+        if len(chunks) > 1:
+            return run_chunked_analysis(
+                analyze_document_coherence, [(chunk,) for chunk in chunks],
+                dedupe_key=lambda item: item.get("asli")
+            )
+
     prompt = f"""
     Anda adalah seorang auditor ahli yang bertugas menganalisis struktur dan koherensi sebuah tulisan.
     Tugas Anda adalah membaca keseluruhan teks berikut dan mengidentifikasi setiap kalimat atau paragraf yang tidak koheren atau keluar dari topik utama di dalam sebuah sub-bagian.
@@ -563,12 +1926,13 @@ def analyze_document_coherence(full_text):
     {full_text}
     """
     try:
-        response = model.generate_content(prompt)
+        response = model_client.generate(prompt, 'coherence')
         pattern = re.compile(
             r"\[TOPIK UTAMA\]\s*(.*?)\s*->\s*\[TEKS ASLI\]\s*(.*?)\s*->\s*\[SARAN REVISI\]\s*(.*?)\s*(?:->\s*\[CATATAN\]\s*(.*?)\s*)?(\n|$)", 
             re.IGNORECASE | re.DOTALL
         )
-        found_issues = pattern.findall(response.text)
+        with stage_span('response_parse'):
+            found_issues = pattern.findall(response.text)
         
         results = []
         for topik, asli, saran, catatan, _ in found_issues:
@@ -587,6 +1951,14 @@ def analyze_document_coherence(full_text):
 def get_structural_recommendations(full_text):
     if not full_text or full_text.isspace():
         return []
+
+    if _needs_chunking(full_text):
+        chunks = chunk_text_by_tokens(full_text)
+        if len(chunks) > 1:
+            return run_chunked_analysis(
+                get_structural_recommendations, [(chunk,) for chunk in chunks],
+                dedupe_key=lambda item: item.get("misplaced_paragraph")
+            )
     # PROMPT RESTRUKTURISASI YANG TELAH DIKOREKSI DARI KARAKTER AMBIGU
     prompt = f"""
     Anda adalah seorang auditor ahli yang bertugas untuk melakukan analisis terhadap dokumen. Tugas Anda adalah menemukan paragraf yang terkesan 'salah tempat' dan memberikan saran di bagian mana seharusnya paragraf tersebut berada saat ini (lokasi asli).
@@ -617,61 +1989,185 @@ def get_structural_recommendations(full_text):
     {full_text}
     """
     try:
-        response = model.generate_content(prompt)
+        response = model_client.generate(prompt, 'restructure')
         # FIX: Mengganti karakter 'long dash' (U+2014) jika ada
         cleaned_response = re.sub(r'[—–]', '-', response.text.strip()) # Tambahkan penanganan untuk U+2014 dan U+2013
         cleaned_response = re.sub(r'```json\s*|\s*```', '', cleaned_response)
-        return json.loads(cleaned_response)
+        with stage_span('response_parse'):
+            return json.loads(cleaned_response)
     except Exception as e:
         print(f"Failed to Generate Response from AI: {e}")
         # Fallback jika AI tidak mengembalikan JSON
         return [{"misplaced_paragraph": "Error: " + str(e), "original_section": "Gagal menghubungi API", "recommended_section": "Periksa prompt Anda."}]
 
-def generate_revised_docx(file_bytes, errors):
-    doc = docx.Document(io.BytesIO(file_bytes))
+def _replacement_alternative(term):
+    """Regex satu istilah; batas kata hanya dipasang di sisi istilah yang diawali/diakhiri huruf atau angka."""
+    prefix = r'(?<!\w)' if re.match(r'\w', term) else ''
+    suffix = r'(?!\w)' if re.search(r'\w$', term) else ''
+    return f"{prefix}{re.escape(term)}{suffix}"
+
+def _apply_replacements_to_runs(runs, matches):
+    """
+    Menerapkan penggantian (start, end, teks_baru) pada gabungan teks run, langsung per run:
+    teks baru masuk ke run tempat kecocokan dimulai (ikut format run itu, mis. italic),
+    sisa kecocokan yang melewati batas run dihapus dari run berikutnya. Run lain tidak disentuh.
+    """
+    run_texts = [run.text for run in runs]
+    run_starts = []
+    offset = 0
+    for text in run_texts:
+        run_starts.append(offset)
+        offset += len(text)
+
+    edits = [[] for _ in runs]
+    for start, end, replacement in matches:
+        index = bisect.bisect_right(run_starts, start) - 1
+        position = start
+        while True:
+            run_end = run_starts[index] + len(run_texts[index])
+            edits[index].append((position - run_starts[index], min(end, run_end) - run_starts[index], replacement))
+            replacement = ''
+            if end <= run_end:
+                break
+            position = run_end
+            index += 1
+
+    for run, text, run_edits in zip(runs, run_texts, edits):
+        if not run_edits:
+            continue
+        for local_start, local_end, replacement in reversed(run_edits):
+            text = text[:local_start] + replacement + text[local_end:]
+        run.text = text
+
+@timed_stage('docx_generation')
+def build_revised_document(document, errors):
+    """Salinan dokumen (objek python-docx) dengan semua perbaikan diterapkan."""
+    doc = document.editable_docx()
     
+    # Jika istilah yang sama muncul lebih dari sekali, yang terakhir di daftar yang dipakai (seperti sebelumnya)
+    replacements = {}
     for error in reversed(errors):
         # Sesuaikan key ini berdasarkan apa yang dikirim
         salah = error.get("salah") or error.get("Kata/Frasa Salah")
         benar = error.get("benar") or error.get("Perbaikan Sesuai KBBI")
-        
-        if not salah or not benar:
-            continue
-            
-        for para in doc.paragraphs:
-            if salah in para.text:
-                para.text = para.text.replace(salah, benar) 
-    output_buffer = io.BytesIO()
-    doc.save(output_buffer)
-    return output_buffer.getvalue()
+        if salah and benar:
+            replacements.setdefault(salah, benar)
+
+    if replacements:
+        paragraphs = doc.paragraphs
+        paragraph_texts = ["".join(run.text for run in para.runs) for para in paragraphs]
+
+        # Inverted index token -> paragraf, agar setiap istilah hanya diperiksa di paragraf yang memuat semua tokennya
+        token_index = {}
+        for para_index, text in enumerate(paragraph_texts):
+            for token in set(re.findall(r'\w+', text)):
+                token_index.setdefault(token, set()).add(para_index)
+
+        candidates = set()
+        for salah in replacements:
+            tokens = re.findall(r'\w+', salah)
+            if not tokens:
+                # Istilah tanpa huruf/angka (mis. tanda baca) tidak bisa diindeks
+                candidates = set(range(len(paragraphs)))
+                break
+            candidates |= set.intersection(*(token_index.get(token, set()) for token in tokens))
+
+        ordered = sorted(replacements, key=lambda term: (-len(term), term))
+        pattern = re.compile("|".join(_replacement_alternative(term) for term in ordered))
+
+        # Semua penggantian untuk satu paragraf diterapkan dalam satu kali scan
+        for para_index in sorted(candidates):
+            matches = [
+                (match.start(), match.end(), replacements[match.group(0)])
+                for match in pattern.finditer(paragraph_texts[para_index])
+            ]
+            if matches:
+                _apply_replacements_to_runs(paragraphs[para_index].runs, matches)
+    return doc
+
+def generate_revised_docx(document, errors):
+    return _docx_bytes(build_revised_document(document, errors))
+
+def build_term_pattern(terms):
+    """
+    Satu regex alternation (case-insensitive) untuk semua istilah. Istilah yang lebih panjang
+    didahulukan agar frasa tidak terpotong oleh kata yang menjadi bagiannya.
+    Mengembalikan None jika tidak ada istilah.
+    """
+    unique_terms = {term for term in terms if term}
+    if not unique_terms:
+        return None
+    ordered = sorted(unique_terms, key=lambda term: (-len(term), term))
+    return re.compile("|".join(re.escape(term) for term in ordered), re.IGNORECASE)
 
-def generate_highlighted_docx(file_bytes, errors):
-    doc = docx.Document(io.BytesIO(file_bytes))
+@timed_stage('docx_generation')
+def build_highlighted_document(document, errors):
+    """Salinan dokumen (objek python-docx) dengan semua kata yang salah disorot kuning."""
+    doc = document.editable_docx()
     
     # Sesuaikan key ini
-    unique_salah = set(e.get("salah") or e.get("Kata/Frasa Salah") for e in errors if e.get("salah") or e.get("Kata/Frasa Salah"))
+    pattern = build_term_pattern(e.get("salah") or e.get("Kata/Frasa Salah") for e in errors)
     
-    for para in doc.paragraphs:
-        for term in unique_salah:
-            if term and term.lower() in para.text.lower():
-                full_text = para.text
-                para.clear()
-                parts = re.split(f'({re.escape(term)})', full_text, flags=re.IGNORECASE)
-                for part in parts:
-                    if part:
-                        run = para.add_run(part)
-                        if part.lower() == term.lower():
-                            run.font.highlight_color = WD_COLOR_INDEX.YELLOW
-    output_buffer = io.BytesIO()
-    doc.save(output_buffer)
-    return output_buffer.getvalue()
+    if pattern is not None:
+        for para in doc.paragraphs:
+            full_text = para.text
+            matches = list(pattern.finditer(full_text))
+            if not matches:
+                continue
+            # Semua istilah ditemukan dalam satu kali scan, lalu run paragraf disusun ulang sekali
+            para.clear()
+            position = 0
+            for match in matches:
+                if match.start() > position:
+                    para.add_run(full_text[position:match.start()])
+                run = para.add_run(match.group(0))
+                run.font.highlight_color = WD_COLOR_INDEX.YELLOW
+                position = match.end()
+            if position < len(full_text):
+                para.add_run(full_text[position:])
+    return doc
+
+def generate_highlighted_docx(document, errors):
+    return _docx_bytes(build_highlighted_document(document, errors))
+
+def _docx_bytes(doc):
+    with stage_span('docx_save'):
+        output_buffer = io.BytesIO()
+        doc.save(output_buffer)
+        return output_buffer.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    """Tujuan tulis zipfile yang tidak bisa di-seek: bytes yang ditulis dikumpulkan lalu diambil dengan drain()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
 
-def create_zip_archive(revised_data, highlighted_data, original_filename):
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        zip_file.writestr(f"revisi_{original_filename}", revised_data)
-        zip_file.writestr(f"highlight_{original_filename}", highlighted_data)
-    return zip_buffer.getvalue()
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+def iter_zip_stream(entries):
+    """
+    Menghasilkan ZIP secara bertahap untuk respons streaming. `entries` = [(nama_file, dokumen python-docx)];
+    setiap dokumen disimpan langsung ke dalam entry ZIP dan bytes-nya segera dikirim,
+    tanpa membuat salinan DOCX utuh maupun ZIP utuh di memori.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for name, doc in entries:
+            with stage_span('docx_save'):
+                with zip_file.open(name, 'w') as entry:
+                    doc.save(entry)
+            yield from sink.drain()
+    yield from sink.drain()
 
 def parse_flexible_date(date_str):
     """Mencoba parsing tanggal dari berbagai format."""
@@ -687,14 +2183,6 @@ def parse_flexible_date(date_str):
         except ValueError:
             raise ValueError("Format tanggal tidak valid. Gunakan format YYYY-MM-DD atau YYYY-MM-DDTHH:MM.")
 
-def extract_paragraphs(file_bytes):
-    try:
-        source_stream = io.BytesIO(file_bytes)
-        doc = docx.Document(source_stream)
-        return [p.text for p in doc.paragraphs if p.text.strip() != ""]
-    except Exception as e:
-        raise ValueError(f"Gagal membaca file docx: {e}")
-
 def extract_paragraphs_from_text(full_text):
     if not full_text:
         return []
@@ -702,14 +2190,341 @@ def extract_paragraphs_from_text(full_text):
     paragraphs = [p.strip() for p in full_text.split('\n\n') if p.strip()]
     return paragraphs
 
-def find_word_diff(original_para, revised_para):
-    matcher = difflib.SequenceMatcher(None, original_para.split(), revised_para.split())
-    diffs = []
+# ==============================================================================
+# ===         ALIGNMENT KALIMAT (PATIENCE DIFF + MYERS)        ===
+# ==============================================================================
+
+# Celah tanpa anchor yang lebih besar dari ini dianggap satu blok 'replace'
+MYERS_MAX_GAP = 4000
+# Batas jarak edit D untuk Myers: trace menyimpan O(D^2) entri dan waktunya O((N+M)D).
+# Celah yang butuh lebih dari ini (mis. seluruh kalimat ditulis ulang) dijadikan satu blok 'replace'.
+MYERS_MAX_EDITS = 200
+
+def _myers_matches(a, b):
+    """
+    Diff Myers O((N+M)D) untuk celah kecil. Mengembalikan pasangan indeks (i, j) yang sama, berurutan,
+    atau [] jika jarak edit melebihi MYERS_MAX_EDITS (pemanggil memperlakukan celah sebagai 'replace').
+    """
+    n, m = len(a), len(b)
+    if n == 0 or m == 0:
+        return []
+
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, MYERS_MAX_EDITS) + 1):
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+    else:
+        # Tidak selesai dalam MYERS_MAX_EDITS langkah: hampir tidak ada yang sama
+        return []
+
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+def _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    Anchor patience diff: elemen yang muncul tepat sekali di kedua rentang, lalu diambil
+    subsekuens naik terpanjang (LIS) agar urutannya konsisten di kedua sisi.
+    """
+    counts = {}
+    for i in range(a_lo, a_hi):
+        entry = counts.setdefault(a[i], [0, 0, i, 0])
+        entry[0] += 1
+    for j in range(b_lo, b_hi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[1] += 1
+            entry[3] = j
+    candidates = sorted(
+        (entry[2], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[1] == 1
+    )
+    if not candidates:
+        return []
+
+    # LIS berdasarkan posisi di b (patience sorting, O(k log k))
+    tails = []
+    tail_indices = []
+    previous = [-1] * len(candidates)
+    for index, (_, j) in enumerate(candidates):
+        position = bisect.bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_indices.append(index)
+        else:
+            tails[position] = j
+            tail_indices[position] = index
+        previous[index] = tail_indices[position - 1] if position > 0 else -1
+
+    anchors = []
+    index = tail_indices[-1]
+    while index != -1:
+        anchors.append(candidates[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+def _patience_matches(a, b):
+    """Pasangan indeks (i, j) yang sama antara a dan b, berurutan (patience diff, celah diselesaikan dengan Myers)."""
+    matches = []
+    # Stack tugas (bukan rekursi) agar dokumen panjang tidak menabrak batas rekursi Python
+    stack = [('region', 0, len(a), 0, len(b))]
+    while stack:
+        task = stack.pop()
+        if task[0] == 'match':
+            matches.append((task[1], task[2]))
+            continue
+
+        _, a_lo, a_hi, b_lo, b_hi = task
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            matches.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+        suffix = []
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            suffix.append(('match', a_hi, b_hi))
+
+        # Tugas didorong terbalik: sufiks, lalu celah dan anchor dari belakang ke depan
+        stack.extend(suffix)
+        if a_lo < a_hi and b_lo < b_hi:
+            anchors = _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi)
+            if anchors:
+                regions = []
+                prev_a, prev_b = a_lo, b_lo
+                for anchor_a, anchor_b in anchors:
+                    regions.append(('region', prev_a, anchor_a, prev_b, anchor_b))
+                    regions.append(('match', anchor_a, anchor_b))
+                    prev_a, prev_b = anchor_a + 1, anchor_b + 1
+                regions.append(('region', prev_a, a_hi, prev_b, b_hi))
+                stack.extend(reversed(regions))
+            elif (a_hi - a_lo) + (b_hi - b_lo) <= MYERS_MAX_GAP:
+                gap_matches = _myers_matches(a[a_lo:a_hi], b[b_lo:b_hi])
+                stack.extend(('match', a_lo + i, b_lo + j) for i, j in reversed(gap_matches))
+    return matches
+
+@timed_stage('diffing')
+def diff_opcodes(original_items, revised_items):
+    """
+    Pengganti difflib.SequenceMatcher(...).get_opcodes() untuk daftar panjang (kalimat/paragraf).
+    Setiap item di-hash menjadi ID integer, lalu dicocokkan dengan patience diff.
+    Mengembalikan list (tag, i1, i2, j1, j2) dengan tag 'equal', 'replace', 'delete', 'insert'.
+    """
+    ids = {}
+    a = [ids.setdefault(item, len(ids)) for item in original_items]
+    b = [ids.setdefault(item, len(ids)) for item in revised_items]
+
+    opcodes = []
+    i = j = 0
+    for match_i, match_j in _patience_matches(a, b) + [(len(a), len(b))]:
+        if i < match_i and j < match_j:
+            opcodes.append(('replace', i, match_i, j, match_j))
+        elif i < match_i:
+            opcodes.append(('delete', i, match_i, j, j))
+        elif j < match_j:
+            opcodes.append(('insert', i, i, j, match_j))
+
+        if match_i < len(a):
+            if opcodes and opcodes[-1][0] == 'equal' and opcodes[-1][2] == match_i and opcodes[-1][4] == match_j:
+                tag, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = (tag, i1, match_i + 1, j1, match_j + 1)
+            else:
+                opcodes.append(('equal', match_i, match_i + 1, match_j, match_j + 1))
+        i, j = match_i + 1, match_j + 1
+    return opcodes
+
+# ==============================================================================
+# ===         PENCOCOKAN KALIMAT FUZZY (MINHASH + LSH)         ===
+# ==============================================================================
+
+MINHASH_BANDS = 16
+MINHASH_ROWS = 3
+_MINHASH_PRIME = (1 << 61) - 1
+_minhash_rng = random.Random(1337)
+_MINHASH_COEFFICIENTS = [
+    (_minhash_rng.randrange(1, _MINHASH_PRIME), _minhash_rng.randrange(0, _MINHASH_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+# Bucket LSH yang terlalu ramai (kalimat boilerplate) hanya diperiksa sebagian agar tetap sub-kuadratik
+MINHASH_MAX_CANDIDATES = 50
+
+def _shingles(text):
+    return {zlib.crc32(word.encode('utf-8')) for word in re.findall(r'\w+', text.lower())}
+
+def _minhash_bands(shingles):
+    signature = [
+        min((a * shingle + b) % _MINHASH_PRIME for shingle in shingles)
+        for a, b in _MINHASH_COEFFICIENTS
+    ]
+    return [
+        (band, tuple(signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]))
+        for band in range(MINHASH_BANDS)
+    ]
+
+def _jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+@timed_stage('diffing')
+def fuzzy_match_changes(original_items, revised_items, opcodes, threshold=None):
+    """
+    Memasangkan item yang berubah (blok replace/delete/insert dari diff_opcodes) berdasarkan kemiripan,
+    sehingga kalimat yang dipindah atau blok replace yang tidak sama panjang tidak hilang.
+    Kandidat dicari lewat MinHash + LSH (bukan semua pasangan), lalu diverifikasi dengan Jaccard kata.
+
+    Mengembalikan list (i, j) berurutan sesuai dokumen revisi:
+    (i, j) = pasangan, (i, None) = item asli dihapus, (None, j) = item revisi baru.
+    """
+    threshold = app.config['COMPARE_FUZZY_THRESHOLD'] if threshold is None else threshold
+
+    changed_original = []
+    changed_revised = []
+    block_of = {}
+    # Posisi item asli yang dihapus di dokumen revisi (untuk mengurutkan hasil)
+    anchor_of = {}
+    for block, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == 'equal':
+            continue
+        for i in range(i1, i2):
+            changed_original.append(i)
+            block_of[('a', i)] = block
+            anchor_of[i] = j1
+        for j in range(j1, j2):
+            changed_revised.append(j)
+            block_of[('b', j)] = block
+
+    original_shingles = {i: _shingles(original_items[i]) for i in changed_original}
+    buckets = {}
+    for i in changed_original:
+        if original_shingles[i]:
+            for band_key in _minhash_bands(original_shingles[i]):
+                buckets.setdefault(band_key, []).append(i)
+
+    scored = []
+    for j in changed_revised:
+        shingles = _shingles(revised_items[j])
+        if not shingles:
+            continue
+        candidates = set()
+        for band_key in _minhash_bands(shingles):
+            candidates.update(buckets.get(band_key, [])[:MINHASH_MAX_CANDIDATES])
+        for i in candidates:
+            similarity = _jaccard(original_shingles[i], shingles)
+            if similarity >= threshold:
+                # Pasangan dalam blok yang sama didahulukan jika kemiripannya setara
+                same_block = block_of[('a', i)] == block_of[('b', j)]
+                scored.append((similarity, same_block, -abs(anchor_of[i] - j), i, j))
+
+    # Greedy: pasangan paling mirip diambil lebih dulu, tiap item hanya dipakai sekali
+    scored.sort(reverse=True)
+    paired_original = {}
+    paired_revised = set()
+    for _, _, _, i, j in scored:
+        if i not in paired_original and j not in paired_revised:
+            paired_original[i] = j
+            paired_revised.add(j)
+
+    # Sisa dalam blok replace yang sama tetap dipasangkan berurutan seperti sebelumnya
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag != 'replace':
+            continue
+        leftover_original = [i for i in range(i1, i2) if i not in paired_original]
+        leftover_revised = [j for j in range(j1, j2) if j not in paired_revised]
+        for i, j in zip(leftover_original, leftover_revised):
+            paired_original[i] = j
+            paired_revised.add(j)
+
+    entries = [((j, 1), (i, j)) for i, j in paired_original.items()]
+    entries += [((j, 1), (None, j)) for j in changed_revised if j not in paired_revised]
+    entries += [((anchor_of[i], 0), (i, None)) for i in changed_original if i not in paired_original]
+    entries.sort(key=lambda entry: (entry[0], entry[1][0] if entry[1][0] is not None else -1))
+    return [pair for _, pair in entries]
+
+def _comparison_row(original_items, revised_items, i, j):
+    """Satu baris hasil perbandingan untuk pasangan dari fuzzy_match_changes."""
+    if j is None:
+        return {
+            "Kalimat Awal": original_items[i],
+            "Kalimat Revisi": [],
+            "Kata yang Direvisi": "(Kalimat dihapus)",
+        }
+    if i is None:
+        return {
+            "Kalimat Awal": "",
+            "Kalimat Revisi": [{"text": revised_items[j] + ' ', "changed": True}],
+            "Kata yang Direvisi": "(Kalimat baru)",
+        }
+    if original_items[i] == revised_items[j]:
+        return {
+            "Kalimat Awal": original_items[i],
+            "Kalimat Revisi": [{"text": revised_items[j] + ' ', "changed": False}],
+            "Kata yang Direvisi": "(Kalimat dipindah)",
+        }
+    word_diff_text, revised_structured = _word_diff(original_items[i], revised_items[j])
+    return {
+        "Kalimat Awal": original_items[i],
+        "Kalimat Revisi": revised_structured,
+        "Kata yang Direvisi": word_diff_text,
+    }
+
+def _word_diff(original_para, revised_para):
+    """
+    Diff kata dihitung sekali, lalu dipakai untuk dua keluaran:
+    ringkasan kata yang direvisi (string) dan struktur kalimat revisi untuk highlight.
+    """
+    original_words = original_para.split()
+    revised_words = revised_para.split()
+    matcher = difflib.SequenceMatcher(None, original_words, revised_words)
+
+    changed_parts = []
+    structured_output = []
     for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'replace' or tag == 'insert':
-            diffs.append(" ".join(revised_para.split()[j1:j2]))
-    return ", ".join(diffs) if diffs else "Perubahan Minor"
+        if tag == 'equal':
+            structured_output.append({"text": " ".join(revised_words[j1:j2]) + ' ', "changed": False})
+        elif tag == 'replace' or tag == 'insert':
+            changed_text = " ".join(revised_words[j1:j2])
+            changed_parts.append(changed_text)
+            structured_output.append({"text": changed_text + ' ', "changed": True})
+
+    summary = ", ".join(changed_parts) if changed_parts else "Perubahan Minor"
+    return summary, structured_output
+
+def find_word_diff(original_para, revised_para):
+    summary, _ = _word_diff(original_para, revised_para)
+    return summary
 
+@timed_stage('docx_generation')
 def create_comparison_docx(df):
     doc = Document() # Pastikan 'from docx import Document' ada di atas
     doc.add_heading('Hasil Perbandingan Dokumen', level=1)
@@ -738,8 +2553,9 @@ def calculate_task_status(start_time, deadline, end_time):
     # Ini akan menangani tugas manual yang belum selesai dan belum overdue
     return 'on_progress'
 
-def create_recommendation_highlight_docx(file_bytes, recommendations):
-    doc = docx.Document(io.BytesIO(file_bytes))
+@timed_stage('docx_generation')
+def create_recommendation_highlight_docx(document, recommendations):
+    doc = document.editable_docx()
     
     # Sesuaikan key ini
     misplaced_paragraphs = [rec.get("misplaced_paragraph") or rec.get("Paragraf yang Perlu Dipindah") for rec in recommendations]
@@ -754,72 +2570,25 @@ def create_recommendation_highlight_docx(file_bytes, recommendations):
 
 
 def _get_word_diff_structure(original_para, revised_para):
-    original_words = original_para.split()
-    revised_words = revised_para.split()
-    matcher = difflib.SequenceMatcher(None, original_words, revised_words)
-    
-    structured_output = []
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'equal':
-            structured_output.append({
-                "text": " ".join(revised_words[j1:j2]),
-                "changed": False
-            })
-        elif tag == 'replace' or tag == 'insert':
-            structured_output.append({
-                "text": " ".join(revised_words[j1:j2]),
-                "changed": True
-            })
-    
-    # Tambahkan spasi di akhir setiap bagian agar tidak menempel
-    for item in structured_output:
-        item['text'] += ' '
-        
+    _, structured_output = _word_diff(original_para, revised_para)
     return structured_output
 
-def _analyze_comparison(file1, file2):
-    file1_bytes = file1.read()
-    file2_bytes = file2.read()
-    file1.seek(0)
-    file2.seek(0)
-
-    file1_ext = file1.filename.split('.')[-1].lower()
-    file2_ext = file2.filename.split('.')[-1].lower()
-
-    pages1 = _extract_text_with_pages(file1_bytes, file1_ext)
-    pages2 = _extract_text_with_pages(file2_bytes, file2_ext)
-    
-    original_data = extract_sentences_with_pages(pages1)
-    revised_data = extract_sentences_with_pages(pages2)
+def _analyze_comparison(document1, document2):
+    original_data = document1.sentences
+    revised_data = document2.sentences
     
     original_sentences = [item['sentence'] for item in original_data]
     revised_sentences = [item['sentence'] for item in revised_data]
     
     comparison_results = []
-    matcher = difflib.SequenceMatcher(None, original_sentences, revised_sentences)
-    
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag == 'replace':
-            len_original = i2 - i1
-            len_revised = j2 - j1
-            
-            for i in range(min(len_original, len_revised)):
-                original_sentence = original_sentences[i1 + i]
-                revised_sentence = revised_sentences[j1 + i]
-                
-                # Ambil nomor halaman dari data yang sudah diproses
-                revised_page = revised_data[j1 + i]['page']
-                
-                word_diff_text = find_word_diff(original_sentence, revised_sentence)
-                revised_structured = _get_word_diff_structure(original_sentence, revised_sentence)
-                
-                comparison_results.append({
-                    "Kalimat Awal": original_sentence,
-                    "Kalimat Revisi": revised_structured,
-                    "Kata yang Direvisi": word_diff_text,
-                    "Halaman": f"Halaman {revised_page}"
-                })
+    opcodes = diff_opcodes(original_sentences, revised_sentences)
+    for i, j in fuzzy_match_changes(original_sentences, revised_sentences, opcodes):
+        row = _comparison_row(original_sentences, revised_sentences, i, j)
+        
+        # Ambil nomor halaman dari data yang sudah diproses (kalimat dihapus memakai halaman dokumen asli)
+        page = revised_data[j]['page'] if j is not None else original_data[i]['page']
+        row["Halaman"] = f"Halaman {page}"
+        comparison_results.append(row)
     return comparison_results
 
 @app.route('/', methods=['GET', 'POST']) 
@@ -897,9 +2666,7 @@ def api_list_folders():
     """Mendaftarkan semua folder yang dimiliki pengguna."""
     print(f"Mencoba mengambil folder untuk user: {current_user.id}") # DEBUG
     try:
-        folders = get_user_folders() # Ini sekarang mengembalikan list of dicts
-        print(f"Ditemukan folder: {folders}") # DEBUG
-        return jsonify(folders)
+        return _conditional_json(_folders_etag(), get_user_folders) # get_user_folders mengembalikan list of dicts
     except Exception as e:
         print(f"Kesalahan Server saat mengambil list folder: {e}")
         return jsonify({"error": "Gagal memuat folder: " + str(e)}), 500
@@ -925,20 +2692,313 @@ def api_delete_folder():
         if not os.path.isdir(folder_path) or not os.path.abspath(folder_path).startswith(os.path.abspath(user_root)):
              return jsonify({"error": "Folder tidak ditemukan atau akses ditolak."}), 404
 
-        # Hapus folder dan semua isinya secara rekursif
-        shutil.rmtree(folder_path)
-        
-        # TAMBAHAN: Hapus juga catatan 'share' jika ada
-        SharedFolder.query.filter_by(owner_id=current_user.id, folder_name=folder_name).delete()
-        db.session.commit()
-        
-        return jsonify({"status": "success", "message": f"Folder '{folder_name}' berhasil dihapus."}), 200
+        # Hapus folder dan semua isinya secara rekursif
+        shutil.rmtree(folder_path)
+        
+        # TAMBAHAN: Hapus juga catatan 'share' jika ada
+        SharedFolder.query.filter_by(owner_id=current_user.id, folder_name=folder_name).delete()
+        ResultCatalog.query.filter_by(owner_id=current_user.id, folder_name=folder_name).delete()
+        db.session.commit()
+        
+        return jsonify({"status": "success", "message": f"Folder '{folder_name}' berhasil dihapus."}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saat menghapus folder: {e}")
+        return jsonify({"error": f"Gagal menghapus folder: {e}"}), 500
+
+
+def _resolve_results_folder(owner_id, folder_name):
+    """
+    Memeriksa folder tujuan penyimpanan hasil (milik sendiri atau dibagikan ke user saat ini).
+    Mengembalikan (folder_path, None) jika boleh, atau (None, respons error) jika tidak.
+    """
+    # --- REVISI: Tentukan root folder berdasarkan owner_id ---
+    target_user_id_str = str(owner_id)
+    if not target_user_id_str.isalnum():
+        return None, (jsonify({"error": "Owner ID tidak valid."}), 400)
+    
+    user_root = os.path.join(app.config['UPLOAD_FOLDER'], target_user_id_str)
+    
+    # Keamanan: Pastikan folder_name tidak mengandung '..'
+    if '..' in folder_name:
+        return None, (jsonify({"error": "Nama folder tidak valid."}), 400)
+         
+    folder_path = os.path.join(user_root, folder_name)
+
+    # --- REVISI: Cek Izin ---
+    is_owner = (str(current_user.id) == target_user_id_str)
+    is_shared_to_me = SharedFolder.query.filter_by(
+        owner_id=owner_id, 
+        folder_name=folder_name, 
+        shared_with_id=current_user.id
+    ).first()
+
+    if not is_owner and not is_shared_to_me:
+        return None, (jsonify({"error": "Akses ditolak untuk menyimpan ke folder ini."}), 403)
+    
+    if not os.path.isdir(folder_path):
+        return None, (jsonify({"error": "Folder tidak ditemukan."}), 404)
+    return folder_path, None
+
+# --- Penyimpanan file hasil ---
+# Format 'gzip': beberapa member gzip yang disambung (tetap satu stream gzip yang valid, bisa dibaca `zcat`).
+# Member pertama berisi header JSON (jumlah baris, ukuran blok, offset tiap blok relatif terhadap akhir header),
+# member berikutnya masing-masing berisi RESULTS_BLOCK_ROWS baris sebagai JSON Lines. Nama file tetap *.json
+# agar RowAction/Comment/ResultCatalog yang merujuk nama file tidak berubah; format dikenali dari magic byte.
+GZIP_MAGIC = b'\x1f\x8b'
+RESULTS_GZIP_FORMAT = "proofread-rows-gzip"
+RESULTS_HEADER_READ_SIZE = 64 * 1024
+
+def _gzip_member(payload):
+    return gzip.compress(payload, compresslevel=6, mtime=0)
+
+def encode_result_rows(rows, block_rows=None):
+    """Mengubah daftar baris hasil menjadi bytes format 'gzip' (header + blok baris)."""
+    block_rows = block_rows or app.config['RESULTS_BLOCK_ROWS']
+    blocks = []
+    for start in range(0, len(rows), block_rows):
+        lines = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows[start:start + block_rows])
+        blocks.append(_gzip_member(lines.encode('utf-8')))
+
+    offsets, position = [], 0
+    for block in blocks:
+        offsets.append(position)
+        position += len(block)
+    header = {
+        "format": RESULTS_GZIP_FORMAT,
+        "version": 1,
+        "row_count": len(rows),
+        "block_rows": block_rows,
+        "block_offsets": offsets,
+        "data_size": position
+    }
+    return _gzip_member((json.dumps(header) + "\n").encode('utf-8')) + b"".join(blocks)
+
+def write_result_rows(file_path, results_data, storage_format=None):
+    """Menulis hasil analisis ke file sesuai RESULTS_STORAGE_FORMAT (hanya list yang dikompresi per blok)."""
+    storage_format = storage_format or app.config['RESULTS_STORAGE_FORMAT']
+    if storage_format == 'gzip' and isinstance(results_data, list):
+        payload = encode_result_rows(results_data)
+    else:
+        payload = json.dumps(results_data, ensure_ascii=False, indent=2).encode('utf-8')
+    # Tulis ke file sementara lalu ganti, agar pembaca tidak pernah melihat file setengah jadi
+    tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, file_path)
+
+def _read_result_header(f):
+    """Membaca member gzip pertama (header); mengembalikan (header, posisi awal data)."""
+    decompressor = zlib.decompressobj(wbits=31)
+    raw = b""
+    consumed = 0
+    while not decompressor.eof:
+        chunk = f.read(RESULTS_HEADER_READ_SIZE)
+        if not chunk:
+            raise ValueError("Header file hasil terpotong.")
+        raw += decompressor.decompress(chunk)
+        consumed += len(chunk)
+    data_start = consumed - len(decompressor.unused_data)
+    header = json.loads(raw)
+    if header.get("format") != RESULTS_GZIP_FORMAT:
+        raise ValueError("Format file hasil tidak dikenali.")
+    return header, data_start
+
+def is_compressed_result(file_path):
+    """True jika file hasil memakai format 'gzip' (dikenali dari magic byte), False untuk JSON lama."""
+    with open(file_path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+def read_result_rows(file_path, start=0, stop=None):
+    """
+    Membaca baris hasil [start, stop) dari file hasil, format lama maupun 'gzip'.
+    Untuk format 'gzip' hanya blok yang mencakup rentang itu yang didekompresi.
+    Mengembalikan (data, total_baris); untuk hasil yang bukan list, data dikembalikan utuh.
+    """
+    with open(file_path, 'rb') as f:
+        if f.read(2) != GZIP_MAGIC:
+            f.seek(0)
+            data = json.loads(f.read().decode('utf-8'))
+            if not isinstance(data, list):
+                return data, None
+            return data[start:stop], len(data)
+
+        f.seek(0)
+        header, data_start = _read_result_header(f)
+        total = header["row_count"]
+        stop = total if stop is None else min(stop, total)
+        if start >= stop:
+            return [], total
+
+        block_rows = header["block_rows"]
+        offsets = header["block_offsets"] + [header["data_size"]]
+        first_block, last_block = start // block_rows, (stop - 1) // block_rows
+        f.seek(data_start + offsets[first_block])
+        compressed = f.read(offsets[last_block + 1] - offsets[first_block])
+
+    # Blok yang berurutan = member gzip berurutan; gzip.decompress membaca semuanya sekaligus
+    # split('\n'), bukan splitlines(): teks bisa berisi U+2028 dsb. yang tidak di-escape json.dumps
+    lines = gzip.decompress(compressed).decode('utf-8').split('\n')
+    skip = start - first_block * block_rows
+    # Satu panggilan json.loads untuk semua baris jauh lebih cepat daripada per baris
+    return json.loads("[" + ",".join(lines[skip:skip + (stop - start)]) + "]"), total
+
+def _write_results_file(owner_id, folder_name, folder_path, feature_type, original_filename, results_data):
+    """
+    Menyimpan hasil analisis sebagai JSON di folder dan mendaftarkannya ke ResultCatalog
+    (pemanggil yang melakukan commit). Mengembalikan nama file yang dipakai.
+    """
+    saved_at = datetime.datetime.now().replace(microsecond=0)
+    timestamp = saved_at.strftime("%Y%m%d_%H%M%S")
+    # Bersihkan nama file asli
+    clean_orig_name = re.sub(r'[^\w\s-]', '', original_filename.split('.')[0]).strip()
+    clean_orig_name = re.sub(r'[-\s]+', '_', clean_orig_name)
+    
+    save_filename = f"{timestamp}_{feature_type}_{clean_orig_name}.json"
+    # Batch bisa menyimpan beberapa file bernama sama dalam detik yang sama; jangan timpa
+    suffix = 2
+    while os.path.exists(os.path.join(folder_path, save_filename)):
+        save_filename = f"{timestamp}_{feature_type}_{clean_orig_name}_{suffix}.json"
+        suffix += 1
+
+    save_path = os.path.join(folder_path, save_filename)
+    try:
+        write_result_rows(save_path, results_data)
+    except Exception:
+        # Tulis gagal di tengah jalan (mis. data tidak bisa diserialisasi): jangan tinggalkan file parsial
+        if os.path.exists(save_path):
+            os.remove(save_path)
+        raise
+
+    db.session.add(ResultCatalog(
+        owner_id=int(owner_id),
+        folder_name=folder_name,
+        filename=save_filename,
+        feature_type=feature_type,
+        original_name=clean_orig_name.replace("_", " ") or "N/A",
+        created_at=saved_at
+    ))
+    return save_filename
+
+def _catalog_entry_from_filename(owner_id, folder_name, folder_path, filename):
+    """Membuat entri katalog untuk file lama dari nama filenya (format: 20251106_223800_proofreading_NamaFileAsli.json)."""
+    try:
+        parts = filename[:-len('.json')].split('_', 3)
+        created_at = datetime.datetime.strptime(f"{parts[0]}_{parts[1]}", "%Y%m%d_%H%M%S")
+        feature_type = parts[2]
+        original_name = parts[3].replace("_", " ") if len(parts) > 3 else "N/A"
+    except (IndexError, ValueError) as e:
+        print(f"Gagal parse nama file {filename}: {e}")
+        # Nama tidak sesuai format: pakai waktu modifikasi file
+        created_at = datetime.datetime.fromtimestamp(os.path.getmtime(os.path.join(folder_path, filename)))
+        feature_type = "N/A"
+        original_name = "N/A"
+    return ResultCatalog(
+        owner_id=owner_id,
+        folder_name=folder_name,
+        filename=filename,
+        feature_type=feature_type,
+        original_name=original_name,
+        created_at=created_at
+    )
+
+# Folder yang sudah dicocokkan dengan katalog di proses ini (lihat api_folder_history)
+catalog_backfilled_folders = set()
+catalog_backfill_lock = threading.Lock()
 
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error saat menghapus folder: {e}")
-        return jsonify({"error": f"Gagal menghapus folder: {e}"}), 500
+def _backfill_folder_catalog(owner_id, folder_name, folder_path):
+    """
+    Menambahkan file .json di folder yang belum tercatat ke ResultCatalog (pemanggil yang
+    melakukan commit). Mengembalikan jumlah entri yang ditambahkan.
+    """
+    known = {
+        row.filename for row in
+        ResultCatalog.query.with_entities(ResultCatalog.filename)
+        .filter_by(owner_id=owner_id, folder_name=folder_name)
+    }
+    added = 0
+    for filename in os.listdir(folder_path):
+        if filename.endswith('.json') and filename not in known:
+            db.session.add(_catalog_entry_from_filename(owner_id, folder_name, folder_path, filename))
+            added += 1
+    return added
+
+def _ensure_folder_catalog(owner_id, folder_name, folder_path):
+    """
+    Backfill malas: saat riwayat sebuah folder pertama kali diminta, file hasil lama
+    (disimpan sebelum ada katalog) didaftarkan dulu agar tidak hilang dari riwayat
+    meskipun CLI backfill-result-catalog belum dijalankan.
+    """
+    key = (int(owner_id), folder_name)
+    if key in catalog_backfilled_folders:
+        return
+    with catalog_backfill_lock:
+        if key in catalog_backfilled_folders:
+            return
+        try:
+            if _backfill_folder_catalog(owner_id, folder_name, folder_path):
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        catalog_backfilled_folders.add(key)
+
+def _encode_history_cursor(entry):
+    """Cursor riwayat = posisi (created_at, id) baris terakhir, dikodekan agar aman di query string."""
+    raw = f"{entry.created_at.isoformat()}|{entry.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_history_cursor(cursor):
+    """Kebalikan _encode_history_cursor; ValueError jika cursor rusak."""
+    created_at_str, entry_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+    return datetime.datetime.fromisoformat(created_at_str), int(entry_id)
+
+# Jumlah baris per statement INSERT ... ON CONFLICT (6 parameter per baris, jauh di bawah batas variabel SQLite)
+ROW_ACTION_UPSERT_CHUNK = 150
+
+def _parse_row_actions(items):
+    """
+    Normalisasi daftar aksi baris [{'row_id', 'is_ganti', 'pic_user_id'}, ...] -> {row_id: (is_ganti, pic_user_id)}.
+    Jika row_id sama muncul beberapa kali, yang terakhir dipakai. ValueError jika data tidak valid.
+    """
+    actions = {}
+    for item in items:
+        if not isinstance(item, dict) or item.get('row_id') is None:
+            raise ValueError("Setiap aksi harus berupa objek dengan row_id.")
+        pic_user_id = item.get('pic_user_id')
+        actions[int(item['row_id'])] = (
+            bool(item.get('is_ganti', False)),
+            int(pic_user_id) if pic_user_id not in (None, '') else None
+        )
+    return actions
 
+def upsert_row_actions(owner_id, folder_name, filename, actions, session=None):
+    """
+    Menyimpan banyak RowAction sekaligus dengan INSERT ... ON CONFLICT DO UPDATE pada constraint
+    _unique_row_action (tanpa SELECT per baris). `actions` = {row_id: (is_ganti, pic_user_id)}.
+    Commit dilakukan oleh pemanggil.
+    """
+    session = session or db.session
+    rows = [
+        {
+            'owner_id': int(owner_id),
+            'folder_name': folder_name,
+            'filename': filename,
+            'row_id': row_id,
+            'is_ganti': is_ganti,
+            'pic_user_id': pic_user_id
+        }
+        for row_id, (is_ganti, pic_user_id) in actions.items()
+    ]
+    for start in range(0, len(rows), ROW_ACTION_UPSERT_CHUNK):
+        statement = sqlite_insert(RowAction.__table__).values(rows[start:start + ROW_ACTION_UPSERT_CHUNK])
+        statement = statement.on_conflict_do_update(
+            index_elements=['owner_id', 'folder_name', 'filename', 'row_id'],
+            set_={'is_ganti': statement.excluded.is_ganti, 'pic_user_id': statement.excluded.pic_user_id}
+        )
+        session.execute(statement)
+    return len(rows)
 
 @app.route('/api/save_results', methods=['POST'])
 @login_required 
@@ -955,84 +3015,37 @@ def api_save_results():
 
     if not folder_name or not feature_type or not results_data:
         return jsonify({"error": "Data folder, fitur, atau hasil kosong."}), 400
-
+    # Semua input divalidasi sebelum file ditulis, agar tidak ada file tanpa entri katalog
+    if not str(owner_id).isdigit() or not isinstance(feature_type, str) or not isinstance(original_filename, str):
+        return jsonify({"error": "Owner ID, fitur, atau nama file tidak valid."}), 400
+
+    # actions_data = {row_id (string): {is_ganti, pic_user_id}}; diparse sebelum file ditulis (400 seperti /api/save_row_actions)
+    if actions_data is None:
+        actions_data = {}
+    if not isinstance(actions_data, dict):
+        return jsonify({"error": "Data aksi tidak valid: actions_data harus berupa objek."}), 400
     try:
-        # --- REVISI: Tentukan root folder berdasarkan owner_id ---
-        target_user_id_str = str(owner_id)
-        if not target_user_id_str.isalnum():
-             return jsonify({"error": "Owner ID tidak valid."}), 400
-        
-        user_root = os.path.join(app.config['UPLOAD_FOLDER'], target_user_id_str)
-        
-        # Keamanan: Pastikan folder_name tidak mengandung '..'
-        if '..' in folder_name:
-             return jsonify({"error": "Nama folder tidak valid."}), 400
-             
-        folder_path = os.path.join(user_root, folder_name)
-
-        # --- REVISI: Cek Izin ---
-        is_owner = (str(current_user.id) == target_user_id_str)
-        is_shared_to_me = SharedFolder.query.filter_by(
-            owner_id=owner_id, 
-            folder_name=folder_name, 
-            shared_with_id=current_user.id
-        ).first()
+        actions = _parse_row_actions(
+            dict(action_data, row_id=row_id_str) if isinstance(action_data, dict) else action_data
+            for row_id_str, action_data in actions_data.items()
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Data aksi tidak valid: {e}"}), 400
 
-        if not is_owner and not is_shared_to_me:
-            return jsonify({"error": "Akses ditolak untuk menyimpan ke folder ini."}), 403
-        
-        if not os.path.isdir(folder_path):
-            return jsonify({"error": "Folder tidak ditemukan."}), 404
-        # --- AKHIR REVISI Izin ---
+    save_path = None
+    try:
+        folder_path, error_response = _resolve_results_folder(owner_id, folder_name)
+        if error_response:
+            return error_response
 
-        # 2. Tentukan nama file
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        # Bersihkan nama file asli
-        clean_orig_name = re.sub(r'[^\w\s-]', '', original_filename.split('.')[0]).strip()
-        clean_orig_name = re.sub(r'[-\s]+', '_', clean_orig_name)
-        
-        save_filename = f"{timestamp}_{feature_type}_{clean_orig_name}.json"
+        save_filename = _write_results_file(owner_id, folder_name, folder_path, feature_type, original_filename, results_data)
         save_path = os.path.join(folder_path, save_filename)
 
-        # 3. Simpan data (JSON)
-        with open(save_path, 'w', encoding='utf-8') as f:
-            json.dump(results_data, f, ensure_ascii=False, indent=2)
-
         # >>>>>> SIMPAN DATA AKSI KE DATABASE <<<<<<
-        # Loop melalui data aksi yang diterima dari frontend
-        for row_id_str, action_data in actions_data.items():
-            try:
-                row_id = int(row_id_str) # Konversi ID baris dari string ke integer
-                
-                # Cek apakah aksi untuk baris ini sudah ada
-                action = RowAction.query.filter_by(
-                    owner_id=owner_id,
-                    folder_name=folder_name,
-                    filename=save_filename, # Gunakan nama file yang baru disimpan
-                    row_id=row_id
-                ).first()
-
-                if action:
-                    # Jika sudah ada, update data-nya
-                    action.is_ganti = action_data.get('is_ganti', False)
-                    action.pic_user_id = action_data.get('pic_user_id')
-                else:
-                    # Jika belum ada, buat entri baru
-                    action = RowAction(
-                        owner_id=owner_id,
-                        folder_name=folder_name,
-                        filename=save_filename,
-                        row_id=row_id,
-                        is_ganti=action_data.get('is_ganti', False),
-                        pic_user_id=action_data.get('pic_user_id')
-                    )
-                    db.session.add(action)
-            except Exception as e:
-                # Jika terjadi error pada salah satu baris, batalkan semua transaksi
-                print(f"Gagal memproses aksi untuk baris {row_id_str}: {e}")
-                raise e # Lempar error ke blok try-catch utama
-        
-        # Commit semua perubahan ke database sekali saja setelah loop selesai
+        # Disimpan dengan satu upsert massal
+        upsert_row_actions(owner_id, folder_name, save_filename, actions)
+
+        # Commit file katalog dan semua aksi ke database sekali saja
         db.session.commit()
         # >>>>>> AKHIR SIMPAN DATA AKSI <<<<<<
 
@@ -1041,8 +3054,10 @@ def api_save_results():
             "message": f"Hasil analisis dan status aksi tersimpan di folder {folder_name}."
         }), 201
     except Exception as e:
-        # Jika ada error, rollback perubahan database
+        # Jika ada error, rollback perubahan database dan hapus file yang sudah terlanjur ditulis
         db.session.rollback()
+        if save_path and os.path.exists(save_path):
+            os.remove(save_path)
         print(f"Kesalahan Server saat menyimpan hasil: {e}")
         return jsonify({"error": "Gagal menyimpan hasil: " + str(e)}), 500
     
@@ -1138,6 +3153,7 @@ def api_folder_history(owner_id, folder_name):
     """
     PERBAIKAN UNTUK MASALAH 1: Mengambil riwayat file dari folder.
     Kita butuh owner_id untuk folder yang di-share.
+    Dibaca dari ResultCatalog per halaman: ?limit=, ?cursor= (dari 'next_cursor'), ?feature_type=.
     """
     if not folder_name or '..' in folder_name:
         return jsonify({"error": "Nama folder tidak valid."}), 400
@@ -1169,47 +3185,122 @@ def api_folder_history(owner_id, folder_name):
         if not os.path.isdir(folder_path):
             return jsonify({"error": "Folder tidak ditemukan."}), 404
 
-        results = []
-        for filename in os.listdir(folder_path):
-            if filename.endswith('.json'):
-                try:
-                    # Parse nama file: 20251106_223800_proofreading_NamaFileAsli.json
-                    parts = filename.replace('.json', '').split('_', 3)
-                    timestamp_str = f"{parts[0]}_{parts[1]}"
-                    timestamp = datetime.datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    feature_type = parts[2]
-                    original_name = parts[3] if len(parts) > 3 else "N/A"
-                    
-                    results.append({
-                        "filename": filename,
-                        "feature_type": feature_type,
-                        "timestamp": timestamp.strftime("%d %b %Y, %H:%M"),
-                        "original_name": original_name.replace("_", " ")
-                    })
-                except Exception as e:
-                    print(f"Gagal parse nama file {filename}: {e}")
-                    # Jika parse gagal, tampilkan mentah
-                    results.append({
-                        "filename": filename,
-                        "feature_type": "N/A",
-                        "timestamp": "N/A",
-                        "original_name": "N/A"
-                    })
-        
-        # Urutkan berdasarkan timestamp terbaru
-        results.sort(key=lambda x: x.get("timestamp"), reverse=True)
-        
-        return jsonify(results)
+        _ensure_folder_catalog(owner_id, folder_name, folder_path)
+
+        try:
+            limit = int(request.args.get('limit', app.config['HISTORY_PAGE_SIZE']))
+        except ValueError:
+            return jsonify({"error": "Parameter limit tidak valid."}), 400
+        limit = max(1, min(limit, app.config['HISTORY_MAX_PAGE_SIZE']))
+
+        # Terbaru dulu; id sebagai pemecah seri agar urutan stabil antar halaman
+        query = ResultCatalog.query.filter_by(owner_id=owner_id, folder_name=folder_name)
+        feature_type = request.args.get('feature_type')
+        if feature_type:
+            query = query.filter_by(feature_type=feature_type)
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = _decode_history_cursor(cursor)
+            except ValueError:
+                return jsonify({"error": "Cursor tidak valid."}), 400
+            query = query.filter(db.or_(
+                ResultCatalog.created_at < cursor_created_at,
+                db.and_(ResultCatalog.created_at == cursor_created_at, ResultCatalog.id < cursor_id)
+            ))
+        # Katalog hanya ditambah/dihapus, jadi (jumlah, id terbesar) folder ini cukup sebagai versi
+        folder_version = _table_version(
+            ResultCatalog.query.filter_by(owner_id=owner_id, folder_name=folder_name), ResultCatalog
+        )
+        etag = _etag_for("history", owner_id, folder_name, folder_version, limit, feature_type, cursor)
+
+        def build_payload():
+            entries = query.order_by(ResultCatalog.created_at.desc(), ResultCatalog.id.desc()).limit(limit + 1).all()
+
+            has_more = len(entries) > limit
+            entries = entries[:limit]
+            results = [
+                {
+                    "filename": entry.filename,
+                    "feature_type": entry.feature_type,
+                    "timestamp": entry.created_at.strftime("%d %b %Y, %H:%M"),
+                    "original_name": entry.original_name
+                }
+                for entry in entries
+            ]
+            return {
+                "items": results,
+                "next_cursor": _encode_history_cursor(entries[-1]) if has_more else None
+            }
+
+        return _conditional_json(etag, build_payload)
 
     except Exception as e:
         print(f"Error saat mengambil riwayat folder: {e}")
         return jsonify({"error": str(e)}), 500
 
+def _row_actions_for_range(owner_id, folder_name, filename, first_row_id, last_row_id=None):
+    """Mengambil RowAction hanya untuk row_id first..last (inklusif, last None = sampai akhir) dari satu file hasil."""
+    if last_row_id is not None and last_row_id < first_row_id:
+        return {}
+    query = RowAction.query.filter(
+        RowAction.owner_id == owner_id,
+        RowAction.folder_name == folder_name,
+        RowAction.filename == filename,
+        RowAction.row_id >= first_row_id
+    )
+    if last_row_id is not None:
+        query = query.filter(RowAction.row_id <= last_row_id)
+    row_actions = query.all()
+    return {
+        action.row_id: {
+            'is_ganti': action.is_ganti, 
+            'pic_user_id': action.pic_user_id
+        } for action in row_actions
+    }
+
+def _iter_result_ndjson(file_path, owner_id, folder_name, filename, offset, stop):
+    """
+    Streaming hasil sebagai NDJSON: baris pertama {"total": ...}, lalu satu objek per baris
+    {"row_id", "data", "action"}. File 'gzip' dibaca per blok agar tidak pernah utuh di memori;
+    file JSON lama di-parse sekali lalu dipotong per blok di memori (membaca ulang per blok = parse ulang seluruh file).
+    """
+    block_rows = app.config['RESULTS_BLOCK_ROWS']
+    all_rows = None if is_compressed_result(file_path) else read_result_rows(file_path)[0]
+
+    def read_block(start, end):
+        if all_rows is None:
+            return read_result_rows(file_path, start, end)
+        if not isinstance(all_rows, list):
+            return all_rows, None
+        return all_rows[start:end], len(all_rows)
+
+    rows, total = read_block(offset, min(offset + block_rows, stop or offset + block_rows))
+    if total is None:
+        yield json.dumps({"total": 0, "data": rows}, ensure_ascii=False) + "\n"
+        return
+    stop = total if stop is None else min(stop, total)
+    yield json.dumps({"total": total, "offset": offset}) + "\n"
+
+    position = offset
+    while rows:
+        actions = _row_actions_for_range(owner_id, folder_name, filename, position + 1, position + len(rows))
+        for row in rows:
+            position += 1
+            yield json.dumps({"row_id": position, "data": row, "action": actions.get(position)}, ensure_ascii=False) + "\n"
+        if position >= stop:
+            break
+        rows, _ = read_block(position, min(position + block_rows, stop))
+
 # --- TAMBAHAN BARU: API UNTUK MELIHAT ISI FILE JSON ---
 @app.route('/api/get_result_file', methods=['POST'])
 @login_required
 def api_get_result_file():
-    """Membaca dan mengembalikan isi file JSON yang disimpan, beserta status aksinya."""
+    """
+    Membaca dan mengembalikan isi file JSON yang disimpan, beserta status aksinya.
+    Opsional: 'offset' dan 'limit' untuk mengambil sebagian baris (dengan 'total' dan 'next_offset'),
+    serta 'format': 'ndjson' untuk streaming satu baris per objek. Tanpa 'limit' semua baris dikembalikan.
+    """
     data = request.json
     folder_name = data.get('folder_name')
     filename = data.get('filename')
@@ -1217,6 +3308,13 @@ def api_get_result_file():
 
     if not folder_name or not filename or not owner_id:
         return jsonify({"error": "Data tidak lengkap."}), 400
+
+    try:
+        offset = max(0, int(data.get('offset', 0)))
+        limit = data.get('limit')
+        limit = None if limit is None else max(1, min(int(limit), app.config['RESULT_MAX_PAGE_SIZE']))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Parameter offset/limit tidak valid."}), 400
     
     if '..' in folder_name or '..' in filename:
         return jsonify({"error": "Nama file/folder tidak valid."}), 400
@@ -1244,34 +3342,42 @@ def api_get_result_file():
         if not os.path.isfile(file_path):
             return jsonify({"error": "File tidak ditemukan."}), 404
 
-        # 1. Baca file JSON hasil analisis
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-            
+        if data.get('format') == 'ndjson':
+            stop = None if limit is None else offset + limit
+            return Response(
+                stream_with_context(_iter_result_ndjson(file_path, owner_id, folder_name, filename, offset, stop)),
+                mimetype='application/x-ndjson'
+            )
+
         # 2. >>>>>> TAMBAHAN: Ambil data aksi per baris dari database <<<<<<
-        row_actions = RowAction.query.filter_by(
-            owner_id=owner_id,
-            folder_name=folder_name,
-            filename=filename
-        ).all()
-
-        actions_data = {
-            action.row_id: {
-                'is_ganti': action.is_ganti, 
-                'pic_user_id': action.pic_user_id
-            } for action in row_actions
-        }
-        return jsonify({
-            "status": "success",
-            "data": json_data,
-            "actions": actions_data
-        })
-    
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
-        
-        return response
+        # row_id berbasis 1, jadi baris offset..offset+limit-1 = row_id offset+1..offset+limit.
+        # Aksi diambil lebih dulu karena ikut menentukan ETag (RowAction bisa berubah tanpa file berubah).
+        actions_data = _row_actions_for_range(
+            owner_id, folder_name, filename, offset + 1, None if limit is None else offset + limit
+        )
+        file_stat = os.stat(file_path)
+        etag = _etag_for(
+            "result", owner_id, folder_name, filename, file_stat.st_mtime_ns, file_stat.st_size,
+            offset, limit, actions_data
+        )
+
+        def build_payload():
+            # 1. Baca file hasil analisis (JSON lama atau format terkompresi), hanya rentang yang diminta
+            json_data, total = read_result_rows(file_path, offset, None if limit is None else offset + limit)
+            if total is None:
+                # Hasil bukan berupa daftar baris: kembalikan utuh seperti sebelumnya, tanpa aksi per baris
+                return {"status": "success", "data": json_data, "actions": {}, "total": 0, "offset": 0, "next_offset": None}
+            next_offset = offset + len(json_data)
+            return {
+                "status": "success",
+                "data": json_data,
+                "actions": actions_data,
+                "total": total,
+                "offset": offset,
+                "next_offset": next_offset if next_offset < total else None
+            }
+
+        return _conditional_json(etag, build_payload)
 
     except Exception as e:
         print(f"Error saat membaca file result: {e}")
@@ -1306,13 +3412,36 @@ def api_delete_result():
             return jsonify({"error": "File tidak ditemukan atau akses ditolak."}), 404
         
         os.remove(file_path)
+        ResultCatalog.query.filter_by(owner_id=current_user.id, folder_name=folder_name, filename=filename).delete()
+        db.session.commit()
         
         return jsonify({"status": "success", "message": f"File '{filename}' berhasil dihapus."}), 200
 
     except Exception as e:
+        db.session.rollback()
         print(f"Error saat menghapus file: {e}")
         return jsonify({"error": f"Gagal menghapus file: {e}"}), 500
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metrik format Prometheus (histogram tahap & request, token model, cache) untuk di-scrape."""
+    lookups = {}
+    for labels, value in metrics.counter_values("app_proofread_cache_total").items():
+        label_map = dict(labels)
+        totals = lookups.setdefault(label_map['cache'], {"hit": 0, "miss": 0})
+        totals[label_map['result']] += value
+    gauges = {
+        ("app_proofread_cache_hit_ratio", (("cache", cache_name),)): totals["hit"] / (totals["hit"] + totals["miss"])
+        for cache_name, totals in lookups.items() if totals["hit"] + totals["miss"]
+    }
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/model/metrics', methods=['GET'])
+@login_required
+def api_model_metrics():
+    """Metrik panggilan model AI per fitur (jumlah panggilan, error, retry, coalesced, latensi)."""
+    return jsonify(model_client.metrics())
+
 # --- Endpoint API Fitur (Dipertahankan) ---
 @app.route('/api/proofread/analyze', methods=['POST'])
 @login_required 
@@ -1322,50 +3451,215 @@ def api_proofread_analyze():
     file = request.files['file']
     
     try:
-        document_pages = _get_text_from_flask_file(file)
-        # Reset file pointer setelah dibaca (jika _get_text_from_flask_file tidak melakukannya)
-        file.seek(0)
-        all_errors = []
-        for page in document_pages:
-            found_errors_on_page = proofread_with_gemini(page['teks'])
-            for error in found_errors_on_page:
-                all_errors.append({
-                    "Kata/Frasa Salah": error['salah'],
-                    "Perbaikan Sesuai KBBI": error['benar'],
-                    "Pada Kalimat": error['kalimat'],
-                    "Ditemukan di Halaman": page['halaman']
-                })
+        document = ParsedDocument.from_upload(file)
+        cache_stats = {"hits": 0, "misses": 0}
+        all_errors = _build_proofread_rows(document, cache_stats)
         
-        return jsonify(all_errors)
+        # Jumlah halaman yang diambil dari cache vs dikirim ke AI
+        response = jsonify(all_errors)
+        response.headers['X-Proofread-Cache-Hits'] = str(cache_stats['hits'])
+        response.headers['X-Proofread-Cache-Misses'] = str(cache_stats['misses'])
+        return response
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def _generate_proofread_files(file, file_bytes):
-    """Helper internal untuk download, menjalankan analisis lagi."""
-    file_extension = file.filename.split('.')[-1].lower()
-    document_pages = _extract_text_with_pages(file_bytes, file_extension)
-    
+def _expand_batch_uploads(uploads):
+    """
+    Mengubah file unggahan batch menjadi ParsedDocument; isi file .zip dibuka menjadi dokumen terpisah.
+    Jumlah file dan total ukuran (file_size di header ZIP) dicek dulu terhadap BATCH_MAX_FILES dan
+    BATCH_MAX_TOTAL_MB, sehingga zip bomb atau ZIP berisi ribuan entri ditolak sebelum didekompresi.
+    """
+    max_files = app.config['BATCH_MAX_FILES']
+    max_bytes = app.config['BATCH_MAX_TOTAL_MB'] * 1024 * 1024
+    planned = []  # (archive, entry/upload, nama)
+    total_bytes = 0
+    archives = []
+    try:
+        for upload in uploads:
+            if upload.filename.lower().endswith('.zip'):
+                try:
+                    archive = zipfile.ZipFile(io.BytesIO(upload.read()))
+                except zipfile.BadZipFile:
+                    raise ValueError(f"File ZIP tidak valid: {upload.filename}")
+                archives.append(archive)
+                for entry in archive.infolist():
+                    name = os.path.basename(entry.filename)
+                    if entry.is_dir() or entry.filename.startswith('__MACOSX/') or name.startswith('.'):
+                        continue
+                    if name.split('.')[-1].lower() in ('pdf', 'docx'):
+                        planned.append((archive, entry, name))
+                        total_bytes += entry.file_size
+            else:
+                upload.stream.seek(0, os.SEEK_END)
+                total_bytes += upload.stream.tell()
+                upload.stream.seek(0)
+                planned.append((None, upload, upload.filename))
+
+            if len(planned) > max_files:
+                raise ValueError(f"Maksimal {max_files} file per batch")
+            if total_bytes > max_bytes:
+                raise ValueError(f"Total ukuran file batch melebihi {app.config['BATCH_MAX_TOTAL_MB']} MB")
+
+        documents = []
+        for archive, source, name in planned:
+            if archive is None:
+                documents.append(ParsedDocument.from_upload(source))
+            else:
+                try:
+                    documents.append(ParsedDocument(archive.read(source), name))
+                except zipfile.BadZipFile:
+                    raise ValueError(f"File ZIP tidak valid: {name}")
+        return documents
+    finally:
+        for archive in archives:
+            archive.close()
+
+@app.route('/api/proofread/batch', methods=['POST'])
+@login_required 
+def api_proofread_batch():
+    """
+    Proofread banyak file sekaligus (field 'files', boleh berisi .pdf, .docx, atau .zip) sebagai job
+    background; langsung mengembalikan job_id (lihat /api/jobs/<job_id>/stream).
+    Semua halaman dari semua file diproses di pool yang sama. Setiap file yang selesai dikirim
+    sebagai event 'file', dan jika 'folder_name' diisi, langsung disimpan ke folder tersebut dengan
+    format yang sama seperti /api/save_results, sehingga hasil yang sudah selesai tidak hilang.
+    """
+    uploads = request.files.getlist('files')
+    if not uploads:
+        return jsonify({"error": "Tidak ada file"}), 400
+
+    try:
+        documents = _expand_batch_uploads(uploads)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not documents:
+        return jsonify({"error": "Tidak ada file .pdf atau .docx di dalam unggahan"}), 400
+
+    folder_name = request.form.get('folder_name')
+    target_folder = None
+    if folder_name:
+        owner_id = request.form.get('owner_id', current_user.id)
+        if not str(owner_id).isdigit():
+            return jsonify({"error": "Owner ID tidak valid."}), 400
+        folder_path, error_response = _resolve_results_folder(owner_id, folder_name)
+        if error_response:
+            return error_response
+        target_folder = (owner_id, folder_name, folder_path)
+
+    try:
+        job_filename = documents[0].filename if len(documents) == 1 else f"{documents[0].filename} (+{len(documents) - 1} file)"
+        job = _create_analysis_job(BATCH_JOB_FEATURE, job_filename)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saat membuat job batch: {e}")
+        return jsonify({"error": "Gagal membuat job analisis."}), 500
+
+    _enqueue_analysis_job(job, {"documents": documents, "folder": target_folder}, _job_proofread_batch)
+    return jsonify({
+        "status": "success",
+        "job_id": job.id,
+        "log_id": job.log_id,
+        "files": [document.filename for document in documents]
+    }), 202
+
+def _save_result_now(owner_id, folder_name, folder_path, feature_type, original_filename, results_data):
+    """_write_results_file + commit langsung; file dihapus lagi jika commit gagal."""
+    save_path = None
+    try:
+        save_filename = _write_results_file(owner_id, folder_name, folder_path, feature_type, original_filename, results_data)
+        save_path = os.path.join(folder_path, save_filename)
+        db.session.commit()
+        return save_filename
+    except Exception:
+        db.session.rollback()
+        if save_path and os.path.exists(save_path):
+            os.remove(save_path)
+        raise
+
+def _job_proofread_batch(uploads, report_progress, publish_event):
+    """
+    Dijalankan di job_executor untuk /api/proofread/batch. Setiap file disimpan dan dikirim
+    sebagai event 'file' begitu semua halamannya selesai, bukan setelah seluruh batch selesai.
+    """
+    documents = uploads['documents']
+    target_folder = uploads['folder']
+    files = [None] * len(documents)
+    cache_stats = {"hits": 0, "misses": 0}
+
+    def document_done(doc_index, outcome):
+        document = documents[doc_index]
+        if outcome['error']:
+            entry = {"filename": document.filename, "error": outcome['error']}
+        else:
+            rows = []
+            for page_result in outcome['page_results']:
+                rows.extend(_proofread_rows_for_page(page_result))
+            entry = {"filename": document.filename, "results": rows, "total": len(rows)}
+            # Sama seperti /api/save_results: hasil kosong tidak disimpan
+            if target_folder and rows:
+                owner_id, folder_name, folder_path = target_folder
+                try:
+                    entry["saved_as"] = _save_result_now(owner_id, folder_name, folder_path, 'proofreading', document.filename, rows)
+                except Exception as e:
+                    print(f"Gagal menyimpan hasil batch {document.filename}: {e}")
+                    entry["save_error"] = str(e)
+        files[doc_index] = entry
+        publish_event('file', dict(entry, index=doc_index))
+        report_progress(int(sum(1 for item in files if item is not None) * 100 / len(files)))
+
+    proofread_documents_batch(documents, cache_stats, document_callback=document_done)
+    return {
+        "files": files,
+        "cache_hits": cache_stats['hits'],
+        "cache_misses": cache_stats['misses']
+    }
+
+def _proofread_rows_for_page(page_result):
+    """Menyusun baris tabel hasil proofread untuk satu halaman (format yang ditampilkan di frontend)."""
+    return [
+        {
+            "Kata/Frasa Salah": error['salah'],
+            "Perbaikan Sesuai KBBI": error['benar'],
+            "Pada Kalimat": error['kalimat'],
+            "Ditemukan di Halaman": page_result['halaman']
+        }
+        for error in page_result['errors']
+    ]
+
+def _build_proofread_rows(document, stats=None, progress_callback=None):
+    """Menyusun baris tabel hasil proofread untuk seluruh dokumen."""
     all_errors = []
-    for page in document_pages:
-        found_errors_on_page = proofread_with_gemini(page['teks'])
-        all_errors.extend(found_errors_on_page) 
+    for page_result in get_proofread_results(document, stats, progress_callback):
+        all_errors.extend(_proofread_rows_for_page(page_result))
+    return all_errors
 
-    revised_data = generate_revised_docx(file_bytes, all_errors)
-    highlighted_data = generate_highlighted_docx(file_bytes, all_errors)
-    
-    return revised_data, highlighted_data, file.filename
+def _collect_proofread_errors(document):
+    """Helper internal untuk download, memakai ulang hasil analisis dari cache bila ada."""
+    all_errors = []
+    for page_result in get_proofread_results(document):
+        all_errors.extend(page_result['errors'])
+    return all_errors
+
+def _build_proofread_documents(document):
+    """Membuat dokumen revisi dan highlight secara bersamaan; mengembalikan (revisi, highlight)."""
+    all_errors = _collect_proofread_errors(document)
+    # Parsing docx sekali di thread ini, bukan berebut di dua thread
+    if document.docx_tree is None:
+        raise ValueError("File hasil revisi hanya bisa dibuat dari file .docx")
+    revised_future = docx_executor.submit(build_revised_document, document, all_errors)
+    highlighted_doc = build_highlighted_document(document, all_errors)
+    return revised_future.result(), highlighted_doc
 
 @app.route('/api/proofread/download/revised', methods=['POST'])
 @login_required 
 def api_proofread_download_revised():
     if 'file' not in request.files:
         return jsonify({"error": "Tidak ada file"}), 400
-    file = request.files['file']
-    file_bytes = file.read() # Baca sekali
-    file.seek(0) # Reset pointer
+    document = ParsedDocument.from_upload(request.files['file']) # Baca sekali
     
     try:
-        revised_data, _, filename = _generate_proofread_files(file, file_bytes)
+        revised_data = generate_revised_docx(document, _collect_proofread_errors(document))
+        filename = document.filename
         
         return send_file(
             io.BytesIO(revised_data),
@@ -1382,12 +3676,11 @@ def api_proofread_download_revised():
 def api_proofread_download_highlighted():
     if 'file' not in request.files:
         return jsonify({"error": "Tidak ada file"}), 400
-    file = request.files['file']
-    file_bytes = file.read() # Baca sekali
-    file.seek(0)
+    document = ParsedDocument.from_upload(request.files['file']) # Baca sekali
     
     try:
-        _, highlighted_data, filename = _generate_proofread_files(file, file_bytes)
+        highlighted_data = generate_highlighted_docx(document, _collect_proofread_errors(document))
+        filename = document.filename
         
         return send_file(
             io.BytesIO(highlighted_data),
@@ -1403,23 +3696,63 @@ def api_proofread_download_highlighted():
 def api_proofread_download_zip():
     if 'file' not in request.files:
         return jsonify({"error": "Tidak ada file"}), 400
-    file = request.files['file']
-    file_bytes = file.read() # Baca sekali
-    file.seek(0)
+    document = ParsedDocument.from_upload(request.files['file']) # Baca sekali
     
     try:
-        revised_data, highlighted_data, filename = _generate_proofread_files(file, file_bytes)
-        zip_data = create_zip_archive(revised_data, highlighted_data, filename)
-        
-        return send_file(
-            io.BytesIO(zip_data),
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=f"hasil_proofread_{filename.split('.')[0]}.zip"
-        )
+        revised_doc, highlighted_doc = _build_proofread_documents(document)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+    # Dokumen sudah jadi; ZIP ditulis langsung ke respons sambil dikirim
+    filename = document.filename
+    response = Response(
+        iter_zip_stream([
+            (f"revisi_{filename}", revised_doc),
+            (f"highlight_{filename}", highlighted_doc),
+        ]),
+        mimetype='application/zip'
+    )
+    _set_attachment_filename(response, f"hasil_proofread_{filename.split('.')[0]}.zip")
+    return response
+
+def _set_attachment_filename(response, download_name):
+    """
+    Content-Disposition seperti send_file(download_name=...): nama non-ASCII dikirim sebagai
+    filename (fallback ASCII) + filename*=UTF-8''... (RFC 5987), karena header WSGI harus latin-1.
+    """
+    try:
+        download_name.encode('ascii')
+        names = {'filename': download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{url_quote(download_name, safe='!#$&+^`|~')}"}
+    response.headers.set('Content-Disposition', 'attachment', **names)
+
+def _analyze_compare_advanced(full_text1, full_text2):
+    # Panggil fungsi analisis yang sudah direvisi di atas
+    comparison_results_from_ai = analyze_document_by_section(full_text1, full_text2)
+    
+    # MODIFIKASI 1: Batasi hasil ke 100 teratas
+    limited_results = comparison_results_from_ai[:100]
+
+    # MODIFIKASI 2: Pemetaan dan format ulang data
+    final_results = []
+    for item in limited_results:
+        sub_bab_asli = item.get("sub_bab_asal", "N/A")
+        
+        try:
+            # Format nama sub-bab: Ambil teks setelah ':'
+            nama_sub_bab = sub_bab_asli.split(':', 1)[1].strip()
+        except (IndexError, AttributeError):
+            nama_sub_bab = sub_bab_asli
+        
+        final_results.append({
+            "Sub-bab Asal": nama_sub_bab,
+            "Kalimat yang Menyimpang di dokumen lainnya": item.get("kalimat_menyimpang", "N/A"),
+            "Alasan": item.get("alasan", "N/A")
+        })
+    return final_results
+
 @app.route('/api/compare/analyze_advanced', methods=['POST'])
 @login_required 
 def api_compare_analyze_advanced():
@@ -1430,32 +3763,10 @@ def api_compare_analyze_advanced():
     file2 = request.files['file2']
     
     try:
-        full_text1 = _get_full_text_from_file(file1)
-        full_text2 = _get_full_text_from_file(file2)
-        
-        # Panggil fungsi analisis yang sudah direvisi di atas
-        comparison_results_from_ai = analyze_document_by_section(full_text1, full_text2)
-        
-        # MODIFIKASI 1: Batasi hasil ke 100 teratas
-        limited_results = comparison_results_from_ai[:100]
-
-        # MODIFIKASI 2: Pemetaan dan format ulang data
-        final_results = []
-        for item in limited_results:
-            sub_bab_asli = item.get("sub_bab_asal", "N/A")
-            
-            try:
-                # Format nama sub-bab: Ambil teks setelah ':'
-                nama_sub_bab = sub_bab_asli.split(':', 1)[1].strip()
-            except (IndexError, AttributeError):
-                nama_sub_bab = sub_bab_asli
-            
-            final_results.append({
-                "Sub-bab Asal": nama_sub_bab,
-                "Kalimat yang Menyimpang di dokumen lainnya": item.get("kalimat_menyimpang", "N/A"),
-                "Alasan": item.get("alasan", "N/A")
-            })
+        full_text1 = ParsedDocument.from_upload(file1).full_text
+        full_text2 = ParsedDocument.from_upload(file2).full_text
         
+        final_results = _analyze_compare_advanced(full_text1, full_text2)
         return jsonify(final_results)
         
     except Exception as e:
@@ -1471,8 +3782,7 @@ def api_compare_analyze():
     file2 = request.files['file2']
     
     try:
-        # Kita tidak perlu membaca bytes di sini, langsung kirim objek file
-        results = _analyze_comparison(file1, file2)
+        results = _analyze_comparison(ParsedDocument.from_upload(file1), ParsedDocument.from_upload(file2))
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1487,24 +3797,15 @@ def api_compare_download():
     file2 = request.files['file2']
     
     try:
-        original_paras = extract_paragraphs(file1.read())
-        revised_paras = extract_paragraphs(file2.read())
+        original_paras = ParsedDocument.from_upload(file1).paragraphs
+        revised_paras = ParsedDocument.from_upload(file2).paragraphs
         comparison_results = []
-        matcher = difflib.SequenceMatcher(None, original_paras, revised_paras)
-        
-        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-            if tag == 'replace':
-                len_original = i2 - i1
-                len_revised = j2 - j1
-                for i in range(min(len_original, len_revised)):
-                    original_para = original_paras[i1 + i]
-                    revised_para = revised_paras[j1 + i]
-                    word_diff = find_word_diff(original_para, revised_para)
-                    comparison_results.append({
-                        "Kalimat Awal": original_para,
-                        "Kalimat Revisi": revised_para,
-                        "Kata yang Direvisi": word_diff,
-                    })
+        opcodes = diff_opcodes(original_paras, revised_paras)
+        for i, j in fuzzy_match_changes(original_paras, revised_paras, opcodes):
+            row = _comparison_row(original_paras, revised_paras, i, j)
+            # Dokumen Word cukup menampilkan teks paragraf revisi apa adanya
+            row["Kalimat Revisi"] = revised_paras[j] if j is not None else ""
+            comparison_results.append(row)
         
         if not comparison_results:
              return jsonify({"error": "Tidak ada perbedaan untuk diunduh"}), 400
@@ -1521,6 +3822,24 @@ def api_compare_download():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def _analyze_coherence(full_text):
+    issues_from_gemini = analyze_document_coherence(full_text)
+    
+    processed_issues = []
+    for issue in issues_from_gemini:
+        asli_text = issue['asli']
+        saran_text = issue['saran']
+        
+        saran_structured = _get_word_diff_structure(asli_text, saran_text)
+        
+        processed_issues.append({
+            "topik": issue['topik'],
+            "asli": asli_text,
+            "saran": saran_structured,
+            "catatan": issue['catatan']
+        })
+    return processed_issues
+
 @app.route('/api/coherence/analyze', methods=['POST'])
 @login_required 
 def api_coherence_analyze():
@@ -1529,29 +3848,13 @@ def api_coherence_analyze():
     file = request.files['file']
     
     try:
-        full_text = _get_full_text_from_file(file)
-        issues_from_gemini = analyze_document_coherence(full_text)
-        
-        processed_issues = []
-        for issue in issues_from_gemini:
-            asli_text = issue['asli']
-            saran_text = issue['saran']
-            
-            saran_structured = _get_word_diff_structure(asli_text, saran_text)
-            
-            processed_issues.append({
-                "topik": issue['topik'],
-                "asli": asli_text,
-                "saran": saran_structured,
-                "catatan": issue['catatan']
-            })
-            
+        full_text = ParsedDocument.from_upload(file).full_text
+        processed_issues = _analyze_coherence(full_text)
         return jsonify(processed_issues)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def _analyze_restructure(file):
-    full_text = _get_full_text_from_file(file)
+def _analyze_restructure(full_text):
     recommendations = get_structural_recommendations(full_text)
     processed_results = []
     for rec in recommendations:
@@ -1570,7 +3873,7 @@ def api_restructure_analyze():
     file = request.files['file']
     
     try:
-        results = _analyze_restructure(file)
+        results = _analyze_restructure(ParsedDocument.from_upload(file).full_text)
         return jsonify(results)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1580,14 +3883,10 @@ def api_restructure_analyze():
 def api_restructure_download():
     if 'file' not in request.files:
         return jsonify({"error": "Tidak ada file"}), 400
-    file = request.files['file']
-    file_bytes = file.read() # Baca sekali
-    file.seek(0) # Reset
+    document = ParsedDocument.from_upload(request.files['file']) # Baca sekali
     
     try:
-        # Gunakan file_bytes untuk ekstraksi teks, bukan 'file'
-        full_text = "\n".join([p['teks'] for p in _extract_text_with_pages(file_bytes, file.filename.split('.')[-1].lower())])
-        recommendations = get_structural_recommendations(full_text)
+        recommendations = get_structural_recommendations(document.full_text)
         processed_results = []
         for rec in recommendations:
             # Pastikan key di sini sesuai dengan output get_structural_recommendations
@@ -1598,43 +3897,357 @@ def api_restructure_download():
         if not processed_results or "Error:" in processed_results[0].get("Paragraf yang Perlu Dipindah", ""):
              return jsonify({"error": "Tidak ada rekomendasi valid untuk diunduh"}), 400
 
-        highlighted_data = create_recommendation_highlight_docx(file_bytes, processed_results)
+        highlighted_data = create_recommendation_highlight_docx(document, processed_results)
         
         return send_file(
             io.BytesIO(highlighted_data),
             mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
             as_attachment=True,
-            download_name=f"highlight_rekomendasi_{file.filename}"
+            download_name=f"highlight_rekomendasi_{document.filename}"
         )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
-# >>>>>> REVISION START: Route Komentar yang Diperbarui <<<<<<
-@app.route('/api/get_comments', methods=['POST'])
-@login_required
-def api_get_comments():
-    data = request.json
-    folder_name = data.get('folder_name')
-    filename = data.get('filename')
+# ==============================================================================
+# ===         ANTRIAN JOB ANALISIS (BACKGROUND)        ===
+# ==============================================================================
 
-    if not folder_name or not filename:
-        return jsonify({"error": "Data file tidak lengkap."}), 400
+def _job_proofread(uploads, report_progress, publish_event):
+    """Setiap halaman yang selesai langsung dikirim ke stream job sebagai event 'page'."""
+    rows_by_page = []
+    for page_result in iter_proofread_results(
+        uploads['file'],
+        progress_callback=lambda done, total: report_progress(int(done * 100 / total))
+    ):
+        rows = _proofread_rows_for_page(page_result)
+        publish_event('page', {"halaman": page_result['halaman'], "rows": rows})
+        rows_by_page.append((page_result['halaman'], rows))
+    # Hasil akhir diurutkan per halaman, sama seperti _build_proofread_rows
+    rows_by_page.sort(key=lambda item: item[0])
+    return [row for _, rows in rows_by_page for row in rows]
+
+def _job_compare_advanced(uploads, report_progress, publish_event):
+    full_text1 = uploads['file1'].full_text
+    full_text2 = uploads['file2'].full_text
+    report_progress(10)
+    return _analyze_compare_advanced(full_text1, full_text2)
+
+def _job_coherence(uploads, report_progress, publish_event):
+    full_text = uploads['file'].full_text
+    report_progress(10)
+    return _analyze_coherence(full_text)
+
+def _job_restructure(uploads, report_progress, publish_event):
+    full_text = uploads['file'].full_text
+    report_progress(10)
+    return _analyze_restructure(full_text)
+
+# feature_type job /api/proofread/batch (tidak lewat /api/jobs/<feature_type>)
+BATCH_JOB_FEATURE = 'proofreading_batch'
+
+# feature_type -> (fungsi job, field file yang dibutuhkan)
+# Fungsi job dipanggil sebagai fn(uploads, report_progress(persen), publish_event(nama, data))
+JOB_HANDLERS = {
+    'proofreading': (_job_proofread, ['file']),
+    'compare': (_job_compare_advanced, ['file1', 'file2']),
+    'coherence': (_job_coherence, ['file']),
+    'restructure': (_job_restructure, ['file']),
+}
+
+def _job_to_dict(job, include_result=False):
+    job_data = {
+        "job_id": job.id,
+        "feature_type": job.feature_type,
+        "filename": job.filename,
+        "status": job.status,
+        "progress": job.progress,
+        "log_id": job.log_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+    if include_result and job.status == 'done':
+        job_data["result"] = json.loads(job.result) if job.result else []
+    return job_data
+
+class JobEventBus:
+    """
+    Pemberitahuan perubahan job di dalam proses ini. Stream SSE menunggu di Condition dan
+    bangun saat job berubah, bukan membaca database setiap detik. Job yang berjalan di
+    proses lain tidak terdaftar di sini dan tetap terlihat lewat database setiap heartbeat.
+    """
+    def __init__(self, retention_seconds):
+        self.retention_seconds = retention_seconds
+        self._condition = threading.Condition()
+        self._jobs = {}  # job_id -> {"version", "events", "closed_at"}
+
+    def open(self, job_id):
+        with self._condition:
+            self._prune()
+            self._jobs[job_id] = {"version": 0, "events": [], "closed_at": None}
+
+    def publish(self, job_id, event=None, data=None):
+        """Menaikkan versi job (progres/status berubah); event opsional disimpan untuk stream."""
+        with self._condition:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return
+            if event:
+                entry["events"].append((event, data))
+            entry["version"] += 1
+            self._condition.notify_all()
+
+    def close(self, job_id):
+        with self._condition:
+            entry = self._jobs.get(job_id)
+            if entry is not None:
+                entry["closed_at"] = time.monotonic()
+                entry["version"] += 1
+            self._prune()
+            self._condition.notify_all()
+
+    def snapshot(self, job_id, after):
+        """(versi, event setelah indeks `after`) untuk job ini; (0, []) jika tidak terdaftar."""
+        with self._condition:
+            entry = self._jobs.get(job_id)
+            if entry is None:
+                return 0, []
+            return entry["version"], list(entry["events"][after:])
+
+    def wait(self, job_id, version, timeout):
+        """Menunggu sampai versi job berubah dari `version`. False jika timeout."""
+        def changed():
+            entry = self._jobs.get(job_id)
+            return entry is not None and entry["version"] != version
+        with self._condition:
+            return self._condition.wait_for(changed, timeout)
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [
+            job_id for job_id, entry in self._jobs.items()
+            if entry["closed_at"] is not None and entry["closed_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
 
-    # Ambil semua komentar untuk file ini, diurutkan dari yang terlama
-    all_comments = Comment.query.filter_by(
-        folder_name=folder_name,
+job_events = JobEventBus(app.config['JOB_EVENT_RETENTION_SECONDS'])
+
+def _run_analysis_job(job_id, uploads, handler=None):
+    """
+    Dijalankan di job_executor. Mengelola siklus hidup job dan AnalysisLog-nya.
+    `handler` default diambil dari JOB_HANDLERS sesuai feature_type job.
+    """
+    with app.app_context():
+        try:
+            job = AnalysisJob.query.get(job_id)
+            if not job:
+                return
+            handler = handler or JOB_HANDLERS[job.feature_type][0]
+
+            job.status = 'running'
+            job.started_at = datetime.datetime.utcnow()
+            db.session.commit()
+            job_events.publish(job_id)
+
+            def report_progress(percent):
+                # Simpan progres maksimal 99% sampai hasil benar-benar tersimpan
+                percent = max(0, min(99, percent))
+                if percent != job.progress:
+                    job.progress = percent
+                    db.session.commit()
+                    job_events.publish(job_id)
+
+            def publish_event(event, data):
+                job_events.publish(job_id, event, data)
+
+            try:
+                results = handler(uploads, report_progress, publish_event)
+                job.result = json.dumps(results, ensure_ascii=False)
+                job.status = 'done'
+                job.progress = 100
+            except Exception as e:
+                db.session.rollback()
+                print(f"Job analisis {job_id} gagal: {e}")
+                job.status = 'error'
+                job.error = str(e)
+
+            job.finished_at = datetime.datetime.utcnow()
+            if job.log:
+                job.log.end_time = job.finished_at
+                job.log.status = job.status
+            db.session.commit()
+        finally:
+            job_events.close(job_id)
+            db.session.remove()
+
+def fail_orphaned_jobs():
+    """
+    Job yang masih queued/running saat tidak ada worker yang hidup berasal dari proses sebelumnya
+    dan tidak akan pernah selesai (antriannya hanya ada di memori). Tandai sebagai error beserta log-nya.
+    Dipanggil oleh CLI fail-orphaned-jobs, atau saat start jika JOB_STARTUP_SWEEP=1.
+    """
+    with app.app_context():
+        if not sqlalchemy.inspect(db.engine).has_table(AnalysisJob.__tablename__):
+            return 0
+        try:
+            orphaned = AnalysisJob.query.filter(AnalysisJob.status.in_(('queued', 'running'))).all()
+            finished_at = datetime.datetime.utcnow()
+            for job in orphaned:
+                job.status = 'error'
+                job.error = "Server dimulai ulang sebelum job selesai. Silakan kirim ulang analisis."
+                job.finished_at = finished_at
+                if job.log:
+                    job.log.end_time = finished_at
+                    job.log.status = 'error'
+            db.session.commit()
+            if orphaned:
+                print(f"{len(orphaned)} job analisis yang terputus ditandai error.")
+            return len(orphaned)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Gagal menandai job yang terputus: {e}")
+            return 0
+        finally:
+            db.session.remove()
+
+def _create_analysis_job(feature_type, filename):
+    """Membuat AnalysisJob (status queued) beserta AnalysisLog-nya untuk user saat ini, lalu commit."""
+    new_log = AnalysisLog(
+        user_id=current_user.id,
+        filename=filename,
+        feature_type=feature_type,
+        status='unfinished'
+    )
+    db.session.add(new_log)
+    db.session.flush()
+
+    job = AnalysisJob(
+        id=uuid.uuid4().hex,
+        user_id=current_user.id,
+        log_id=new_log.id,
+        feature_type=feature_type,
         filename=filename
-    ).order_by(Comment.timestamp.asc()).all()
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
 
-    # Buat dictionary untuk memetakan ID ke objek komentar
-    comments_by_id = {c.id: c for c in all_comments}
-    
-    # Pisahkan komentar utama (yang tidak punya parent)
-    top_level_comments = [c for c in all_comments if c.parent_id is None]
+def _enqueue_analysis_job(job, uploads, handler=None):
+    job_events.open(job.id)
+    job_executor.submit(_run_analysis_job, job.id, uploads, handler)
+
+@app.route('/api/jobs/<feature_type>', methods=['POST'])
+@login_required
+def api_submit_job(feature_type):
+    """Mengirim analisis ke antrian background dan langsung mengembalikan job_id."""
+    if feature_type not in JOB_HANDLERS:
+        return jsonify({"error": "Jenis analisis tidak dikenal."}), 400
+
+    _, required_files = JOB_HANDLERS[feature_type]
+    if any(field not in request.files for field in required_files):
+        return jsonify({"error": f"File yang dibutuhkan: {', '.join(required_files)}"}), 400
+
+    # Baca isi file di sini karena objek file request tidak bisa dipakai setelah response dikirim
+    uploads = {field: ParsedDocument.from_upload(request.files[field]) for field in required_files}
+
+    try:
+        job = _create_analysis_job(feature_type, uploads[required_files[0]].filename)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saat membuat job analisis: {e}")
+        return jsonify({"error": "Gagal membuat job analisis."}), 500
+
+    _enqueue_analysis_job(job, uploads)
+    return jsonify({"status": "success", "job_id": job.id, "log_id": job.log_id}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def api_get_job(job_id):
+    """Status dan progres job. Hasil ikut dikirim jika job sudah selesai."""
+    job = AnalysisJob.query.get(job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({"error": "Job tidak ditemukan atau akses ditolak."}), 404
+    return jsonify(_job_to_dict(job, include_result=True)), 200
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+@login_required
+def api_stream_job(job_id):
+    """
+    Server-Sent Events: mengirim progres job setiap kali berubah, event yang dipublikasikan job
+    (mis. 'page' untuk setiap halaman proofread yang selesai), lalu hasil akhirnya (event 'end').
+    Stream menunggu pemberitahuan dari job_events, bukan polling database. Setelah
+    JOB_STREAM_MAX_SECONDS stream ditutup dengan event 'reconnect' {"after": n}; klien menyambung
+    lagi ke URL yang sama dengan ?after=n agar event yang sudah diterima tidak dikirim ulang.
+    """
+    job = AnalysisJob.query.get(job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({"error": "Job tidak ditemukan atau akses ditolak."}), 404
+    after = max(0, request.args.get('after', 0, type=int))
+
+    def generate():
+        sent = after
+        last_state = None
+        deadline = time.monotonic() + app.config['JOB_STREAM_MAX_SECONDS']
+        while True:
+            # Versi diambil sebelum membaca database agar perubahan di antaranya tidak terlewat
+            version, _ = job_events.snapshot(job_id, sent)
+            db.session.expire_all()
+            current_job = AnalysisJob.query.get(job_id)
+            if current_job is None:
+                payload = json.dumps({"job_id": job_id, "status": "error", "error": "Job sudah dihapus."})
+                yield f"event: end\ndata: {payload}\n\n"
+                return
+
+            # Event halaman dipublikasikan sebelum status job disimpan, jadi semuanya terkirim sebelum 'end'
+            _, events = job_events.snapshot(job_id, sent)
+            for event, data in events:
+                sent += 1
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+            state = (current_job.status, current_job.progress)
+            if state != last_state:
+                finished = current_job.status in ('done', 'error')
+                payload = json.dumps(_job_to_dict(current_job, include_result=finished), ensure_ascii=False)
+                yield f"event: {'end' if finished else 'progress'}\ndata: {payload}\n\n"
+                if finished:
+                    return
+                last_state = state
+            # Jangan tahan koneksi database selama menunggu
+            db.session.close()
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield f"event: reconnect\ndata: {json.dumps({'after': sent})}\n\n"
+                return
+            if not job_events.wait(job_id, version, min(app.config['JOB_STREAM_HEARTBEAT'], remaining)):
+                yield ": keep-alive\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+# >>>>>> REVISION START: Route Komentar yang Diperbarui <<<<<<
+def _has_folder_access(owner_id, folder_name):
+    """Pemilik folder atau user yang menerima share folder tersebut."""
+    if str(current_user.id) == str(owner_id):
+        return True
+    return SharedFolder.query.filter_by(
+        owner_id=owner_id,
+        folder_name=folder_name,
+        shared_with_id=current_user.id
+    ).first() is not None
 
-    # Fungsi rekursif untuk membangun struktur bersarang
-    def build_comment_tree(comment):
-        comment_dict = {
+def build_comment_threads(all_comments):
+    """
+    Menyusun komentar (urut dari yang terlama) menjadi pohon balasan dalam satu kali lewat:
+    setiap komentar dipetakan berdasarkan id, lalu ditempelkan ke 'replies' milik parent-nya.
+    Balasan yang parent-nya tidak ada di daftar ikut dibuang, sama seperti sebelumnya.
+    """
+    nodes = {}
+    for comment in all_comments:
+        nodes[comment.id] = {
             'id': comment.id,
             'row_id': comment.row_id,
             'username': comment.username,
@@ -1642,16 +4255,40 @@ def api_get_comments():
             'timestamp': comment.timestamp.isoformat(),
             'replies': []
         }
-        # Cari semua balasan untuk komentar ini
-        for reply in all_comments:
-            if reply.parent_id == comment.id:
-                comment_dict['replies'].append(build_comment_tree(reply))
-        return comment_dict
 
-    # Bangun struktur pohon untuk setiap komentar utama
-    nested_comments = [build_comment_tree(c) for c in top_level_comments]
+    top_level_comments = []
+    for comment in all_comments:
+        if comment.parent_id is None:
+            top_level_comments.append(nodes[comment.id])
+        elif comment.parent_id in nodes:
+            nodes[comment.parent_id]['replies'].append(nodes[comment.id])
+    return top_level_comments
+
+@app.route('/api/get_comments', methods=['POST'])
+@login_required
+def api_get_comments():
+    data = request.json
+    folder_name = data.get('folder_name')
+    filename = data.get('filename')
+    # Pemilik hasil (bisa berbeda dari user saat ini untuk folder yang di-share)
+    owner_id = data.get('owner_id', current_user.id)
+
+    if not folder_name or not filename:
+        return jsonify({"error": "Data file tidak lengkap."}), 400
+
+    if not _has_folder_access(owner_id, folder_name):
+        return jsonify({"error": "Akses ditolak."}), 403
+
+    # Komentar hanya ditambah (tidak diedit/dihapus), jadi (jumlah, id terbesar) cukup sebagai versi
+    comments_query = Comment.query.filter_by(owner_id=owner_id, folder_name=folder_name, filename=filename)
+    etag = _etag_for("comments", owner_id, folder_name, filename, _table_version(comments_query, Comment))
 
-    return jsonify(nested_comments), 200
+    def build_payload():
+        # Ambil semua komentar untuk file ini, diurutkan dari yang terlama
+        all_comments = comments_query.order_by(Comment.timestamp.asc(), Comment.id.asc()).all()
+        return build_comment_threads(all_comments)
+
+    return _conditional_json(etag, build_payload)
 
 @app.route('/add_comment', methods=['POST'])
 @login_required 
@@ -1662,13 +4299,18 @@ def add_comment():
     row_id = data.get('rowId')
     text = data.get('text')
     parent_id = data.get('parentId') # Bisa None jika ini komentar utama
+    # Komentar disimpan atas nama pemilik hasil, bukan pemberi komentar (nama pemberi ada di 'username')
+    owner_id = data.get('ownerId', current_user.id)
 
     if not folder_name or not filename or not row_id or not text:
         return jsonify({'status': 'error', 'message': 'Data komentar tidak lengkap.'}), 400
 
+    if not _has_folder_access(owner_id, folder_name):
+        return jsonify({'status': 'error', 'message': 'Akses ditolak.'}), 403
+
     try:
         new_comment = Comment(
-            owner_id=current_user.id,
+            owner_id=int(owner_id),
             folder_name=folder_name,
             filename=filename,
             row_id=row_id,
@@ -1703,8 +4345,6 @@ def api_save_row_action():
         filename = data.get('filename')
         owner_id = data.get('owner_id')
         row_id = data.get('row_id')
-        is_ganti = data.get('is_ganti', False)
-        pic_user_id = data.get('pic_user_id')
 
         # --- Validasi Kelengkapan Data ---
         if not all([folder_name, filename, owner_id is not None, row_id is not None]):
@@ -1721,29 +4361,8 @@ def api_save_row_action():
         if not is_owner and not is_shared_to_me:
             return jsonify({"error": "Akses ditolak. Anda tidak memiliki izin untuk file ini."}), 403
 
-        # --- Operasi Database: Cari atau Buat Data Baru ---
-        action = RowAction.query.filter_by(
-            owner_id=owner_id,
-            folder_name=folder_name,
-            filename=filename,
-            row_id=row_id
-        ).first()
-
-        if action:
-            # Update data yang sudah ada
-            action.is_ganti = is_ganti
-            action.pic_user_id = pic_user_id
-        else:
-            # Buat data baru
-            action = RowAction(
-                owner_id=owner_id,
-                folder_name=folder_name,
-                filename=filename,
-                row_id=row_id,
-                is_ganti=is_ganti,
-                pic_user_id=pic_user_id
-            )
-            db.session.add(action)
+        # --- Operasi Database: Insert atau Update dalam satu statement ---
+        upsert_row_actions(owner_id, folder_name, filename, _parse_row_actions([data]))
         
         db.session.commit()
         
@@ -1772,6 +4391,42 @@ def api_save_row_action():
         print(f"Error saat menyimpan status baris: {e}")
         return jsonify({"error": f"Gagal menyimpan status: {str(e)}"}), 500
 
+@app.route('/api/save_row_actions', methods=['POST'])
+@login_required
+def api_save_row_actions():
+    """
+    Versi batch /api/save_row_action: {folder_name, filename, owner_id, actions: [{row_id, is_ganti, pic_user_id}, ...]}.
+    Dipakai frontend untuk mengirim perubahan beberapa baris sekaligus (setelah debounce).
+    """
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Format data yang dikirim tidak valid. Harus berupa JSON objek."}), 400
+
+    folder_name = data.get('folder_name')
+    filename = data.get('filename')
+    owner_id = data.get('owner_id')
+    items = data.get('actions')
+
+    if not folder_name or not filename or owner_id is None or not isinstance(items, list):
+        return jsonify({"error": "Data tidak lengkap. Diperlukan: folder_name, filename, owner_id, actions (list)."}), 400
+
+    if not _has_folder_access(owner_id, folder_name):
+        return jsonify({"error": "Akses ditolak. Anda tidak memiliki izin untuk file ini."}), 403
+
+    try:
+        actions = _parse_row_actions(items)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Data aksi tidak valid: {e}"}), 400
+
+    try:
+        saved = upsert_row_actions(owner_id, folder_name, filename, actions)
+        db.session.commit()
+        return jsonify({"status": "success", "message": f"Status {saved} baris berhasil disimpan.", "saved": saved}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saat menyimpan status baris (batch): {e}")
+        return jsonify({"error": f"Gagal menyimpan status: {str(e)}"}), 500
+
 @app.route('/log_analysis')
 @login_required
 def log_analysis_page():
@@ -2115,5 +4770,9 @@ def api_mark_message_read(message_id):
         print(f"Error saat menandai pesan sebagai dibaca: {e}")
         return jsonify({"error": "Gagal memperbarui status pesan."}), 500
 
+# Proses anak 'spawn' (ekstraksi PDF) ikut mengimpor script utama; sweep hanya di proses induk
+if app.config['JOB_STARTUP_SWEEP'] and multiprocessing.parent_process() is None:
+    fail_orphaned_jobs()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
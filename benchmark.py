@@ -0,0 +1,1033 @@
+"""
+Benchmark sederhana untuk pipeline analisis, menggunakan backend model lokal
+(FakeModelBackend) sehingga bisa dijalankan tanpa GOOGLE_API_KEY dan tanpa biaya.
+
+Contoh:
+    python benchmark.py proofread --pages 1 10 20 40 --latency 0.2
+    python benchmark.py chunking --pages 200
+    python benchmark.py extraction --pages 50 200 500
+    python benchmark.py pdf-parallel --pages 500 --processes 1 2 4 8
+    python benchmark.py alignment --sentences 1000 5000
+    python benchmark.py fuzzy --sentences 500 2000 5000
+    python benchmark.py batch --files 50 --pages 2 --latency 0.2
+    python benchmark.py e2e --pages 5 20 50 --repeat 5 --output instance/benchmark_e2e.json
+    python benchmark.py highlight --pages 100 --terms 500
+    python benchmark.py revise --pages 100 --errors 500
+    python benchmark.py zip --pages 100 --errors 200 --image-mb 20
+"""
+import argparse
+import datetime
+import difflib
+import functools
+import inspect
+import io
+import json
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+
+import docx
+import sqlalchemy
+import sqlalchemy.orm
+import fitz
+
+# Benchmark selalu memakai FakeModelBackend; jangan coba mengkonfigurasi Google AI saat import
+os.environ.setdefault("MODEL_BACKEND", "fake")
+
+import app as proofread_app
+
+
+def _make_pages(page_count):
+    return [
+        {"halaman": i + 1, "teks": f"Halaman {i + 1}. Hal itu terjadi dikarenakan kelalaian petugas."}
+        for i in range(page_count)
+    ]
+
+
+def _use_temp_caches():
+    """Arahkan cache proofread ke folder sementara agar hasil benchmark tidak terpengaruh run sebelumnya."""
+    for key in ('PROOFREAD_CACHE_DIR', 'PROOFREAD_PAGE_CACHE_DIR'):
+        proofread_app.app.config[key] = tempfile.mkdtemp(prefix='bench_cache_')
+
+
+def bench_proofread(page_counts, latency):
+    proofread_app.model = proofread_app.FakeModelBackend(latency)
+    _use_temp_caches()
+    workers = proofread_app.app.config['PROOFREAD_MAX_WORKERS']
+    print(f"Latensi model {latency:.2f}s, PROOFREAD_MAX_WORKERS={workers}")
+    print(f"{'halaman':>8} {'serial (s)':>12} {'paralel (s)':>12} {'speedup':>8}")
+
+    for page_count in page_counts:
+        pages = _make_pages(page_count)
+
+        start = time.perf_counter()
+        for page in pages:
+            proofread_app.proofread_with_gemini(page['teks'])
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = proofread_app.proofread_pages_concurrently(pages)
+        concurrent = time.perf_counter() - start
+
+        assert [page['halaman'] for page, _ in results] == list(range(1, page_count + 1))
+        print(f"{page_count:>8} {serial:>12.2f} {concurrent:>12.2f} {serial / concurrent:>7.1f}x")
+
+
+def make_synthetic_document(page_count, chars_per_page=3000):
+    """Teks dokumen sintetis dengan struktur BAB / sub-bab, kurang lebih chars_per_page karakter per halaman."""
+    sentence = "Satuan Kerja Audit Internal melakukan reviu atas pengendalian intern perusahaan. "
+    sentences_per_page = max(1, chars_per_page // len(sentence))
+    lines = []
+    for page in range(page_count):
+        if page % 20 == 0:
+            lines.append(f"BAB {page // 20 + 1}")
+        if page % 4 == 0:
+            lines.append(f"{page // 20 + 1}.{page % 20 // 4 + 1} Sub-bab Halaman {page + 1}")
+        lines.append(sentence * sentences_per_page)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def make_synthetic_pdf(page_count, chars_per_page=3000, label=""):
+    """
+    PDF sintetis: setiap halaman berisi teks padat (dengan nomor halaman agar teks tiap halaman unik).
+    `label` ditambahkan di awal setiap halaman agar beberapa PDF tidak saling memakai memo halaman.
+    """
+    sentence = "Satuan Kerja Audit Internal melakukan reviu atas pengendalian intern perusahaan. "
+    pdf_document = fitz.open()
+    for page_num in range(page_count):
+        page = pdf_document.new_page()
+        text = f"{label}Halaman {page_num + 1}. " + sentence * max(1, chars_per_page // len(sentence))
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=6)
+    pdf_bytes = pdf_document.tobytes()
+    pdf_document.close()
+    return pdf_bytes
+
+
+def _traced_peak(run):
+    """Menjalankan run() dan mengembalikan (hasil, puncak memori Python dalam MB, waktu dalam detik)."""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / (1024 * 1024), elapsed
+
+
+def bench_extraction(page_counts):
+    proofread_app.model = proofread_app.FakeModelBackend(0)
+    print(f"{'halaman':>8} {'tahap':>14} {'eager (MB)':>11} {'stream (MB)':>12} {'eager (s)':>10} {'stream (s)':>11}")
+
+    for page_count in page_counts:
+        pdf_bytes = make_synthetic_pdf(page_count)
+
+        def eager_sentences():
+            pages = proofread_app._extract_text_with_pages(pdf_bytes, 'pdf')
+            return len(proofread_app.extract_sentences_with_pages(pages))
+
+        def stream_sentences():
+            return len(proofread_app.extract_sentences_with_pages(proofread_app.iter_text_pages(pdf_bytes, 'pdf')))
+
+        def eager_proofread():
+            _use_temp_caches()
+            pages = proofread_app._extract_text_with_pages(pdf_bytes, 'pdf')
+            return len(proofread_app.proofread_pages_concurrently(pages))
+
+        def stream_proofread():
+            _use_temp_caches()
+            document = proofread_app.ParsedDocument(pdf_bytes, 'bench.pdf')
+            return len(proofread_app.get_proofread_results(document))
+
+        for stage, eager, stream in (
+            ("kalimat", eager_sentences, stream_sentences),
+            ("proofread", eager_proofread, stream_proofread),
+        ):
+            eager_result, eager_peak, eager_time = _traced_peak(eager)
+            stream_result, stream_peak, stream_time = _traced_peak(stream)
+            assert eager_result == stream_result
+            print(f"{page_count:>8} {stage:>14} {eager_peak:>11.1f} {stream_peak:>12.1f} {eager_time:>10.2f} {stream_time:>11.2f}")
+
+
+def bench_pdf_parallel(page_count, process_counts):
+    pdf_bytes = make_synthetic_pdf(page_count)
+    config = proofread_app.app.config
+    original = (config['PDF_EXTRACT_PROCESSES'], config['PDF_PARALLEL_MIN_PAGES'])
+    cpu_count = os.cpu_count() or 1
+    print(f"PDF sintetis {page_count} halaman, CPU tersedia: {cpu_count}")
+    if max(process_counts) > cpu_count:
+        print(f"Peringatan: jumlah proses > {cpu_count} CPU; angka speedup di atas itu tidak bermakna.")
+    # 'pages' = ParsedDocument.pages (compare/coherence), 'iter_pages' = jalur streaming (proofread, kalimat)
+    print(f"{'proses':>7} {'pages (s)':>10} {'speedup':>8} {'iter_pages (s)':>15} {'speedup':>8}")
+
+    expected = None
+    baseline = None
+    for processes in process_counts:
+        config['PDF_EXTRACT_PROCESSES'] = processes
+        config['PDF_PARALLEL_MIN_PAGES'] = 1
+        # Panggilan pertama juga membuat process pool; yang diukur adalah panggilan berikutnya
+        proofread_app._extract_text_with_pages(pdf_bytes, 'pdf')
+        start = time.perf_counter()
+        pages = proofread_app._extract_text_with_pages(pdf_bytes, 'pdf')
+        list_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        streamed = list(proofread_app.ParsedDocument(pdf_bytes, 'bench.pdf').iter_pages())
+        iter_elapsed = time.perf_counter() - start
+
+        expected = expected or pages
+        assert pages == expected and streamed == expected
+        baseline = baseline or (list_elapsed, iter_elapsed)
+        print(f"{processes:>7} {list_elapsed:>10.2f} {baseline[0] / list_elapsed:>7.1f}x "
+              f"{iter_elapsed:>15.2f} {baseline[1] / iter_elapsed:>7.1f}x")
+
+    config['PDF_EXTRACT_PROCESSES'], config['PDF_PARALLEL_MIN_PAGES'] = original
+
+
+def make_revised_sentences(sentence_count, edit_ratio=0.05, seed=0):
+    """Pasangan (asli, revisi): kalimat unik dengan sebagian kecil diganti, dihapus, disisipkan, atau dipindah."""
+    rng = random.Random(seed)
+    original = [
+        f"Kalimat {i} menjelaskan temuan audit nomor {i} pada unit kerja {i % 37}."
+        for i in range(sentence_count)
+    ]
+    revised = list(original)
+    for _ in range(int(sentence_count * edit_ratio)):
+        position = rng.randrange(len(revised))
+        action = rng.random()
+        if action < 0.5:
+            revised[position] = revised[position].replace("menjelaskan", "menguraikan")
+        elif action < 0.7:
+            del revised[position]
+        elif action < 0.9:
+            revised.insert(position, f"Kalimat sisipan {rng.randrange(10 ** 6)} tentang tindak lanjut.")
+        else:
+            revised.insert(rng.randrange(len(revised)), revised.pop(position))
+    return original, revised
+
+
+def _legacy_alignment(original, revised):
+    """Alur lama: SequenceMatcher atas kalimat dan dua kali diff kata untuk setiap pasangan."""
+    rows = 0
+    matcher = difflib.SequenceMatcher(None, original, revised)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'replace':
+            for original_sentence, revised_sentence in zip(original[i1:i2], revised[j1:j2]):
+                proofread_app.find_word_diff(original_sentence, revised_sentence)
+                proofread_app._get_word_diff_structure(original_sentence, revised_sentence)
+                rows += 1
+    return rows
+
+
+def _new_alignment(original, revised):
+    rows = 0
+    for tag, i1, i2, j1, j2 in proofread_app.diff_opcodes(original, revised):
+        if tag == 'replace':
+            for original_sentence, revised_sentence in zip(original[i1:i2], revised[j1:j2]):
+                proofread_app._word_diff(original_sentence, revised_sentence)
+                rows += 1
+    return rows
+
+
+def bench_alignment(sentence_counts):
+    print(f"{'kalimat':>8} {'lama (s)':>10} {'baru (s)':>10} {'speedup':>8} {'baris lama':>11} {'baris baru':>11}")
+    for sentence_count in sentence_counts:
+        original, revised = make_revised_sentences(sentence_count)
+
+        start = time.perf_counter()
+        legacy_rows = _legacy_alignment(original, revised)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        new_rows = _new_alignment(original, revised)
+        new = time.perf_counter() - start
+        print(f"{sentence_count:>8} {legacy:>10.2f} {new:>10.2f} {legacy / new:>7.1f}x {legacy_rows:>11} {new_rows:>11}")
+
+
+def _all_pairs_matches(original, revised, threshold):
+    """Pembanding naif: Jaccard untuk semua pasangan kalimat (kuadratik)."""
+    original_shingles = [proofread_app._shingles(sentence) for sentence in original]
+    matches = 0
+    for sentence in revised:
+        shingles = proofread_app._shingles(sentence)
+        best = max((proofread_app._jaccard(candidate, shingles) for candidate in original_shingles), default=0)
+        matches += best >= threshold
+    return matches
+
+
+def bench_fuzzy(sentence_counts):
+    """Dokumen revisi = kalimat asli yang diacak dan sedikit diedit, jadi semuanya jatuh ke blok yang berubah."""
+    threshold = proofread_app.app.config['COMPARE_FUZZY_THRESHOLD']
+    print(f"{'kalimat':>8} {'semua pasangan (s)':>19} {'LSH (s)':>8} {'cocok naif':>11} {'cocok LSH':>10} {'sisa':>6}")
+    for sentence_count in sentence_counts:
+        original, revised = make_revised_sentences(sentence_count, edit_ratio=0.2)
+        rng = random.Random(1)
+        revised = [sentence.replace("audit", "pemeriksaan") if rng.random() < 0.5 else sentence for sentence in revised]
+        rng.shuffle(revised)
+
+        start = time.perf_counter()
+        naive_matches = _all_pairs_matches(original, revised, threshold)
+        naive = time.perf_counter() - start
+
+        start = time.perf_counter()
+        opcodes = proofread_app.diff_opcodes(original, revised)
+        pairs = proofread_app.fuzzy_match_changes(original, revised, opcodes)
+        lsh = time.perf_counter() - start
+
+        matched = sum(1 for i, j in pairs if i is not None and j is not None)
+        leftovers = len(pairs) - matched
+        print(f"{sentence_count:>8} {naive:>19.2f} {lsh:>8.2f} {naive_matches:>11} {matched:>10} {leftovers:>6}")
+
+
+def bench_batch(file_count, page_count, latency):
+    """Throughput proofread: file diproses satu per satu (seperti unggah manual) vs satu batch."""
+    proofread_app.model = proofread_app.FakeModelBackend(latency)
+    workers = proofread_app.app.config['PROOFREAD_MAX_WORKERS']
+    total_pages = file_count * page_count
+    print(f"{file_count} file x {page_count} halaman, latensi model {latency:.2f}s, PROOFREAD_MAX_WORKERS={workers}")
+    print(f"{'mode':>10} {'waktu (s)':>10} {'halaman/menit':>14}")
+
+    pdfs = [make_synthetic_pdf(page_count, chars_per_page=500, label=f"Dokumen {n}. ") for n in range(file_count)]
+
+    def documents():
+        return [proofread_app.ParsedDocument(pdf_bytes, f"dokumen_{n}.pdf") for n, pdf_bytes in enumerate(pdfs)]
+
+    _use_temp_caches()
+    start = time.perf_counter()
+    for document in documents():
+        proofread_app.get_proofread_results(document)
+    per_file = time.perf_counter() - start
+
+    _use_temp_caches()
+    start = time.perf_counter()
+    outcomes = proofread_app.proofread_documents_batch(documents())
+    batch = time.perf_counter() - start
+
+    assert all(outcome['error'] is None and len(outcome['page_results']) == page_count for outcome in outcomes)
+    for mode, elapsed in (("per file", per_file), ("batch", batch)):
+        print(f"{mode:>10} {elapsed:>10.2f} {total_pages / elapsed * 60:>14.0f}")
+
+
+def make_synthetic_docx(page_count, chars_per_page=3000, revised=False):
+    """
+    DOCX sintetis dengan BAB / sub-bab dan kalimat unik. Varian `revised` mengubah sebagian kalimat,
+    menghapus dan menyisipkan beberapa, serta memindahkan satu paragraf, untuk endpoint compare.
+    """
+    sentences_per_page = max(1, chars_per_page // 90)
+    paragraphs = []
+    for page in range(page_count):
+        if page % 20 == 0:
+            paragraphs.append(f"BAB {page // 20 + 1}")
+        if page % 4 == 0:
+            paragraphs.append(f"{page // 20 + 1}.{page % 20 // 4 + 1} Sub-bab Halaman {page + 1}")
+        for start in range(0, sentences_per_page, 5):
+            sentences = []
+            for n in range(start, min(start + 5, sentences_per_page)):
+                sentence = f"Satuan Kerja Audit Internal melakukan reviu nomor {page}-{n} atas pengendalian intern perusahaan."
+                if revised and n % 7 == 3:
+                    sentence = sentence.replace("melakukan reviu", "melaksanakan reviu")
+                if revised and n % 11 == 5:
+                    continue
+                sentences.append(sentence)
+            if revised and start == 0 and page % 3 == 1:
+                sentences.append(f"Kalimat tambahan pada halaman {page + 1} mengenai tindak lanjut temuan.")
+            paragraphs.append(" ".join(sentences))
+    if revised and len(paragraphs) > 4:
+        paragraphs.append(paragraphs.pop(2))
+
+    document = docx.Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    output_buffer = io.BytesIO()
+    document.save(output_buffer)
+    return output_buffer.getvalue()
+
+
+class StageProfiler:
+    """
+    Mengukur waktu CPU dan wall per tahap (extraction, splitting, diffing, docx, model) dengan
+    membungkus fungsi-fungsi app. Tahap bersarang dihitung eksklusif: saat fungsi splitting
+    memanggil ekstraksi halaman, waktu ekstraksi tidak ikut dihitung sebagai splitting.
+    """
+
+    STAGES = {
+        "extraction": ["iter_text_pages", "_extract_text_with_pages", "ParsedDocument.docx_tree",
+                       "ParsedDocument.pages", "ParsedDocument.full_text", "ParsedDocument.paragraphs"],
+        "splitting": ["extract_sentences_with_pages", "split_text_into_sentences", "split_into_sections",
+                      "chunk_text_by_tokens", "_pair_sections_for_comparison"],
+        "diffing": ["diff_opcodes", "fuzzy_match_changes", "_word_diff"],
+        "docx": ["build_revised_document", "build_highlighted_document", "_docx_bytes", "iter_zip_stream",
+                 "create_comparison_docx", "create_recommendation_highlight_docx"],
+        "model": ["ModelClient.generate"],
+    }
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._originals = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.totals = {stage: {"cpu_s": 0.0, "wall_s": 0.0, "calls": 0} for stage in self.STAGES}
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: {key: round(value, 4) for key, value in stats.items()} for stage, stats in self.totals.items()}
+
+    def _charge(self, stage, cpu, wall):
+        with self._lock:
+            self.totals[stage]["cpu_s"] += cpu
+            self.totals[stage]["wall_s"] += wall
+
+    def _enter(self, stage):
+        stack = self._local.__dict__.setdefault("stack", [])
+        now_cpu, now_wall = time.thread_time(), time.perf_counter()
+        if stack:
+            outer = stack[-1]
+            self._charge(outer[0], now_cpu - outer[1], now_wall - outer[2])
+        stack.append([stage, now_cpu, now_wall])
+        with self._lock:
+            self.totals[stage]["calls"] += 1
+
+    def _exit(self):
+        stack = self._local.stack
+        stage, started_cpu, started_wall = stack.pop()
+        now_cpu, now_wall = time.thread_time(), time.perf_counter()
+        self._charge(stage, now_cpu - started_cpu, now_wall - started_wall)
+        if stack:
+            stack[-1][1], stack[-1][2] = now_cpu, now_wall
+
+    def _wrap(self, stage, func):
+        profiler = self
+
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                iterator = func(*args, **kwargs)
+                while True:
+                    profiler._enter(stage)
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        profiler._exit()
+                    yield item
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler._enter(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler._exit()
+        return wrapper
+
+    def install(self):
+        for stage, names in self.STAGES.items():
+            for name in names:
+                owner_name, _, attr = name.rpartition('.')
+                owner = getattr(proofread_app, owner_name) if owner_name else proofread_app
+                original = owner.__dict__[attr] if owner_name else getattr(proofread_app, attr)
+                if isinstance(original, functools.cached_property):
+                    replacement = functools.cached_property(self._wrap(stage, original.func))
+                    replacement.__set_name__(owner, attr)
+                else:
+                    replacement = self._wrap(stage, original)
+                setattr(owner, attr, replacement)
+                self._originals.append((owner, attr, original))
+
+    def uninstall(self):
+        for owner, attr, original in reversed(self._originals):
+            setattr(owner, attr, original)
+        self._originals = []
+
+
+class RssSampler:
+    """Mencatat RSS tertinggi selama blok `with` (sampling /proc/self/statm; fallback ru_maxrss)."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+
+    @staticmethod
+    def current_rss_mb():
+        try:
+            with open('/proc/self/statm') as f:
+                resident_pages = int(f.read().split()[1])
+            return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+        except (OSError, ValueError, IndexError):
+            # ru_maxrss dalam KB di Linux; ini puncak seumur proses, bukan per tahap
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, self.current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = self.current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self.current_rss_mb())
+
+
+def _percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "p50": round(percentile(0.50), 2),
+        "p90": round(percentile(0.90), 2),
+        "p95": round(percentile(0.95), 2),
+        "p99": round(percentile(0.99), 2),
+        "max": round(ordered[-1], 2),
+        "mean": round(sum(ordered) / len(ordered), 2),
+    }
+
+
+E2E_ENDPOINTS = [
+    # (nama, path, format, field file: "asli"/"revisi")
+    ("proofread_analyze", "/api/proofread/analyze", "pdf", {"file": "asli"}),
+    ("proofread_analyze", "/api/proofread/analyze", "docx", {"file": "asli"}),
+    ("proofread_download_revised", "/api/proofread/download/revised", "docx", {"file": "asli"}),
+    ("proofread_download_highlighted", "/api/proofread/download/highlighted", "docx", {"file": "asli"}),
+    ("proofread_download_zip", "/api/proofread/download/zip", "docx", {"file": "asli"}),
+    ("compare_analyze", "/api/compare/analyze", "docx", {"file1": "asli", "file2": "revisi"}),
+    ("compare_analyze_advanced", "/api/compare/analyze_advanced", "docx", {"file1": "asli", "file2": "revisi"}),
+    ("compare_download", "/api/compare/download", "docx", {"file1": "asli", "file2": "revisi"}),
+    ("coherence_analyze", "/api/coherence/analyze", "docx", {"file": "asli"}),
+    ("restructure_analyze", "/api/restructure/analyze", "docx", {"file": "asli"}),
+    ("restructure_download", "/api/restructure/download", "docx", {"file": "asli"}),
+]
+
+
+def bench_e2e(page_counts, repeat, latency, output_path):
+    """
+    Menjalankan setiap endpoint analisis lewat Flask test client dengan backend model lokal,
+    untuk beberapa ukuran dokumen. Cache proofread dikosongkan sebelum setiap request (jalur dingin).
+    """
+    config = proofread_app.app.config
+    config['LOGIN_DISABLED'] = True
+    proofread_app.model = proofread_app.FakeModelBackend(latency)
+    client = proofread_app.app.test_client()
+    profiler = StageProfiler()
+    profiler.install()
+    cache_root = tempfile.mkdtemp(prefix='bench_e2e_')
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "model_latency_s": latency,
+            "repeat": repeat,
+            "page_counts": page_counts,
+        },
+        "results": [],
+    }
+    print(f"{'endpoint':>30} {'format':>6} {'halaman':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'RSS (MB)':>9}  CPU per tahap (s)")
+
+    try:
+        for page_count in page_counts:
+            corpus = {
+                ("pdf", "asli"): make_synthetic_pdf(page_count),
+                ("docx", "asli"): make_synthetic_docx(page_count),
+                ("docx", "revisi"): make_synthetic_docx(page_count, revised=True),
+            }
+            for name, path, file_format, fields in E2E_ENDPOINTS:
+                samples_ms = []
+                statuses = set()
+                profiler.reset()
+                with RssSampler() as rss:
+                    for _ in range(repeat):
+                        for key in ('PROOFREAD_CACHE_DIR', 'PROOFREAD_PAGE_CACHE_DIR'):
+                            config[key] = os.path.join(cache_root, key.lower())
+                            shutil.rmtree(config[key], ignore_errors=True)
+                            os.makedirs(config[key])
+                        data = {
+                            field: (io.BytesIO(corpus[(file_format, variant)]), f"{variant}.{file_format}")
+                            for field, variant in fields.items()
+                        }
+                        start = time.perf_counter()
+                        response = client.post(path, data=data, content_type='multipart/form-data')
+                        response.get_data()
+                        samples_ms.append((time.perf_counter() - start) * 1000)
+                        statuses.add(response.status_code)
+
+                stages = profiler.snapshot()
+                latency_stats = _percentiles(samples_ms)
+                report["results"].append({
+                    "endpoint": name,
+                    "path": path,
+                    "format": file_format,
+                    "pages": page_count,
+                    "status_codes": sorted(statuses),
+                    "latency_ms": latency_stats,
+                    "peak_rss_mb": round(rss.peak_mb, 1),
+                    "stages": stages,
+                })
+                stage_summary = " ".join(
+                    f"{stage}={stats['cpu_s']:.2f}" for stage, stats in stages.items() if stats['calls']
+                )
+                print(f"{name:>30} {file_format:>6} {page_count:>8} {latency_stats['p50']:>9.1f} "
+                      f"{latency_stats['p95']:>9.1f} {rss.peak_mb:>9.1f}  {stage_summary}")
+    finally:
+        profiler.uninstall()
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan di {output_path}")
+
+
+def _legacy_highlighted_docx(document, errors):
+    """Implementasi lama generate_highlighted_docx: re.split terpisah untuk setiap istilah di setiap paragraf."""
+    doc = document.editable_docx()
+    unique_salah = set(e.get("salah") for e in errors if e.get("salah"))
+    for para in doc.paragraphs:
+        for term in unique_salah:
+            if term and term.lower() in para.text.lower():
+                full_text = para.text
+                para.clear()
+                parts = re.split(f'({re.escape(term)})', full_text, flags=re.IGNORECASE)
+                for part in parts:
+                    if part:
+                        run = para.add_run(part)
+                        if part.lower() == term.lower():
+                            run.font.highlight_color = proofread_app.WD_COLOR_INDEX.YELLOW
+    output_buffer = io.BytesIO()
+    doc.save(output_buffer)
+    return output_buffer.getvalue()
+
+
+def _legacy_revised_docx(document, errors):
+    """Implementasi lama generate_revised_docx: scan semua paragraf per kesalahan dan menimpa para.text."""
+    doc = document.editable_docx()
+    for error in reversed(errors):
+        salah, benar = error.get("salah"), error.get("benar")
+        if not salah or not benar:
+            continue
+        for para in doc.paragraphs:
+            if salah in para.text:
+                para.text = para.text.replace(salah, benar)
+    output_buffer = io.BytesIO()
+    doc.save(output_buffer)
+    return output_buffer.getvalue()
+
+
+def _italic_docx(page_count):
+    """DOCX sintetis dengan kata 'reviu' di run italic terpisah, untuk mengecek format setelah revisi."""
+    document = docx.Document(io.BytesIO(make_synthetic_docx(page_count)))
+    for para in document.paragraphs:
+        text = para.text
+        if " reviu " not in text:
+            continue
+        before, _, after = text.partition(" reviu ")
+        para.clear()
+        para.add_run(before + " ")
+        para.add_run("reviu").italic = True
+        para.add_run(" " + after)
+    output_buffer = io.BytesIO()
+    document.save(output_buffer)
+    return output_buffer.getvalue()
+
+
+def bench_revise(page_count, error_count):
+    docx_bytes = _italic_docx(page_count)
+    rng = random.Random(0)
+    sentences_per_page = max(1, 3000 // 90)
+    errors = [
+        {"salah": f"nomor {page}-{n} atas", "benar": f"nomor {page}-{n} terhadap"}
+        for page, n in ((rng.randrange(page_count), rng.randrange(sentences_per_page)) for _ in range(error_count // 2))
+    ]
+    errors += [{"salah": f"istilahtidakada{n}", "benar": "x"} for n in range(error_count - len(errors))]
+    print(f"DOCX sintetis {page_count} halaman, {len(errors)} kesalahan")
+    print(f"{'versi':>8} {'waktu (s)':>10} {'run italic tersisa':>19}")
+
+    for name, run in (
+        ("lama", lambda: _legacy_revised_docx(proofread_app.ParsedDocument(docx_bytes, "bench.docx"), errors)),
+        ("baru", lambda: proofread_app.generate_revised_docx(proofread_app.ParsedDocument(docx_bytes, "bench.docx"), errors)),
+    ):
+        start = time.perf_counter()
+        output = run()
+        elapsed = time.perf_counter() - start
+        italic_runs = sum(1 for para in docx.Document(io.BytesIO(output)).paragraphs for r in para.runs if r.italic)
+        print(f"{name:>8} {elapsed:>10.2f} {italic_runs:>19}")
+
+
+def _docx_with_image(page_count, image_mb):
+    """DOCX sintetis ditambah gambar PNG acak (tidak bisa dikompres) sebesar kira-kira image_mb MB."""
+    document = docx.Document(io.BytesIO(make_synthetic_docx(page_count)))
+    if image_mb > 0:
+        side = int((image_mb * 1024 * 1024 / 3) ** 0.5)
+        pixmap = fitz.Pixmap(fitz.csRGB, side, side, os.urandom(side * side * 3), 0)
+        document.add_picture(io.BytesIO(pixmap.tobytes("png")))
+    output_buffer = io.BytesIO()
+    document.save(output_buffer)
+    return output_buffer.getvalue()
+
+
+def bench_zip(page_count, error_count, image_mb):
+    """Download ZIP proofread: bytes utuh + BytesIO (lama) vs dokumen paralel + ZIP streaming (baru)."""
+    docx_bytes = _docx_with_image(page_count, image_mb)
+    rng = random.Random(0)
+    errors = [
+        {"salah": f"nomor {rng.randrange(page_count)}-{rng.randrange(30)} atas", "benar": "nomor terhadap"}
+        for _ in range(error_count)
+    ]
+    print(f"DOCX sintetis {page_count} halaman ({len(docx_bytes) / 1024 / 1024:.1f} MB), {len(errors)} kesalahan")
+    print(f"{'versi':>8} {'waktu (s)':>10} {'puncak memori (MB)':>19} {'ukuran ZIP (MB)':>16}")
+
+    def legacy():
+        document = proofread_app.ParsedDocument(docx_bytes, "bench.docx")
+        revised_data = proofread_app.generate_revised_docx(document, errors)
+        highlighted_data = proofread_app.generate_highlighted_docx(document, errors)
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("revisi_bench.docx", revised_data)
+            zip_file.writestr("highlight_bench.docx", highlighted_data)
+        return len(io.BytesIO(zip_buffer.getvalue()).getvalue())
+
+    def streaming():
+        document = proofread_app.ParsedDocument(docx_bytes, "bench.docx")
+        document.docx_tree
+        revised_future = proofread_app.docx_executor.submit(proofread_app.build_revised_document, document, errors)
+        highlighted_doc = proofread_app.build_highlighted_document(document, errors)
+        entries = [("revisi_bench.docx", revised_future.result()), ("highlight_bench.docx", highlighted_doc)]
+        # Respons hanya memegang potongan yang sedang dikirim
+        return sum(len(chunk) for chunk in proofread_app.iter_zip_stream(entries))
+
+    for name, run in (("lama", legacy), ("baru", streaming)):
+        size, peak, elapsed = _traced_peak(run)
+        print(f"{name:>8} {elapsed:>10.2f} {peak:>19.1f} {size / 1024 / 1024:>16.1f}")
+
+
+def bench_storage(row_count, page_rows):
+    """File hasil: JSON indent=2 (lama) vs gzip per blok; ukuran, baca penuh, dan baca satu halaman baris."""
+    rng = random.Random(0)
+    rows = [
+        {
+            "Kata/Frasa Salah": f"nomor {n}-{rng.randrange(30)} atas",
+            "Perbaikan Sesuai KBBI": f"nomor {n} terhadap",
+            "Pada Kalimat": f"Kalimat reviu nomor {n} tentang pengendalian intern yang memuat kesalahan atas penulisan.",
+            "Ditemukan di Halaman": n // 20 + 1
+        }
+        for n in range(row_count)
+    ]
+    middle = row_count // 2
+    print(f"{row_count} baris hasil, baca sebagian = baris {middle}..{middle + page_rows}")
+    print(f"{'format':>8} {'ukuran (KB)':>12} {'tulis (ms)':>11} {'baca penuh (ms)':>16} {'baca sebagian (ms)':>19}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for storage_format in ("json", "gzip"):
+            file_path = os.path.join(tmp_dir, f"hasil_{storage_format}.json")
+            start = time.perf_counter()
+            proofread_app.write_result_rows(file_path, rows, storage_format=storage_format)
+            write_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            full, total = proofread_app.read_result_rows(file_path)
+            full_ms = (time.perf_counter() - start) * 1000
+            assert full == rows and total == row_count
+
+            start = time.perf_counter()
+            part, _ = proofread_app.read_result_rows(file_path, middle, middle + page_rows)
+            part_ms = (time.perf_counter() - start) * 1000
+            assert part == rows[middle:middle + page_rows]
+
+            size_kb = os.path.getsize(file_path) / 1024
+            print(f"{storage_format:>8} {size_kb:>12.1f} {write_ms:>11.1f} {full_ms:>16.1f} {part_ms:>19.2f}")
+
+
+def _legacy_comment_tree(all_comments):
+    """build_comment_tree lama dari api_get_comments: memindai semua komentar untuk setiap komentar (O(n^2))."""
+    def build_comment_tree(comment):
+        comment_dict = {
+            'id': comment.id,
+            'row_id': comment.row_id,
+            'username': comment.username,
+            'text': comment.text,
+            'timestamp': comment.timestamp.isoformat(),
+            'replies': []
+        }
+        for reply in all_comments:
+            if reply.parent_id == comment.id:
+                comment_dict['replies'].append(build_comment_tree(reply))
+        return comment_dict
+
+    return [build_comment_tree(c) for c in all_comments if c.parent_id is None]
+
+
+def bench_comments(comment_count, reply_ratio):
+    """
+    get_comments untuk satu file: query tanpa/dengan owner_id + pohon O(n^2) (lama) vs O(n) (baru).
+    Dua pemilik memakai nama folder/file yang sama, sehingga query lama ikut membaca komentar pemilik lain.
+    """
+    rng = random.Random(0)
+    db_dir = tempfile.mkdtemp(prefix='bench_comments_')
+    engine = sqlalchemy.create_engine(f"sqlite:///{os.path.join(db_dir, 'comments.db')}")
+    Comment = proofread_app.Comment
+    Comment.__table__.create(engine)
+    started = datetime.datetime(2025, 1, 1)
+    with sqlalchemy.orm.Session(engine) as session:
+        for owner_id in (1, 2):
+            ids = []
+            for n in range(comment_count):
+                # Sebagian komentar adalah balasan untuk komentar sebelumnya (bisa bersarang)
+                parent_id = rng.choice(ids) if ids and rng.random() < reply_ratio else None
+                comment = Comment(
+                    owner_id=owner_id, folder_name="Laporan", filename="hasil.json",
+                    row_id=rng.randrange(1, 2000), username=f"user{rng.randrange(20)}",
+                    text=f"Komentar {n}", parent_id=parent_id,
+                    timestamp=started + datetime.timedelta(seconds=n)
+                )
+                session.add(comment)
+                session.flush()
+                ids.append(comment.id)
+        session.commit()
+
+        def legacy():
+            comments = session.query(Comment).filter_by(folder_name="Laporan", filename="hasil.json") \
+                .order_by(Comment.timestamp.asc()).all()
+            return _legacy_comment_tree(comments)
+
+        def new():
+            comments = session.query(Comment).filter_by(owner_id=1, folder_name="Laporan", filename="hasil.json") \
+                .order_by(Comment.timestamp.asc(), Comment.id.asc()).all()
+            return proofread_app.build_comment_threads(comments)
+
+        print(f"{comment_count} komentar per file x 2 pemilik, {reply_ratio:.0%} balasan")
+        print(f"{'versi':>8} {'waktu (s)':>10} {'komentar utama':>15}")
+        for name, run in (("lama", legacy), ("baru", new)):
+            session.expunge_all()
+            start = time.perf_counter()
+            tree = run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>8} {elapsed:>10.2f} {len(tree):>15}")
+    engine.dispose()
+    shutil.rmtree(db_dir, ignore_errors=True)
+
+
+def bench_row_actions(row_count):
+    """
+    Menyimpan aksi per baris satu file hasil: SELECT lalu insert/update per baris (lama)
+    vs INSERT ... ON CONFLICT per 150 baris (baru). Masing-masing dua kali: simpan baru dan update semua baris.
+    """
+    rng = random.Random(0)
+    RowAction = proofread_app.RowAction
+    rounds = [
+        {row_id: (rng.random() < 0.5, rng.choice([None, 1, 2, 3])) for row_id in range(1, row_count + 1)}
+        for _ in range(2)
+    ]
+
+    def legacy(session, actions):
+        for row_id, (is_ganti, pic_user_id) in actions.items():
+            action = session.query(RowAction).filter_by(
+                owner_id=1, folder_name="Laporan", filename="hasil.json", row_id=row_id
+            ).first()
+            if action:
+                action.is_ganti = is_ganti
+                action.pic_user_id = pic_user_id
+            else:
+                session.add(RowAction(
+                    owner_id=1, folder_name="Laporan", filename="hasil.json",
+                    row_id=row_id, is_ganti=is_ganti, pic_user_id=pic_user_id
+                ))
+
+    def bulk(session, actions):
+        proofread_app.upsert_row_actions(1, "Laporan", "hasil.json", actions, session=session)
+
+    print(f"{row_count} aksi baris per penyimpanan")
+    print(f"{'versi':>8} {'simpan baru (s)':>16} {'update (s)':>11} {'baris di DB':>12}")
+    for name, save in (("lama", legacy), ("baru", bulk)):
+        db_dir = tempfile.mkdtemp(prefix='bench_row_actions_')
+        engine = sqlalchemy.create_engine(f"sqlite:///{os.path.join(db_dir, 'actions.db')}")
+        RowAction.__table__.create(engine)
+        timings = []
+        with sqlalchemy.orm.Session(engine) as session:
+            for actions in rounds:
+                start = time.perf_counter()
+                save(session, actions)
+                session.commit()
+                timings.append(time.perf_counter() - start)
+            stored = {
+                action.row_id: (action.is_ganti, action.pic_user_id)
+                for action in session.query(RowAction).all()
+            }
+        assert stored == rounds[-1]
+        engine.dispose()
+        shutil.rmtree(db_dir, ignore_errors=True)
+        print(f"{name:>8} {timings[0]:>16.2f} {timings[1]:>11.2f} {len(stored):>12}")
+
+
+def _count_highlighted_runs(docx_bytes):
+    document = docx.Document(io.BytesIO(docx_bytes))
+    return sum(1 for para in document.paragraphs for run in para.runs if run.font.highlight_color is not None)
+
+
+def bench_highlight(page_count, term_count):
+    docx_bytes = make_synthetic_docx(page_count)
+    # Separuh istilah ada di dokumen (nomor reviu unik + beberapa frasa umum), separuh tidak
+    rng = random.Random(0)
+    sentences_per_page = max(1, 3000 // 90)
+    present = [f"nomor {rng.randrange(page_count)}-{rng.randrange(sentences_per_page)}" for _ in range(term_count // 2 - 3)]
+    present += ["pengendalian intern", "Audit Internal", "reviu"]
+    absent = [f"istilahtidakada{n}" for n in range(term_count - len(present))]
+    errors = [{"salah": term, "benar": term} for term in present + absent]
+    print(f"DOCX sintetis {page_count} halaman, {len(errors)} istilah")
+    print(f"{'versi':>8} {'waktu (s)':>10} {'run disorot':>12}")
+
+    for name, run in (
+        ("lama", lambda: _legacy_highlighted_docx(proofread_app.ParsedDocument(docx_bytes, "bench.docx"), errors)),
+        ("baru", lambda: proofread_app.generate_highlighted_docx(proofread_app.ParsedDocument(docx_bytes, "bench.docx"), errors)),
+    ):
+        start = time.perf_counter()
+        output = run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:>8} {elapsed:>10.2f} {_count_highlighted_runs(output):>12}")
+
+
+def bench_chunking(page_count, latency, latency_per_1k_tokens):
+    full_text = make_synthetic_document(page_count)
+    print(f"Dokumen sintetis {page_count} halaman, ~{proofread_app.estimate_tokens(full_text)} token")
+    print(f"{'analisis':>12} {'mode':>10} {'prompt maks (token)':>20} {'panggilan':>10} {'waktu (s)':>10} {'hasil':>6}")
+
+    analyzers = [
+        ("coherence", lambda: proofread_app.analyze_document_coherence(full_text)),
+        ("restructure", lambda: proofread_app.get_structural_recommendations(full_text)),
+        ("compare", lambda: proofread_app.analyze_document_by_section(full_text, full_text)),
+    ]
+    default_budget = proofread_app.app.config['CHUNK_TOKEN_BUDGET']
+    for name, run in analyzers:
+        for mode, budget in (("utuh", 10 ** 9), ("chunked", default_budget)):
+            proofread_app.app.config['CHUNK_TOKEN_BUDGET'] = budget
+            stub = proofread_app.FakeModelBackend(latency, latency_per_1k_tokens)
+            proofread_app.model = stub
+
+            start = time.perf_counter()
+            results = run()
+            elapsed = time.perf_counter() - start
+            print(f"{name:>12} {mode:>10} {stub.max_prompt_tokens:>20} {stub.calls:>10} {elapsed:>10.2f} {len(results):>6}")
+    proofread_app.app.config['CHUNK_TOKEN_BUDGET'] = default_budget
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline analisis dengan model tiruan.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    proofread_parser = subparsers.add_parser("proofread", help="Proofread per halaman: serial vs paralel.")
+    proofread_parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    proofread_parser.add_argument("--latency", type=float, default=0.2)
+
+    chunking_parser = subparsers.add_parser("chunking", help="Coherence/restructure/compare: prompt utuh vs chunked.")
+    chunking_parser.add_argument("--pages", type=int, default=200)
+    chunking_parser.add_argument("--latency", type=float, default=0.2)
+    chunking_parser.add_argument("--latency-per-1k-tokens", type=float, default=0.05)
+
+    extraction_parser = subparsers.add_parser("extraction", help="Puncak memori ekstraksi PDF: eager vs streaming.")
+    extraction_parser.add_argument("--pages", type=int, nargs="+", default=[50, 200, 500])
+
+    pdf_parallel_parser = subparsers.add_parser("pdf-parallel", help="Ekstraksi PDF besar di 1..N proses.")
+    pdf_parallel_parser.add_argument("--pages", type=int, default=500)
+    pdf_parallel_parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    alignment_parser = subparsers.add_parser("alignment", help="Alignment kalimat compare: SequenceMatcher vs patience diff.")
+    alignment_parser.add_argument("--sentences", type=int, nargs="+", default=[1000, 5000])
+
+    fuzzy_parser = subparsers.add_parser("fuzzy", help="Pencocokan kalimat berpindah: semua pasangan vs MinHash/LSH.")
+    fuzzy_parser.add_argument("--sentences", type=int, nargs="+", default=[500, 2000, 5000])
+
+    batch_parser = subparsers.add_parser("batch", help="Throughput proofread banyak file: per file vs batch.")
+    batch_parser.add_argument("--files", type=int, default=50)
+    batch_parser.add_argument("--pages", type=int, default=2)
+    batch_parser.add_argument("--latency", type=float, default=0.2)
+
+    e2e_parser = subparsers.add_parser("e2e", help="Semua endpoint analisis lewat Flask test client, hasil ke JSON.")
+    e2e_parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 50])
+    e2e_parser.add_argument("--repeat", type=int, default=5)
+    e2e_parser.add_argument("--latency", type=float, default=0.05)
+    # Default di instance/ (di-.gitignore), bukan di root repo
+    e2e_parser.add_argument("--output", default=os.path.join(proofread_app.app.instance_path, "benchmark_e2e.json"))
+
+    highlight_parser = subparsers.add_parser("highlight", help="generate_highlighted_docx: per istilah vs satu regex.")
+    highlight_parser.add_argument("--pages", type=int, default=100)
+    highlight_parser.add_argument("--terms", type=int, default=500)
+
+    revise_parser = subparsers.add_parser("revise", help="generate_revised_docx: scan per kesalahan vs indeks + edit per run.")
+    revise_parser.add_argument("--pages", type=int, default=100)
+    revise_parser.add_argument("--errors", type=int, default=500)
+
+    zip_parser = subparsers.add_parser("zip", help="Download ZIP proofread: salinan di memori vs streaming.")
+    zip_parser.add_argument("--pages", type=int, default=100)
+    zip_parser.add_argument("--errors", type=int, default=200)
+    zip_parser.add_argument("--image-mb", type=float, default=20)
+
+    storage_parser = subparsers.add_parser("storage", help="File hasil tersimpan: JSON biasa vs gzip per blok.")
+    storage_parser.add_argument("--rows", type=int, default=50000)
+    storage_parser.add_argument("--page-rows", type=int, default=100)
+
+    comments_parser = subparsers.add_parser("comments", help="get_comments: pohon komentar O(n^2) vs O(n).")
+    comments_parser.add_argument("--comments", type=int, default=10000)
+    comments_parser.add_argument("--reply-ratio", type=float, default=0.5)
+
+    row_actions_parser = subparsers.add_parser("row-actions", help="Simpan aksi baris: query per baris vs upsert massal.")
+    row_actions_parser.add_argument("--rows", type=int, default=5000)
+
+    args = parser.parse_args()
+    # Backend lokal tidak punya kuota; rate limit aplikasi hanya akan mengukur token bucket
+    proofread_app.app.config['MODEL_BACKEND'] = 'fake'
+    proofread_app.app.config['MODEL_RATE_PER_MINUTE'] = 0
+    if args.command == "proofread":
+        bench_proofread(args.pages, args.latency)
+    elif args.command == "chunking":
+        bench_chunking(args.pages, args.latency, args.latency_per_1k_tokens)
+    elif args.command == "extraction":
+        bench_extraction(args.pages)
+    elif args.command == "pdf-parallel":
+        bench_pdf_parallel(args.pages, args.processes)
+    elif args.command == "alignment":
+        bench_alignment(args.sentences)
+    elif args.command == "fuzzy":
+        bench_fuzzy(args.sentences)
+    elif args.command == "batch":
+        bench_batch(args.files, args.pages, args.latency)
+    elif args.command == "e2e":
+        bench_e2e(args.pages, args.repeat, args.latency, args.output)
+    elif args.command == "highlight":
+        bench_highlight(args.pages, args.terms)
+    elif args.command == "revise":
+        bench_revise(args.pages, args.errors)
+    elif args.command == "zip":
+        bench_zip(args.pages, args.errors, args.image_mb)
+    elif args.command == "storage":
+        bench_storage(args.rows, args.page_rows)
+    elif args.command == "comments":
+        bench_comments(args.comments, args.reply_ratio)
+    elif args.command == "row-actions":
+        bench_row_actions(args.rows)
+
+
+if __name__ == '__main__':
+    main()
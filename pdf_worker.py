@@ -0,0 +1,17 @@
+"""
+Fungsi yang dijalankan di process pool ekstraksi PDF (lihat _get_pdf_process_pool di app.py).
+
+Pool memakai start method 'spawn', sehingga setiap proses anak mengimpor modul fungsi yang
+dikirim kepadanya. Fungsi ini sengaja dipisah dari app.py agar proses anak hanya mengimpor
+PyMuPDF, bukan seluruh aplikasi (konfigurasi model, database, thread pool).
+"""
+import fitz
+
+
+def extract_page_range(pdf_path, start_page, end_page):
+    """Dijalankan di proses terpisah: ekstrak teks halaman [start_page, end_page) dari file PDF sementara."""
+    with fitz.open(pdf_path) as pdf_document:
+        return [
+            {"halaman": page_num + 1, "teks": pdf_document.load_page(page_num).get_text()}
+            for page_num in range(start_page, end_page)
+        ]
@@ -21,6 +21,40 @@ const shareModal = document.getElementById("share-modal");
 const folderSelectDropdown = document.getElementById("folder-select-dropdown");
 const folderHistoryDetail = document.getElementById("folder-history-detail");
 
+// Cache respons API yang memakai ETag (daftar folder, riwayat, file hasil, komentar).
+// Permintaan berikutnya mengirim If-None-Match; jika server membalas 304, isi cache dipakai lagi.
+const ETAG_CACHE_MAX_ENTRIES = 100;
+const etagCache = new Map(); // key -> { etag, body }
+
+/**
+ * Pengganti fetch() untuk endpoint yang mengirim ETag. Selalu mengembalikan Response biasa
+ * (304 diubah menjadi 200 berisi data dari cache), sehingga pemanggil tidak perlu berubah.
+ */
+async function cachedFetch(url, options = {}) {
+    const key = `${options.method || "GET"} ${url} ${options.body || ""}`;
+    const cached = etagCache.get(key);
+    const headers = { ...(options.headers || {}) };
+    if (cached) headers["If-None-Match"] = `"${cached.etag}"`;
+
+    const response = await fetch(url, { ...options, headers });
+    if (response.status === 304 && cached) {
+        // Tandai sebagai baru dipakai (urutan Map = urutan LRU)
+        etagCache.delete(key);
+        etagCache.set(key, cached);
+        return new Response(cached.body, { status: 200, headers: { "Content-Type": "application/json" } });
+    }
+
+    const etag = response.headers.get("ETag");
+    if (response.ok && etag) {
+        etagCache.delete(key);
+        etagCache.set(key, { etag: etag.replace(/^W\//, "").replace(/"/g, ""), body: await response.clone().text() });
+        if (etagCache.size > ETAG_CACHE_MAX_ENTRIES) {
+            etagCache.delete(etagCache.keys().next().value);
+        }
+    }
+    return response;
+}
+
 /**
  * >>>>>> TAMBAHAN BARU: Fungsi untuk mengambil daftar user untuk dropdown <<<<<<
  */
@@ -59,36 +93,70 @@ async function toggleLogDropdown() {
     }
 }
 
-async function logAnalysisStart(filename, featureType) {
-    try {
-        const response = await fetch('/api/log_analysis_start', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ filename: filename, feature_type: featureType })
+// Mengirim analisis sebagai job background, lalu mengikuti stream SSE job sampai selesai.
+// Log analisis (start/end) dicatat otomatis oleh server sebagai bagian dari job.
+// onPage(payload) dipanggil untuk setiap event 'page' (proofread: satu halaman selesai).
+async function runAnalysisJob(featureType, formData, onProgress = null, onPage = null) {
+    const submitResponse = await fetch(`/api/jobs/${featureType}`, { method: "POST", body: formData });
+    if (!submitResponse.ok) {
+        const err = await submitResponse.json(); throw new Error(err.error || "Respon server tidak valid");
+    }
+    const { job_id } = await submitResponse.json();
+
+    // Server menutup stream secara berkala (event 'reconnect'); sambung lagi mulai dari event berikutnya
+    let after = 0;
+    while (true) {
+        const streamResponse = await fetch(`/api/jobs/${job_id}/stream?after=${after}`);
+        if (!streamResponse.ok) {
+            const err = await streamResponse.json(); throw new Error(err.error || "Gagal mengambil status analisis");
+        }
+
+        let finishedJob = null;
+        await readEventStream(streamResponse, (eventName, payload) => {
+            if (eventName === "page") {
+                after += 1;
+                if (onPage) onPage(payload);
+            } else if (eventName === "progress") {
+                if (onProgress) onProgress(payload.progress);
+            } else if (eventName === "reconnect") {
+                after = payload.after;
+            } else if (eventName === "end") {
+                finishedJob = payload;
+            }
         });
-        if (!response.ok) {
-            // Jika error, kita tidak hentikan proses analisis, hanya cetak di console
-            console.error("Gagal mencatat start log:", await response.json());
-            return null;
+
+        if (finishedJob) {
+            if (finishedJob.status === 'done') return finishedJob.result;
+            throw new Error(finishedJob.error || "Analisis gagal diproses di server");
         }
-        const result = await response.json();
-        return result.log_id; // Kembalikan ID log
-    } catch (error) {
-        console.error("Gagal menghubungi server untuk start log:", error);
-        return null;
     }
 }
 
-async function logAnalysisEnd(logId, status) {
-    if (!logId) return; // Jika tidak ada logId, tidak perlu kirim apa-apa
-    try {
-        await fetch('/api/log_analysis_end', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ log_id: logId, status: status })
-        });
-    } catch (error) {
-        console.error("Gagal mencatat end log:", error);
+// Membaca respons Server-Sent Events dari fetch() (EventSource tidak mendukung POST + file).
+// onEvent(eventName, data) dipanggil untuk setiap event yang diterima.
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventName = "message";
+            let dataLines = [];
+            rawEvent.split("\n").forEach(line => {
+                if (line.startsWith("event:")) eventName = line.slice(6).trim();
+                else if (line.startsWith("data:")) dataLines.push(line.slice(5).trim());
+            });
+            if (dataLines.length) onEvent(eventName, JSON.parse(dataLines.join("\n")));
+        }
     }
 }
 
@@ -336,7 +404,6 @@ function createTable(data, headers, existingComments = [], actions = {}) {
     return "<p>Tidak ada data untuk ditampilkan.</p>";
   }
 
-  let a = 1
   let head = "<tr>";
   head += `<th>No.</th>`
   let customHeaders = {
@@ -361,13 +428,28 @@ function createTable(data, headers, existingComments = [], actions = {}) {
   });
   head += "</tr>";
 
+  return `
+    <div class="results-table-wrapper">
+      <table>
+        <thead>${head}</thead>
+        <tbody>${createTableRows(data, headers, actions)}</tbody>
+      </table>
+    </div>
+  `;
+}
+
+/**
+ * Menyusun baris <tr> tabel hasil. startIndex = jumlah baris sebelum data ini
+ * (untuk halaman berikutnya yang dimuat belakangan), agar nomor dan row_id tetap benar.
+ */
+function createTableRows(data, headers, actions = {}, startIndex = 0) {
   let body = "";
   data.forEach((row, index) => { 
-    const rowId = index + 1; // ID baris saat ini (1-based index)
+    const rowId = startIndex + index + 1; // ID baris saat ini (1-based index)
     const savedAction = actions[rowId] || {}; // >>>>>> AMBIL DATA TERSIMPAN <<<<<<
     
-    body += "<tr>";
-    body += `<td>${a++}</td>`
+    body += `<tr data-row-id="${rowId}">`;
+    body += `<td>${rowId}</td>`
     
     headers.forEach(header => {
       let cellData = row[header] || "";
@@ -432,15 +514,7 @@ function createTable(data, headers, existingComments = [], actions = {}) {
     });
     body += "</tr>";
   });
-
-  return `
-    <div class="results-table-wrapper">
-      <table>
-        <thead>${head}</thead>
-        <tbody>${body}</tbody>
-      </table>
-    </div>
-  `;
+  return body;
 }
 // >>>>>> REVISION END <<<<<<
 
@@ -705,6 +779,7 @@ function openCommentModal(featureId, rowId, event, parentId = null) {
                     folderName: folderName, 
                     fileName: fileName,
                     rowId: rowId, 
+                    ownerId: ownerId,
                     text: text,
                     // >>>>>> KIRIM PARENT ID <<<<<<
                     parentId: parentId
@@ -754,7 +829,7 @@ async function loadUserFolders() {
     }
 
     try {
-        const response = await fetch("/api/list_folders");
+        const response = await cachedFetch("/api/list_folders");
         if (!response.ok) {
             let errText = "Gagal memuat daftar folder.";
             try {
@@ -825,6 +900,44 @@ async function loadUserFolders() {
     }
 }
 
+/** Mengambil satu halaman riwayat folder: { items, next_cursor } */
+async function fetchFolderHistoryPage(folderName, ownerId, cursor) {
+    const params = new URLSearchParams();
+    if (cursor) params.set("cursor", cursor);
+    const response = await cachedFetch(`/api/folder_history/${ownerId}/${encodeURIComponent(folderName)}?${params}`);
+    if (!response.ok) {
+        const err = await response.json();
+        throw new Error(err.error || "Gagal memuat riwayat folder.");
+    }
+    return response.json();
+}
+
+/** Menyusun baris <tr> tabel riwayat untuk daftar file */
+function buildHistoryRows(historyFiles, folderName, ownerId) {
+    // Dapatkan ID user saat ini dari data-user-id di body
+    const currentUserId = document.body.dataset.userId;
+    let rowsHTML = "";
+    historyFiles.forEach(file => {
+        // Hanya pemilik yang bisa menghapus
+        const deleteButton = (String(ownerId) === String(currentUserId)) ? 
+            `<button class="delete-result-btn" onclick="deleteResultFile('${folderName}', '${file.filename}', ${ownerId}, event)">Hapus</button>` : '';
+
+        const viewButton = `<button class="view-result-btn" onclick="viewResultFile('${folderName}', '${file.filename}', ${ownerId}, '${file.feature_type}', event)">View</button>`;
+
+        rowsHTML += `
+            <tr>
+                <td>${file.original_name}</td>
+                <td>${file.feature_type}</td>
+                <td>${file.timestamp}</td>
+                <td class="action-cell">
+                    ${viewButton} ${deleteButton}
+                </td>
+            </tr>
+        `;
+    });
+    return rowsHTML;
+}
+
 /** REVISI: Fungsi ini sekarang mengambil data riwayat dari backend */
 async function viewFolderHistory(folderName, ownerId) {
     if (folderGrid) folderGrid.classList.add('hidden');
@@ -846,30 +959,21 @@ async function viewFolderHistory(folderName, ownerId) {
         folderHistoryDetail.scrollIntoView({ behavior: 'smooth', block: 'start' });
 
         try {
-            // Panggil API baru
-            const response = await fetch(`/api/folder_history/${ownerId}/${folderName}`);
-            if (!response.ok) {
-                const err = await response.json();
-                throw new Error(err.error || "Gagal memuat riwayat folder.");
-            }
- 
-            const historyFiles = await response.json();
+            // Panggil API baru (per halaman, terbaru dulu)
+            const page = await fetchFolderHistoryPage(folderName, ownerId, null);
             const tableContainer = document.getElementById("history-table-container");
  
             // Hapus placeholder loading
             const loadingPlaceholder = folderHistoryDetail.querySelector('.loading-detail, .loading');
             if (loadingPlaceholder) loadingPlaceholder.remove();
 
-            if (historyFiles.length === 0) {
+            if (page.items.length === 0) {
                 tableContainer.innerHTML = "<p style='text-align:center;'>Folder ini kosong. Belum ada hasil analisis yang disimpan.</p>";
                 return;
             }
 
-            // Dapatkan ID user saat ini dari data-user-id di body
-            const currentUserId = document.body.dataset.userId;
-
             // Buat tabel dari data riwayat
-            let tableHTML = `
+            tableContainer.innerHTML = `
                 <div class="results-table-wrapper">
                 <table class="history-table">
                     <thead>
@@ -880,32 +984,33 @@ async function viewFolderHistory(folderName, ownerId) {
                         <th>Aksi</th>
                     </tr>
                     </thead>
-                    <tbody>
+                    <tbody id="history-table-body">${buildHistoryRows(page.items, folderName, ownerId)}</tbody>
+                </table></div>
+                <div style="text-align:center; margin-top: 1rem;">
+                    <button id="history-load-more" class="back-btn hidden">Muat lebih banyak</button>
+                </div>
             `;
- 
-            historyFiles.forEach(file => {
-                // Hanya pemilik yang bisa menghapus
-                const deleteButton = (String(ownerId) === String(currentUserId)) ? 
-                    `<button class="delete-result-btn" onclick="deleteResultFile('${folderName}', '${file.filename}', ${ownerId}, event)">Hapus</button>` : '';
- 
-                // --- MODIFIKASI: Tambahkan Tombol View ---
-                const viewButton = `<button class="view-result-btn" onclick="viewResultFile('${folderName}', '${file.filename}', ${ownerId}, '${file.feature_type}', event)">View</button>`;
 
-                tableHTML += `
-                    <tr>
-                        <td>${file.original_name}</td>
-                        <td>${file.feature_type}</td>
-                        <td>${file.timestamp}</td>
-                        <td class="action-cell">
-                            ${viewButton} ${deleteButton}
-                        </td>
-                    </tr>
-                `;
-            });
-            // --- AKHIR MODIFIKASI ---
- 
-            tableHTML += `</tbody></table></div>`;
-            tableContainer.innerHTML = tableHTML;
+            // Halaman berikutnya diambil dengan cursor dari respons sebelumnya
+            const loadMoreButton = document.getElementById("history-load-more");
+            let nextCursor = page.next_cursor;
+            loadMoreButton.classList.toggle("hidden", !nextCursor);
+            loadMoreButton.onclick = async () => {
+                loadMoreButton.disabled = true;
+                loadMoreButton.textContent = "Memuat...";
+                try {
+                    const nextPage = await fetchFolderHistoryPage(folderName, ownerId, nextCursor);
+                    document.getElementById("history-table-body")
+                        .insertAdjacentHTML("beforeend", buildHistoryRows(nextPage.items, folderName, ownerId));
+                    nextCursor = nextPage.next_cursor;
+                    loadMoreButton.classList.toggle("hidden", !nextCursor);
+                } catch (error) {
+                    showError(error.message);
+                } finally {
+                    loadMoreButton.disabled = false;
+                    loadMoreButton.textContent = "Muat lebih banyak";
+                }
+            };
  
         } catch (error) {
             folderHistoryDetail.innerHTML = `
@@ -917,6 +1022,62 @@ async function viewFolderHistory(folderName, ownerId) {
     }
 }
 
+const RESULT_PAGE_SIZE = 200;
+
+/** Mengambil satu halaman baris hasil tersimpan: { data, actions, total, offset, next_offset } */
+async function fetchResultPage(folderName, filename, ownerId, offset) {
+    const response = await cachedFetch("/api/get_result_file", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ folder_name: folderName, filename: filename, owner_id: ownerId, offset: offset, limit: RESULT_PAGE_SIZE })
+    });
+    if (!response.ok) {
+        const err = await response.json();
+        throw new Error(err.error || "Gagal memuat data hasil.");
+    }
+    return response.json();
+}
+
+/** Memasang penanda di bawah tabel; saat terlihat, halaman berikutnya diambil dan ditambahkan ke tabel */
+function attachLazyResultLoader(container, folderName, filename, ownerId, headers, startOffset) {
+    const tbody = container.querySelector('tbody');
+    const sentinel = document.createElement('div');
+    sentinel.className = 'loading';
+    sentinel.innerHTML = '<div class="spinner"></div> Memuat baris berikutnya...';
+    container.appendChild(sentinel);
+
+    let nextOffset = startOffset;
+    let loading = false;
+    const observer = new IntersectionObserver(async (entries) => {
+        if (!entries[0].isIntersecting || loading || nextOffset === null) return;
+        loading = true;
+        try {
+            // Tampilan sudah ditutup/diganti file lain: hentikan
+            if (container.getAttribute('data-file-name') !== filename || !container.contains(tbody)) {
+                observer.disconnect();
+                return;
+            }
+            const page = await fetchResultPage(folderName, filename, ownerId, nextOffset);
+            tbody.insertAdjacentHTML('beforeend', createTableRows(page.data, headers, page.actions || {}, page.offset));
+            nextOffset = page.next_offset;
+            if (nextOffset === null) {
+                observer.disconnect();
+                sentinel.remove();
+            } else {
+                // Observasi ulang agar callback terpanggil lagi jika penanda masih terlihat
+                observer.unobserve(sentinel);
+                observer.observe(sentinel);
+            }
+        } catch (error) {
+            observer.disconnect();
+            sentinel.innerHTML = `<p class="error-flash">${error.message}</p>`;
+        } finally {
+            loading = false;
+        }
+    }, { rootMargin: '400px' });
+    observer.observe(sentinel);
+}
+
 // --- TAMBAHAN BARU: Fungsi untuk melihat isi file JSON ---
 async function viewResultFile(folderName, filename, ownerId, featureType, event) {
     const viewButton = event.target;
@@ -934,26 +1095,16 @@ async function viewResultFile(folderName, filename, ownerId, featureType, event)
     resultViewContainer.setAttribute('data-owner-id', ownerId); 
 
     try {
-        // 1. Ambil Data Hasil (JSON) dan actions
-        const resultResponse = await fetch("/api/get_result_file", {
-            method: "POST",
-            headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ folder_name: folderName, filename: filename, owner_id: ownerId })
-        });
-        if (!resultResponse.ok) {
-            const err = await resultResponse.json();
-            throw new Error(err.error || "Gagal memuat data hasil.");
-        }
- 
-        const result = await resultResponse.json();
+        // 1. Ambil Data Hasil (JSON) dan actions, halaman pertama saja
+        const result = await fetchResultPage(folderName, filename, ownerId, 0);
         const data = result.data; // Ini adalah data hasil analisis
         const actions = result.actions || {}; // >>>>>> AMBIL DATA ACTIONS <<<<<<
         
         // 2. Ambil Komentar Terkait (API BARU)
-        const commentsResponse = await fetch("/api/get_comments", {
+        const commentsResponse = await cachedFetch("/api/get_comments", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
-            body: JSON.stringify({ folder_name: folderName, filename: filename })
+            body: JSON.stringify({ folder_name: folderName, filename: filename, owner_id: ownerId })
         });
         const existingComments = await commentsResponse.json(); // Array of comments
 
@@ -977,6 +1128,11 @@ async function viewResultFile(folderName, filename, ownerId, featureType, event)
             ${createTable(data, headers, existingComments, actions)} <!-- FIX: Kirim komentar dan actions di sini -->
         `;
 
+        // Baris berikutnya dimuat saat pengguna menggulir sampai akhir tabel
+        if (result.next_offset) {
+            attachLazyResultLoader(resultViewContainer, folderName, filename, ownerId, headers, result.next_offset);
+        }
+
         // >>>>>> TAMBAHAN BARU: Tambahkan event listener untuk perubahan <<<<<<
         const resultTable = resultViewContainer.querySelector('table');
         if (resultTable) {
@@ -990,6 +1146,10 @@ async function viewResultFile(folderName, filename, ownerId, featureType, event)
                         saveButton.disabled = false; // Aktifkan tombol Save
                         saveButton.textContent = 'Save'; // Kembalikan teks ke 'Save'
                     }
+                    // Simpan otomatis; perubahan beberapa baris digabung dalam satu permintaan
+                    queueRowAction(folderName, filename, ownerId, readRowAction(row))
+                        .then(() => { if (saveButton) saveButton.textContent = 'Saved!'; })
+                        .catch(error => showError(`Gagal menyimpan status baris: ${error.message}`));
                 }
             });
         }
@@ -1143,7 +1303,7 @@ async function openSaveModal(featureId, resultsData, filename) {
     document.getElementById("save-modal-error").classList.add("hidden"); 
  
     try {
-        const response = await fetch("/api/list_folders");
+        const response = await cachedFetch("/api/list_folders");
         if (!response.ok) {
             const err = await response.json();
             throw new Error(err.error || "Gagal memuat daftar folder.");
@@ -1632,7 +1792,6 @@ document.addEventListener("DOMContentLoaded", () => {
       clearError();
       proofreadLoading.classList.remove("hidden");
       proofreadAnalyzeBtn.disabled = true;
-      let logId = await logAnalysisStart(file.name, 'proofreading');
       proofreadResultsContainer.classList.add("hidden");
       if(proofreadSaveBtn) proofreadSaveBtn.classList.add("hidden");
       sessionStorage.removeItem('proofreadResults');
@@ -1642,18 +1801,36 @@ document.addEventListener("DOMContentLoaded", () => {
       formData.append("file", file);
 
       try {
-        const response = await fetch("/api/proofread/analyze", { method: "POST", body: formData });
-        if (!response.ok) {
-          const err = await response.json(); throw new Error(err.error || "Respon server tidak valid");
-        }
-        const data = await response.json();
+        // Dijalankan sebagai job; setiap halaman yang selesai ditambahkan ke tabel tanpa merender ulang
+        const proofreadHeaders = ["Kata/Frasa Salah", "Perbaikan Sesuai KBBI", "Pada Kalimat", "Ditemukan di Halaman", "apakah_ganti", "pic_proofread", "finalize"];
+        let streamedRowCount = 0;
+        let lastPage = 0;
+        let pagesInOrder = true;
+        let tableBody = null;
+
+        const data = await runAnalysisJob("proofreading", formData, null, (payload) => {
+          if (payload.halaman < lastPage) pagesInOrder = false;
+          lastPage = Math.max(lastPage, payload.halaman);
+          if (payload.rows.length === 0) return;
+
+          if (!tableBody) {
+            proofreadResultsTableDiv.innerHTML = createTable(payload.rows, proofreadHeaders, [], {});
+            tableBody = proofreadResultsTableDiv.querySelector("tbody");
+            proofreadResultsContainer.classList.remove("hidden");
+          } else {
+            tableBody.insertAdjacentHTML("beforeend", createTableRows(payload.rows, proofreadHeaders, {}, streamedRowCount));
+          }
+          streamedRowCount += payload.rows.length;
+        });
 
         if (data.length === 0) {
           proofreadResultsTableDiv.innerHTML = "<p>Tidak ada kesalahan yang ditemukan.</p>";
         } else {
-          const headers = ["Kata/Frasa Salah", "Perbaikan Sesuai KBBI", "Pada Kalimat", "Ditemukan di Halaman", "apakah_ganti", "pic_proofread", "finalize"];
-          // Untuk analisis baru, actions akan kosong
-          proofreadResultsTableDiv.innerHTML = createTable(data, headers, [], {});
+          // Hasil akhir urut per halaman; render ulang hanya jika urutan/isi stream berbeda
+          // (halaman selesai tidak berurutan, atau ada event yang tidak diterima)
+          if (!pagesInOrder || streamedRowCount !== data.length) {
+            proofreadResultsTableDiv.innerHTML = createTable(data, proofreadHeaders, [], {});
+          }
  
           // REVISI: Simpan hasil ke Session Storage dan variabel global
           sessionStorage.setItem('proofreadResults', JSON.stringify(data));
@@ -1664,11 +1841,9 @@ document.addEventListener("DOMContentLoaded", () => {
           if(proofreadSaveBtn) proofreadSaveBtn.classList.remove("hidden");
         }
         proofreadResultsContainer.classList.remove("hidden");
-        await logAnalysisEnd(logId, 'done');
 
       } catch (error) {
         // MODIFIKASI: Pengecekan error 429
-        await logAnalysisEnd(logId, 'error');
         if (error.message.includes("429") || error.message.includes("quota")) {
             showError("Anda telah melebihi batas penggunaan API. Silakan tunggu beberapa saat dan coba lagi, atau periksa kuota Anda di Google Cloud Console.");
         } else {
@@ -1726,19 +1901,13 @@ document.addEventListener("DOMContentLoaded", () => {
         sessionStorage.removeItem('compareResults');
         sessionStorage.removeItem('compareFilename');
 
-        // Kita selalu menggunakan mode lanjutan sekarang
-        const apiEndpoint = '/api/compare/analyze_advanced';
-
+        // Kita selalu menggunakan mode lanjutan sekarang (job 'compare' = /api/compare/analyze_advanced)
         const formData = new FormData();
         formData.append("file1", file1);
         formData.append("file2", file2);
 
         try {
-            const response = await fetch(apiEndpoint, { method: "POST", body: formData });
-            if (!response.ok) {
-            const err = await response.json(); throw new Error(err.error || "Respon server tidak valid");
-            }
-            const data = await response.json();
+            const data = await runAnalysisJob('compare', formData);
 
             if (data.length === 0) {
             compareResultsTableDiv.innerHTML = "<p>Tidak ada perbedaan makna yang signifikan ditemukan antara dokumen asli dan revisi.</p>";
@@ -1809,11 +1978,7 @@ document.addEventListener("DOMContentLoaded", () => {
       formData.append("file", file);
 
       try {
-        const response = await fetch("/api/coherence/analyze", { method: "POST", body: formData });
-        if (!response.ok) {
-          const err = await response.json(); throw new Error(err.error || "Respon server tidak valid");
-        }
-        const data = await response.json();
+        const data = await runAnalysisJob('coherence', formData);
 
         if (data.length === 0) {
           coherenceResultsTableDiv.innerHTML = "<p>Tidak ada masalah koherensi yang ditemukan.</p>";
@@ -1863,11 +2028,7 @@ document.addEventListener("DOMContentLoaded", () => {
       formData.append("file", file);
 
       try {
-        const response = await fetch("/api/restructure/analyze", { method: "POST", body: formData });
-        if (!response.ok) {
-          const err = await response.json(); throw new Error(err.error || "Respon server tidak valid");
-        }
-        const data = await response.json();
+        const data = await runAnalysisJob('restructure', formData);
 
         if (data.length === 0) {
           restructureResultsTableDiv.innerHTML = "<p>Tidak ada saran restrukturisasi.</p>";
@@ -1912,6 +2073,82 @@ document.addEventListener("DOMContentLoaded", () => {
 
 }); // Akhir dari DOMContentLoaded
 
+// --- Simpan status baris (apakah_ganti / PIC) secara batch ---
+// Perubahan dikumpulkan per file dan dikirim ke /api/save_row_actions setelah jeda singkat,
+// sehingga mengubah banyak baris berturut-turut hanya menghasilkan satu permintaan.
+const ROW_ACTION_DEBOUNCE_MS = 800;
+const pendingRowActions = new Map(); // key file -> { folderName, fileName, ownerId, actions: Map(row_id -> aksi), timer, waiters }
+
+function rowActionKey(folderName, fileName, ownerId) {
+    return `${ownerId}|${folderName}|${fileName}`;
+}
+
+/** Membaca status checkbox dan dropdown PIC dari satu <tr> tabel hasil */
+function readRowAction(row) {
+    const checkbox = row.querySelector('.action-checkbox');
+    const dropdown = row.querySelector('.action-dropdown');
+    return {
+        row_id: parseInt(row.dataset.rowId),
+        is_ganti: checkbox ? checkbox.checked : false,
+        pic_user_id: dropdown && dropdown.value ? parseInt(dropdown.value) : null
+    };
+}
+
+/** Menambahkan aksi ke antrean file (aksi terakhir per baris yang dipakai); resolve setelah batch-nya tersimpan */
+function queueRowAction(folderName, fileName, ownerId, action) {
+    const key = rowActionKey(folderName, fileName, ownerId);
+    let entry = pendingRowActions.get(key);
+    if (!entry) {
+        entry = { folderName, fileName, ownerId, actions: new Map(), timer: null, waiters: [] };
+        pendingRowActions.set(key, entry);
+    }
+    entry.actions.set(action.row_id, action);
+    clearTimeout(entry.timer);
+    entry.timer = setTimeout(() => flushRowActions(key), ROW_ACTION_DEBOUNCE_MS);
+    return new Promise((resolve, reject) => entry.waiters.push({ resolve, reject }));
+}
+
+function rowActionsPayload(entry) {
+    return JSON.stringify({
+        folder_name: entry.folderName,
+        filename: entry.fileName,
+        owner_id: entry.ownerId,
+        actions: Array.from(entry.actions.values())
+    });
+}
+
+/** Mengirim semua aksi yang menunggu untuk satu file dalam satu permintaan */
+async function flushRowActions(key) {
+    const entry = pendingRowActions.get(key);
+    if (!entry) return;
+    pendingRowActions.delete(key);
+    clearTimeout(entry.timer);
+
+    try {
+        const response = await fetch('/api/save_row_actions', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: rowActionsPayload(entry)
+        });
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Failed to save state.');
+        }
+        entry.waiters.forEach(waiter => waiter.resolve(result));
+    } catch (error) {
+        entry.waiters.forEach(waiter => waiter.reject(error));
+    }
+}
+
+// Halaman ditutup sebelum debounce selesai: kirim sisa antrean lewat sendBeacon
+window.addEventListener('pagehide', () => {
+    pendingRowActions.forEach(entry => {
+        clearTimeout(entry.timer);
+        navigator.sendBeacon('/api/save_row_actions', new Blob([rowActionsPayload(entry)], { type: 'application/json' }));
+    });
+    pendingRowActions.clear();
+});
+
     async function saveRowState(rowId, event) {
         const saveButton = event.target;
         const originalText = saveButton.textContent;
@@ -2030,29 +2267,10 @@ document.addEventListener("DOMContentLoaded", () => {
   });
 
     try {
-        const response = await fetch('/api/save_row_action', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(payload)
-        });
-
-        // Coba parsing ke JSON
-        let result;
-        const responseText = await response.text(); // Ambil sebagai teks dulu
-        try {
-            result = JSON.parse(responseText);
-        } catch (e) {
-            console.error("Gagal parsing JSON dari respons server. Respons mungkin bukan JSON.");
-            // Tampilkan error mentah ke user
-            showCustomMessage(`Server Error: Respons bukan JSON. Lihat console untuk detail.`, 'error');
-            saveButton.textContent = originalText;
-            saveButton.disabled = false;
-            return; // Hentikan eksekusi
-        }
-
-        if (!response.ok) {
-            throw new Error(result.error || 'Failed to save state.');
-        }
+        // Kirim sekarang juga, bersama perubahan baris lain yang masih menunggu debounce
+        const saved = queueRowAction(folderName, fileName, ownerId, payload);
+        flushRowActions(rowActionKey(folderName, fileName, ownerId));
+        const result = await saved;
         
         showCustomMessage(result.message, 'success', 'Status Tersimpan');
         saveButton.textContent = 'Saved!';